@@ -0,0 +1,225 @@
+# academy_registry.py
+"""
+SQLite-backed registry of academy players and coaches.
+
+Replaces lookups in the in-source ACADEMY_DATABASE dict with an embedded,
+indexed database (talent ID, position, level, club, age) shared by all
+workers on the machine. Reads go through a small connection pool and a
+read-through LRU for hot talent IDs. SQL text is constant per query shape,
+so sqlite3's per-connection statement cache keeps every query prepared.
+
+    python academy_registry.py import players players.csv
+"""
+import argparse
+import csv
+import queue
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from types import MappingProxyType
+
+PLAYER_FIELDS = ("name", "age", "position", "years_played", "level", "current_club")
+COACH_FIELDS = ("name", "age", "specialty", "years_experience", "level")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    talent_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    position TEXT NOT NULL,
+    years_played INTEGER NOT NULL,
+    level TEXT NOT NULL,
+    current_club TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_position_level_age ON players (position, level, age);
+CREATE INDEX IF NOT EXISTS players_level_age ON players (level, age);
+CREATE INDEX IF NOT EXISTS players_club ON players (current_club);
+CREATE INDEX IF NOT EXISTS players_age ON players (age);
+
+CREATE TABLE IF NOT EXISTS coaches (
+    talent_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    specialty TEXT NOT NULL,
+    years_experience INTEGER NOT NULL,
+    level TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coaches_level_age ON coaches (level, age);
+CREATE INDEX IF NOT EXISTS coaches_specialty ON coaches (specialty);
+CREATE INDEX IF NOT EXISTS coaches_age ON coaches (age);
+"""
+
+# talent ID prefix -> (table, user type, fields)
+KINDS = {
+    "P": ("players", "player", PLAYER_FIELDS),
+    "C": ("coaches", "coach", COACH_FIELDS),
+}
+
+# Searchable columns -> SQL condition; only these names ever reach the SQL text
+PLAYER_FILTERS = {
+    "position": "position = ?",
+    "level": "level = ?",
+    "club": "current_club = ?",
+    "min_age": "age >= ?",
+    "max_age": "age <= ?",
+}
+COACH_FILTERS = {
+    "specialty": "specialty = ?",
+    "level": "level = ?",
+    "min_age": "age >= ?",
+    "max_age": "age <= ?",
+    "min_experience": "years_experience >= ?",
+}
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared across threads."""
+
+    def __init__(self, path, size):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            connection = sqlite3.connect(path, check_same_thread=False, cached_statements=256, uri=path.startswith("file:"))
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._connections.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+
+class AcademyRegistry:
+    def __init__(self, path, pool_size=4, cache_size=1024, seed=None):
+        self.pool = ConnectionPool(path, pool_size)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # talent_id -> (user_data, user_type)
+        self._cache_lock = threading.Lock()
+        with self.pool.connection() as connection, connection:
+            connection.executescript(SCHEMA)
+        if seed and self.count("players") == 0 and self.count("coaches") == 0:
+            self.add_players(seed.get("players", {}).items())
+            self.add_coaches(seed.get("coaches", {}).items())
+
+    def get_user_data(self, talent_id):
+        """
+        Same contract as data_manager.get_user_data: (user_data, user_type) or (None, None).
+        user_data is a read-only mapping, shared by every session holding that profile.
+        """
+        kind = KINDS.get(talent_id[:1])
+        if kind is None:
+            return None, None
+        with self._cache_lock:
+            hit = self._cache.get(talent_id)
+            if hit is not None:
+                self._cache.move_to_end(talent_id)
+                return hit
+
+        table, user_type, fields = kind
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(fields)} FROM {table} WHERE talent_id = ?", (talent_id,)
+            ).fetchone()
+        if row is None:
+            return None, None
+
+        user_data = MappingProxyType(dict(row))
+        with self._cache_lock:
+            self._cache[talent_id] = (user_data, user_type)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user_data, user_type
+
+    def search_players(self, page=1, page_size=50, **filters):
+        """
+        Paged attribute search, e.g. all CBs aged 17-19 at Advanced level:
+            search_players(position="CB", min_age=17, max_age=19, level="Advanced")
+        """
+        return self._search("players", PLAYER_FIELDS, PLAYER_FILTERS, page, page_size, filters)
+
+    def search_coaches(self, page=1, page_size=50, **filters):
+        return self._search("coaches", COACH_FIELDS, COACH_FILTERS, page, page_size, filters)
+
+    def _search(self, table, fields, allowed, page, page_size, filters):
+        unknown = set(filters) - set(allowed)
+        if unknown:
+            raise ValueError(f"Unknown {table} filter(s): {', '.join(sorted(unknown))}")
+        # Iterate in declaration order so each filter combination maps to one SQL string
+        active = [name for name in allowed if filters.get(name) is not None]
+        where = " AND ".join(allowed[name] for name in active) or "1"
+        sql = (f"SELECT talent_id, {', '.join(fields)} FROM {table} WHERE {where} "
+               f"ORDER BY talent_id LIMIT ? OFFSET ?")
+        params = [filters[name] for name in active] + [page_size + 1, (page - 1) * page_size]
+        with self.pool.connection() as connection:
+            rows = [dict(row) for row in connection.execute(sql, params)]
+        return {
+            "page": page,
+            "page_size": page_size,
+            "results": rows[:page_size],
+            "has_more": len(rows) > page_size,
+        }
+
+    def all_players(self):
+        """Every player row (with talent_id), for bulk consumers such as ranking.py."""
+        with self.pool.connection() as connection:
+            return [dict(row) for row in connection.execute(f"SELECT talent_id, {', '.join(PLAYER_FIELDS)} FROM players")]
+
+    def count(self, table):
+        if table not in ("players", "coaches"):
+            raise ValueError(f"Unknown table: {table}")
+        with self.pool.connection() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def add_players(self, rows):
+        """Inserts or replaces (talent_id, data) pairs in one transaction."""
+        self._upsert("players", PLAYER_FIELDS, rows)
+
+    def add_coaches(self, rows):
+        self._upsert("coaches", COACH_FIELDS, rows)
+
+    def _upsert(self, table, fields, rows):
+        columns = ("talent_id",) + fields
+        sql = f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        talent_ids = []
+
+        def values():
+            for talent_id, data in rows:
+                talent_ids.append(talent_id)
+                yield (talent_id,) + tuple(data[field] for field in fields)
+
+        with self.pool.connection() as connection, connection:
+            connection.executemany(sql, values())
+        with self._cache_lock:
+            for talent_id in talent_ids:
+                self._cache.pop(talent_id, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the academy registry database.")
+    parser.add_argument("--db", default=None, help="database path (default: ACADEMY_DB_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="bulk-load players or coaches from a CSV with a talent_id column")
+    importer.add_argument("kind", choices=["players", "coaches"])
+    importer.add_argument("csv_path")
+    args = parser.parse_args(argv)
+
+    from config import ACADEMY_DB_PATH
+
+    registry = AcademyRegistry(args.db or ACADEMY_DB_PATH)
+    with open(args.csv_path, newline='', encoding='utf-8') as f:
+        rows = ((row.pop("talent_id"), row) for row in csv.DictReader(f))
+        if args.kind == "players":
+            registry.add_players(rows)
+        else:
+            registry.add_coaches(rows)
+    print(f"{registry.count(args.kind)} {args.kind} in registry.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
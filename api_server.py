@@ -0,0 +1,267 @@
+# api_server.py
+"""
+Headless JSON API over the flows of the Streamlit app, for partner portals and
+the mobile app.
+
+    POST   /v1/sessions                  start a conversation -> {"session_token", "reply"}
+    POST   /v1/chat                      {"message": "..."} -> {"reply", "session"}
+    GET    /v1/session                   the conversation so far
+    DELETE /v1/session                   forget it
+    POST   /v1/applications/{pathway}    screen a player or coach application -> verdict and report
+    GET    /v1/talent/{talent_id}        registry profile for a talent ID
+    GET    /healthz                      Gemini breaker, scheduler and session store stats
+
+Chat endpoints take the session token as `Authorization: Bearer <token>`. A
+conversation runs through the same ConversationEngine as the chat UI, so a
+client can go from the welcome message through a talent ID lookup, mentorship
+or a recruitment form exactly as a user of appp.py would.
+
+The app is plain ASGI (Starlette) and is served by uvicorn:
+
+    python api_server.py --workers 4 --port 8000
+
+Each worker process runs one event loop. Chat turns await Gemini through the
+async client (gemini_service.get_gemini_response_async), so a worker keeps
+hundreds of turns open without a thread each. Session store reads and writes
+run on worker threads (asyncio.to_thread): with several workers sharing the
+SQLite file, one may wait on another's write lock, and that wait must not
+stall the event loop. Routing, validation and registry lookups take well
+under a millisecond and run inline. Conversations
+are checkpointed to the session store under their token after every turn, so
+any worker can serve the next request (with SESSION_STORE=sqlite; "memory" and
+"off" keep them in one process). Screened applications go to the shared
+application store, where each worker writes its own subdirectory and reads
+everyone's records (application_store.open_store()). `python benchmarks.py load` drives a running
+server with many concurrent clients.
+"""
+import argparse
+import asyncio
+import secrets
+import textwrap
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from application_store import APPROVED, NOT_ELIGIBLE
+from coach_agent import (
+    coach_rejection_reasons, process_coach_application, required_coach_info_keys_ordered, validate_coach_input,
+)
+from config import API_HOST, API_MAX_CONCURRENCY, API_PORT, API_WORKERS, FAQ_ENABLED, GEMINI_API_KEY
+from conversation_engine import ConversationEngine, async_gemini_responder, gemini_responder
+from data_manager import get_user_data
+from faq_cache import get_faq_cache
+from metrics import VALIDATION_FAILURES, start_exporters
+from player_agent import (
+    player_rejection_reasons, process_player_application, required_player_info_keys_ordered, validate_player_input,
+)
+from session_state import SessionState
+from session_store import MemorySessionBackend, SessionStore, get_session_store
+
+INVALID = "invalid"
+NEEDS_CONFIRMATION = "needs_confirmation"
+
+# pathway -> (fields in submission order, validate, process, rejection reasons, SessionState field with the data)
+PATHWAYS = {
+    "player": (required_player_info_keys_ordered, validate_player_input, process_player_application,
+               player_rejection_reasons, "scouting_data"),
+    "coach": (required_coach_info_keys_ordered, validate_coach_input, process_coach_application,
+              coach_rejection_reasons, "coach_recruitment_data"),
+}
+
+engine = ConversationEngine(gemini_responder(GEMINI_API_KEY), faq=get_faq_cache() if FAQ_ENABLED else None)
+respond = async_gemini_responder(GEMINI_API_KEY)
+# Conversations need a store even when the chat UI runs without one
+session_store = get_session_store() or SessionStore(MemorySessionBackend())
+
+# Turns of one conversation run one at a time within a worker
+_session_locks = weakref.WeakValueDictionary()
+
+
+def _session_lock(token):
+    lock = _session_locks.get(token)
+    if lock is None:
+        lock = _session_locks[token] = asyncio.Lock()
+    return lock
+
+
+def _error(status_code, message):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def _json_object(request):
+    """The request body as a dict, or None when it is not a JSON object."""
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _session_token(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+
+def _session_summary(state):
+    if state.scouting_mode:
+        mode, stage = "player_recruitment", state.current_scouting_stage
+    elif state.coach_recruitment_mode:
+        mode, stage = "coach_recruitment", state.current_coach_stage
+    else:
+        mode, stage = "mentorship" if state.mentorship_mode else None, None
+    return {
+        "user_type": None if state.user_type is None else state.user_type.value,
+        "mode": mode,
+        "stage": None if stage is None else stage.value,
+        "messages": len(state.messages),
+    }
+
+
+async def create_session(request):
+    token = secrets.token_urlsafe(16)
+    state = SessionState()
+    reply = engine.start(state)
+    await asyncio.to_thread(session_store.save, token, state)
+    return JSONResponse({"session_token": token, "reply": reply, "session": _session_summary(state)}, status_code=201)
+
+
+async def chat(request):
+    token = _session_token(request)
+    if token is None:
+        return _error(401, "Send the session token as 'Authorization: Bearer <token>'.")
+    body = await _json_object(request)
+    message = body.get("message") if body else None
+    if not isinstance(message, str) or not message.strip():
+        return _error(400, 'Expected a JSON body {"message": "..."}.')
+
+    async with _session_lock(token):
+        state = await asyncio.to_thread(session_store.load, token)
+        if state is None:
+            return _error(404, "Unknown or expired session token.")
+        state, reply = await engine.handle_async(state, message, respond)
+        await asyncio.to_thread(session_store.save, token, state)
+    return JSONResponse({"reply": reply, "session": _session_summary(state)})
+
+
+async def get_session(request):
+    token = _session_token(request)
+    state = await asyncio.to_thread(session_store.load, token) if token else None
+    if state is None:
+        return _error(404, "Unknown or expired session token.")
+    # Older messages are read from the store on first access
+    messages = await asyncio.to_thread(state.messages.to_list)
+    return JSONResponse({"session": _session_summary(state), "messages": messages})
+
+
+async def delete_session(request):
+    token = _session_token(request)
+    if token is None:
+        return _error(401, "Send the session token as 'Authorization: Bearer <token>'.")
+    await asyncio.to_thread(session_store.delete, token)
+    return Response(status_code=204)
+
+
+async def submit_application(request):
+    """
+    Screens one application with the chat agents' rules and records it. The
+    body holds one key per field, or a `submission` string with the answers
+    comma-separated as in the chat. Warnings need `"confirm": true`, just as
+    the chat asks for a 'Yes' before processing.
+    """
+    pathway = request.path_params["pathway"]
+    if pathway not in PATHWAYS:
+        return _error(404, f"Unknown pathway '{pathway}'. Use one of: {', '.join(PATHWAYS)}.")
+    keys, validate, process, rejection_reasons, data_field = PATHWAYS[pathway]
+    body = await _json_object(request)
+    if body is None:
+        return _error(400, "Expected a JSON object.")
+
+    if body.get("submission"):
+        inputs = [item.strip() for item in str(body["submission"]).split(",")]
+    else:
+        inputs = ["" if body.get(key) is None else str(body[key]).strip() for key in keys]
+    if len(inputs) != len(keys):
+        return JSONResponse({"verdict": INVALID, "errors": [f"Expected {len(keys)} items, received {len(inputs)}."],
+                             "warnings": [], "fields": keys}, status_code=422)
+
+    errors, warnings = validate(inputs)
+    if errors:
+        VALIDATION_FAILURES.inc(pathway)
+        return JSONResponse({"verdict": INVALID, "errors": errors, "warnings": warnings}, status_code=422)
+    if warnings and body.get("confirm") is not True:
+        return JSONResponse({"verdict": NEEDS_CONFIRMATION, "errors": [], "warnings": warnings})
+
+    state = SessionState()
+    data = getattr(state, data_field)  # the agent fills it in, then resets the field
+    data["received_at"] = time.time()
+    data["warnings"] = warnings
+    report = process(state, inputs)
+    talent_id = data.get("talent_id")
+    return JSONResponse({
+        "verdict": APPROVED if talent_id else NOT_ELIGIBLE,
+        "talent_id": talent_id,
+        "warnings": warnings,
+        "rejection_reasons": [] if talent_id else rejection_reasons(data),
+        "report": textwrap.dedent(report).strip(),
+    })
+
+
+async def talent_profile(request):
+    talent_id = request.path_params["talent_id"].upper().strip()
+    user_data, user_type = get_user_data(talent_id)
+    if not user_data:
+        return _error(404, f"Talent ID {talent_id} not found.")
+    return JSONResponse({"talent_id": talent_id, "user_type": user_type, "profile": dict(user_data)})
+
+
+async def health(request):
+    from gemini_service import gemini_breaker
+    from scheduler import get_scheduler
+
+    return JSONResponse({"status": "ok", "gemini": gemini_breaker.stats(), "scheduler": get_scheduler().stats(),
+                         "sessions": session_store.stats()})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    start_exporters()
+    yield
+    from gemini_client import get_client
+
+    await get_client(GEMINI_API_KEY).aclose()
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/sessions", create_session, methods=["POST"]),
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/session", get_session, methods=["GET"]),
+        Route("/v1/session", delete_session, methods=["DELETE"]),
+        Route("/v1/applications/{pathway}", submit_application, methods=["POST"]),
+        Route("/v1/talent/{talent_id}", talent_profile, methods=["GET"]),
+        Route("/healthz", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the recruitment and mentorship flows as a JSON API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="worker processes (default: %(default)s)")
+    parser.add_argument("--max-concurrency", type=int, default=API_MAX_CONCURRENCY,
+                        help="requests each worker accepts at once before answering 503 (default: %(default)s)")
+    args = parser.parse_args(argv)
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers,
+                limit_concurrency=args.max_concurrency, backlog=4096, access_log=False, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+# application_store.py
+"""
+Durable, append-only store of processed player/coach applications.
+
+append() only enqueues the record, so the chat turn never waits on disk. A
+background writer drains the queue in batches, appends the records as JSON
+lines to the current log segment and fsyncs once per batch. Full segments
+are closed and periodically compacted into a snapshot: one JSONL file sorted
+by processing time, plus an index file with talent ID -> offset and
+(processed_at, offset) pairs. Replacing the index is the commit point of a
+compaction, so a crash at any moment leaves a consistent snapshot behind. Lookups by talent ID or date range seek
+straight into the snapshot. Records written since the last compaction are
+kept in memory until the next one.
+
+A directory has a single writer: segment numbering and compaction assume no
+other process touches its files. The store holds an exclusive flock on its
+LOCK file while open, and opening a directory another store holds raises
+StoreLocked instead of corrupting it (no lock is taken where fcntl is
+unavailable, e.g. on Windows).
+
+Several processes (API workers, say) share a store through open_store(),
+which get_store() uses: each process writes to the first free writer
+directory, the store directory itself or a writer-N subdirectory under it, and
+reads merge the records of every writer. Another writer's files are read
+without its cooperation: its snapshot through its index, and the segments it
+hasn't compacted yet, tailed as they grow. A read that overlaps that writer's
+compaction is retried.
+
+Layout of the store directory:
+    LOCK                     held by the open store
+    wal-00000001.log ...   log segments, oldest first
+    snapshot-00000004.jsonl  compacted records up to segment 4, sorted by processed_at
+    snapshot.index.json      {"snapshot": name, "through_segment": n, "talent_ids": {...}, "times": [[ts, offset], ...]}
+    writer-1/ ...            the same layout for each further writer
+"""
+import atexit
+import bisect
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one writer is up to the deployment
+    fcntl = None
+
+from config import (
+    APPLICATION_STORE_COMPACT_SEGMENTS, APPLICATION_STORE_DIR, APPLICATION_STORE_FLUSH_SECONDS,
+    APPLICATION_STORE_SEGMENT_BYTES,
+)
+from talent_ids import new_talent_id
+
+APPROVED = "approved"
+NOT_ELIGIBLE = "not_eligible"
+
+SNAPSHOT_INDEX = "snapshot.index.json"
+LOCK_FILE = "LOCK"
+WRITER_PREFIX = "writer-"
+MAX_BATCH = 1000
+_STOP = object()
+
+
+class StoreLocked(Exception):
+    """Another ApplicationStore (in this or another process) has the directory open."""
+
+
+def _segment_name(number):
+    return f"wal-{number:08d}.log"
+
+
+def _segment_number(name):
+    return int(name[4:12])
+
+
+def _list_segments(directory):
+    return sorted(_segment_number(name) for name in os.listdir(directory)
+                  if name.startswith("wal-") and name.endswith(".log"))
+
+
+def _read_index(directory):
+    path = os.path.join(directory, SNAPSHOT_INDEX)
+    if not os.path.exists(path):
+        return {"snapshot": None, "through_segment": 0, "talent_ids": {}, "times": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_at(path, offsets):
+    """The JSON lines starting at each offset of a snapshot file."""
+    if not offsets:
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for offset in offsets:
+            f.seek(offset)
+            records.append(json.loads(f.readline()))
+    return records
+
+
+class ApplicationStore:
+    def __init__(self, directory, segment_bytes=APPLICATION_STORE_SEGMENT_BYTES,
+                 flush_seconds=APPLICATION_STORE_FLUSH_SECONDS,
+                 compact_segments=APPLICATION_STORE_COMPACT_SEGMENTS, group=None):
+        self.directory = directory
+        # Store directory shared with other writers (see open_store()); their records are read from there
+        self.group = group or directory
+        self._views = {}  # other writer's directory -> _WriterView
+        self.segment_bytes = segment_bytes
+        self.flush_seconds = flush_seconds
+        self.compact_segments = compact_segments
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_directory(directory)
+
+        self._lock = threading.Lock()  # guards the snapshot index and the live records
+        self._compact_lock = threading.Lock()
+        self._load_snapshot_index()
+        self._live = []  # records not yet in the snapshot, in write order
+        self._live_by_talent_id = {}
+
+        segments = self._segments()
+        for number in segments:
+            if number > self._through_segment:
+                self._replay(number)
+        self._segment = (segments[-1] if segments else self._through_segment) + 1
+        self._file = open(os.path.join(directory, _segment_name(self._segment)), "a", encoding="utf-8")
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="application-store-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes ---
+
+    def append(self, record):
+        """Queues a record for durable storage and returns immediately."""
+        record = dict(record)
+        record.setdefault("application_id", new_talent_id("A"))
+        record.setdefault("processed_at", time.time())
+        self._queue.put(record)
+        return record["application_id"]
+
+    def flush(self):
+        """Blocks until everything appended so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._file.close()
+        self._lock_file.close()  # releases the flock
+
+    @staticmethod
+    def _acquire_directory(directory):
+        lock_file = open(os.path.join(directory, LOCK_FILE), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise StoreLocked(f"{directory} is already open in another application store") from None
+        return lock_file
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            records = [item for item in batch if isinstance(item, dict)]
+            if records:
+                self._file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                with self._lock:
+                    for record in records:
+                        self._add_live(record)
+                if self._file.tell() >= self.segment_bytes:
+                    self._rotate()
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is _STOP for item in batch):
+                return
+
+    def _rotate(self):
+        self._file.close()
+        self._segment += 1
+        self._file = open(os.path.join(self.directory, _segment_name(self._segment)), "a", encoding="utf-8")
+        closed = [number for number in self._segments() if self._through_segment < number < self._segment]
+        if len(closed) >= self.compact_segments and not self._compact_lock.locked():
+            threading.Thread(target=self.compact, name="application-store-compaction", daemon=True).start()
+
+    # --- compaction ---
+
+    def compact(self):
+        """Merges the snapshot and all closed segments into a new snapshot with fresh indexes."""
+        with self._compact_lock:
+            closed = [number for number in self._segments() if self._through_segment < number < self._segment]
+            if not closed:
+                return
+            new_records = []
+            for number in closed:
+                new_records.extend(self._read_segment(number))
+            new_records.sort(key=lambda record: record["processed_at"])
+
+            previous = self._snapshot
+            snapshot = f"snapshot-{closed[-1]:08d}.jsonl"
+            talent_ids = {}
+            times = []
+            with open(os.path.join(self.directory, snapshot), "w", encoding="utf-8") as out:
+                for record in heapq.merge(self._snapshot_records(), new_records, key=lambda r: r["processed_at"]):
+                    offset = out.tell()
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    if record.get("talent_id"):
+                        talent_ids[record["talent_id"]] = offset
+                    times.append([record["processed_at"], offset])
+                out.flush()
+                os.fsync(out.fileno())
+            index = {"snapshot": snapshot, "through_segment": closed[-1], "talent_ids": talent_ids, "times": times}
+            index_temp = os.path.join(self.directory, SNAPSHOT_INDEX + ".tmp")
+            with open(index_temp, "w", encoding="utf-8") as out:
+                json.dump(index, out)
+                out.flush()
+                os.fsync(out.fileno())
+
+            with self._lock:
+                os.replace(index_temp, os.path.join(self.directory, SNAPSHOT_INDEX))
+                self._set_snapshot_index(index)
+                compacted = {record["application_id"] for record in new_records}
+                self._live = [record for record in self._live if record["application_id"] not in compacted]
+                self._live_by_talent_id = {record["talent_id"]: record for record in self._live if record.get("talent_id")}
+            if previous:
+                os.remove(os.path.join(self.directory, previous))
+            for number in closed:
+                os.remove(os.path.join(self.directory, _segment_name(number)))
+
+    # --- reads ---
+
+    # Snapshot reads hold the lock so compaction can't swap the file between index lookup and seek
+
+    def get_by_talent_id(self, talent_id):
+        with self._lock:
+            record = self._live_by_talent_id.get(talent_id)
+            if record is not None:
+                return dict(record)
+            offset = self._talent_ids.get(talent_id)
+            if offset is not None:
+                return self._read_snapshot_at([offset])[0]
+        for view in self._other_writers():
+            record = view.get_by_talent_id(talent_id)
+            if record is not None:
+                return record
+        return None
+
+    def query_range(self, start, end):
+        """Records of every writer with start <= processed_at < end (Unix seconds), oldest first."""
+        with self._lock:
+            low = bisect.bisect_left(self._times, start)
+            high = bisect.bisect_left(self._times, end)
+            snapshot = self._read_snapshot_at(self._offsets[low:high])
+            live = [dict(record) for record in self._live if start <= record["processed_at"] < end]
+        live.sort(key=lambda record: record["processed_at"])
+        ranges = [snapshot, live] + [view.query_range(start, end) for view in self._other_writers()]
+        return list(heapq.merge(*ranges, key=lambda record: record["processed_at"]))
+
+    def stats(self):
+        with self._lock:
+            return {"snapshot_records": len(self._times), "live_records": len(self._live),
+                    "pending_writes": self._queue.qsize(), "segment": self._segment,
+                    "other_writers": len(self._views)}
+
+    def _other_writers(self):
+        """Views of the other writer directories in the group, found afresh on every read."""
+        directories = [self.group] + [os.path.join(self.group, name) for name in sorted(os.listdir(self.group))
+                                      if name.startswith(WRITER_PREFIX)]
+        own = os.path.abspath(self.directory)
+        views = []
+        for directory in directories:
+            if os.path.abspath(directory) != own:
+                view = self._views.get(directory)
+                if view is None:
+                    view = self._views.setdefault(directory, _WriterView(directory))
+                views.append(view)
+        return views
+
+    # --- helpers ---
+
+    def _add_live(self, record):
+        self._live.append(record)
+        if record.get("talent_id"):
+            self._live_by_talent_id[record["talent_id"]] = record
+
+    def _segments(self):
+        return _list_segments(self.directory)
+
+    def _read_segment(self, number):
+        records = []
+        with open(os.path.join(self.directory, _segment_name(number)), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # torn write at the tail of a crashed segment
+        return records
+
+    def _replay(self, number):
+        for record in self._read_segment(number):
+            self._add_live(record)
+
+    def _load_snapshot_index(self):
+        self._set_snapshot_index(_read_index(self.directory))
+
+    def _set_snapshot_index(self, index):
+        self._snapshot = index["snapshot"]
+        self._through_segment = index["through_segment"]
+        self._talent_ids = index["talent_ids"]
+        self._times = [pair[0] for pair in index["times"]]
+        self._offsets = [pair[1] for pair in index["times"]]
+
+    def _snapshot_records(self):
+        if not self._snapshot:
+            return
+        with open(os.path.join(self.directory, self._snapshot), encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _read_snapshot_at(self, offsets):
+        return _read_at(os.path.join(self.directory, self._snapshot), offsets) if offsets else []
+
+
+class _WriterView:
+    """
+    Read-only view of another writer's directory: its snapshot, plus the
+    segments it hasn't compacted yet, read incrementally as they grow.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index_version = None
+        self._index = None
+        self._times = []
+        self._offsets = []
+        self._tails = {}  # segment number -> [bytes read, records, {talent_id: record}]
+
+    def get_by_talent_id(self, talent_id):
+        def find():
+            for number in sorted(self._tails, reverse=True):
+                record = self._tails[number][2].get(talent_id)
+                if record is not None:
+                    return dict(record)
+            offset = self._index["talent_ids"].get(talent_id)
+            return None if offset is None else self._read_snapshot_at([offset])[0]
+        return self._read(find)
+
+    def query_range(self, start, end):
+        def select():
+            low = bisect.bisect_left(self._times, start)
+            high = bisect.bisect_left(self._times, end)
+            live = sorted((dict(record) for number in sorted(self._tails) for record in self._tails[number][1]
+                           if start <= record["processed_at"] < end), key=lambda record: record["processed_at"])
+            snapshot = self._read_snapshot_at(self._offsets[low:high])
+            return list(heapq.merge(snapshot, live, key=lambda record: record["processed_at"]))
+        return self._read(select)
+
+    def _read(self, reader):
+        """
+        Brings the view up to date and returns reader(). If the writer compacted
+        meanwhile (its index changed, or files vanished), the read starts over.
+        """
+        with self._lock:
+            while True:
+                try:
+                    self._refresh()
+                    result = reader()
+                except FileNotFoundError:
+                    self._index_version = None
+                    continue
+                if self._version() == self._index_version:
+                    return result
+
+    def _version(self):
+        try:
+            stat = os.stat(os.path.join(self.directory, SNAPSHOT_INDEX))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        version = self._version()
+        if self._index is None or version != self._index_version:
+            self._index = _read_index(self.directory)
+            self._times = [pair[0] for pair in self._index["times"]]
+            self._offsets = [pair[1] for pair in self._index["times"]]
+            self._index_version = version
+            through = self._index["through_segment"]
+            self._tails = {number: tail for number, tail in self._tails.items() if number > through}
+        for number in _list_segments(self.directory):
+            if number > self._index["through_segment"]:
+                self._tail(number)
+
+    def _tail(self, number):
+        """Reads the complete lines appended to a segment since the last read."""
+        tail = self._tails.setdefault(number, [0, [], {}])
+        with open(os.path.join(self.directory, _segment_name(number)), "rb") as f:
+            f.seek(tail[0])
+            data = f.read()
+        complete = data[:data.rfind(b"\n") + 1]  # a line still being written is read next time
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write left by a crash
+            tail[1].append(record)
+            if record.get("talent_id"):
+                tail[2][record["talent_id"]] = record
+        tail[0] += len(complete)
+
+    def _read_snapshot_at(self, offsets):
+        return _read_at(os.path.join(self.directory, self._index["snapshot"]), offsets) if offsets else []
+
+
+def open_store(directory, **options):
+    """
+    A writer for the store at `directory`: the directory itself if no other
+    store has it open, else the first free writer-N subdirectory (reused after
+    restarts, so their records are replayed). It reads every writer's records.
+    """
+    for slot in itertools.count():
+        path = directory if slot == 0 else os.path.join(directory, f"{WRITER_PREFIX}{slot}")
+        try:
+            return ApplicationStore(path, group=directory, **options)
+        except StoreLocked:
+            continue
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide application store, opened on first use and closed at exit."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = open_store(APPLICATION_STORE_DIR)
+            atexit.register(_store.close)
+        return _store
+
+
+def record_application(pathway, data, field_keys, verdict, rejection_reasons=(), talent_id=None):
+    """Appends one processed application (inputs, warnings, verdict, talent ID, timestamps)."""
+    return get_store().append({
+        "pathway": pathway,
+        "inputs": {key: data.get(key) for key in field_keys},
+        "warnings": list(data.get("warnings", ())),
+        "verdict": verdict,
+        "rejection_reasons": list(rejection_reasons),
+        "talent_id": talent_id,
+        "received_at": data.get("received_at"),
+        "processed_at": time.time(),
+    })
@@ -0,0 +1,215 @@
+# batch_screening.py
+"""
+Headless bulk screening of player/coach applications.
+
+Streams records from a CSV or JSONL file, applies the same validation and
+eligibility rules as the chat agents (validation.py) across a process pool,
+and writes one result per record. Nothing here touches Streamlit.
+
+Each record either has one column per field (the keys of PLAYER_SCHEMA /
+COACH_SCHEMA) or a single `submission` column holding the comma-separated
+answer a candidate would type in the chat. An optional `pathway` column
+overrides --pathway per record.
+
+    python batch_screening.py trials.csv --pathway player -o results.jsonl --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from talent_ids import new_talent_id
+from validation import (
+    COACH_ELIGIBILITY, COACH_SCHEMA, PLAYER_ELIGIBILITY, PLAYER_SCHEMA, rejection_reasons,
+)
+
+# pathway -> (submission schema, eligibility schema, talent ID prefix)
+PATHWAYS = {
+    "player": (PLAYER_SCHEMA, PLAYER_ELIGIBILITY, "P"),
+    "coach": (COACH_SCHEMA, COACH_ELIGIBILITY, "C"),
+}
+
+APPROVED = "approved"
+NOT_ELIGIBLE = "not_eligible"
+INVALID = "invalid"
+
+RESULT_FIELDS = ["record", "pathway", "name", "verdict", "talent_id", "errors", "warnings", "rejection_reasons"]
+
+
+def screen_application(record, pathway="player"):
+    """
+    Screens one application record. Warnings do not block the batch flow:
+    in chat the candidate confirms them, here they are reported alongside the verdict.
+    """
+    pathway = str(record.get("pathway") or pathway).strip().lower()
+    schema, eligibility, prefix = PATHWAYS[pathway]
+
+    if record.get("submission"):
+        inputs = [item.strip() for item in record["submission"].split(',')]
+    else:
+        values = [record.get(key) for key in schema.keys]
+        inputs = ["" if value is None else str(value).strip() for value in values]
+
+    result = {"pathway": pathway, "name": inputs[0] if inputs else "", "talent_id": None,
+              "errors": [], "warnings": [], "rejection_reasons": []}
+
+    if len(inputs) != len(schema.keys):
+        result["verdict"] = INVALID
+        result["errors"] = [f"Expected {len(schema.keys)} items, received {len(inputs)}."]
+        return result
+
+    errors, warnings = schema.validate(inputs)
+    result["errors"] = errors
+    result["warnings"] = warnings
+    if errors:
+        result["verdict"] = INVALID
+        return result
+
+    reasons = rejection_reasons(eligibility, dict(zip(schema.keys, inputs)))
+    if reasons:
+        result["verdict"] = NOT_ELIGIBLE
+        result["rejection_reasons"] = reasons
+    else:
+        result["verdict"] = APPROVED
+        result["talent_id"] = new_talent_id(prefix)
+    return result
+
+
+def screen_chunk(records, pathway):
+    """
+    Worker entry point: screens a list of (record number, record) pairs. A
+    record that can't be screened (including the errors read_records yields in
+    place of unparseable lines) becomes an invalid result instead of failing the batch.
+    """
+    results = []
+    for number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            result = screen_application(record, pathway)
+        except (KeyError, ValueError, AttributeError, TypeError) as e:
+            record_pathway = record.get("pathway") if isinstance(record, dict) else None
+            result = {"pathway": str(record_pathway or pathway), "name": "", "verdict": INVALID,
+                      "talent_id": None, "errors": [f"Unreadable record: {e}"], "warnings": [], "rejection_reasons": []}
+        results.append({"record": number, **result})
+    return results
+
+
+def read_records(path):
+    """
+    Yields (record number, dict) from a CSV or JSONL file without loading it
+    whole. JSONL records are numbered by their line, and a line that isn't a
+    JSON object yields a ValueError in place of the dict.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = ValueError(f"line {number} is not valid JSON ({e})")
+                else:
+                    if not isinstance(record, dict):
+                        record = ValueError(f"line {number} is a JSON {type(record).__name__}, not an object")
+                yield number, record
+        else:
+            yield from enumerate(csv.DictReader(f), start=1)
+
+
+class ResultWriter:
+    """Writes results as JSONL, or CSV when the output path ends in .csv."""
+
+    def __init__(self, path):
+        self._file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        self._csv = None
+        if path.lower().endswith('.csv'):
+            self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, result):
+        if self._csv:
+            row = dict(result)
+            for key in ("errors", "warnings", "rejection_reasons"):
+                row[key] = " | ".join(row[key])
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def _chunks(records, size):
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(input_path, output_path, pathway="player", workers=None, chunk_size=500):
+    """
+    Screens every record in input_path and writes results in input order.
+    At most two chunks per worker are in flight, so memory stays bounded
+    regardless of the input size. Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {APPROVED: 0, NOT_ELIGIBLE: 0, INVALID: 0}
+    writer = ResultWriter(output_path)
+    started = time.perf_counter()
+
+    def consume(results):
+        for result in results:
+            counts[result["verdict"]] += 1
+            writer.write(result)
+
+    try:
+        chunks = _chunks(read_records(input_path), chunk_size)
+        if workers == 1:
+            for chunk in chunks:
+                consume(screen_chunk(chunk, pathway))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(pool.submit(screen_chunk, chunk, pathway))
+                    if len(in_flight) >= workers * 2:
+                        consume(in_flight.popleft().result())
+                while in_flight:
+                    consume(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    return {"records": total, "seconds": elapsed,
+            "records_per_second": total / elapsed if elapsed else 0.0, **counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and score player/coach applications in bulk.")
+    parser.add_argument("input", help="CSV or JSONL file of applications")
+    parser.add_argument("-o", "--output", default="-", help="results file (.jsonl or .csv); '-' for stdout")
+    parser.add_argument("--pathway", choices=sorted(PATHWAYS), default="player",
+                        help="pathway for records without a 'pathway' column")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="records per work unit")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, args.pathway, args.workers, args.chunk_size)
+    print(f"Screened {summary['records']} records in {summary['seconds']:.2f}s "
+          f"({summary['records_per_second']:.0f} records/s): "
+          f"{summary[APPROVED]} approved, {summary[NOT_ELIGIBLE]} not eligible, {summary[INVALID]} invalid.",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,752 @@
+# benchmarks.py
+"""
+Latency benchmarks for the hot paths of a chat turn, on fixed synthetic corpora.
+
+    python benchmarks.py run -o results.json                 # time everything, write JSON
+    python benchmarks.py run --only validate_player_input    # a subset
+    python benchmarks.py compare baseline.json results.json  # exit 1 on regression
+    python benchmarks.py run --budgets                       # exit 1 when over BUDGETS
+    python benchmarks.py memory                              # bytes per chat session
+    python benchmarks.py load --concurrency 400              # load-test a running api_server.py
+
+Corpora are generated from a fixed seed, so every run times the same inputs:
+valid, invalid and warning-triggering player/coach submissions, and mixed
+router prompts. Results hold per-call latency percentiles (p50/p95/p99) in
+microseconds. The LLM path runs against a stubbed HTTP transport, so it
+measures payload building, caching and parsing, not the network. Reports and
+session checkpoints are written to throwaway stores. import_time and the rerun
+benchmarks cover cold start and the Streamlit per-interaction overhead.
+`memory` measures what one mentorship session holds after 10/100/1000 turns,
+as a SessionState and as the plain dicts and lists it replaced. `load` keeps
+--concurrency clients busy against api_server.py for --seconds, each running
+conversations, application submissions and talent ID lookups from the same
+corpora, and reports requests per second, latency percentiles and status codes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+CORPUS_SEED = 13
+DEFAULT_ITERATIONS = 2000
+DEFAULT_THRESHOLD = 0.20  # fail compare when a percentile is more than 20% slower
+IMPORT_SAMPLES = 10  # each one starts a fresh interpreter
+RERUN_SAMPLES = 50
+RANKING_CANDIDATES = 100_000
+MEMORY_TURNS = (10, 100, 1000)
+MEMORY_MESSAGES = 40_000  # messages built per measurement: 2000 sessions of 10 turns, 20 of 1000
+LOAD_URL = "http://127.0.0.1:8000"
+LOAD_CONCURRENCY = 400
+LOAD_SECONDS = 30
+
+# Absolute latency budgets checked by `run --budgets`, in microseconds
+BUDGETS = {
+    "import_time": {"p50_us": 150_000},  # app modules on top of an already imported Streamlit
+    "rerun": {"p50_us": 15_000},  # includes ~3 ms of AppTest harness overhead
+    "rerun_turn": {"p50_us": 20_000},
+    "session_save": {"p50_us": 1_000},
+    "session_load": {"p50_us": 1_000},
+}
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_NAMES = ["John", "Jane", "Ade", "Chinedu", "Maria", "Luis", "Kwame", "Aisha", "Tom", "Yusuf"]
+LAST_NAMES = ["Doe", "Smith", "Okafor", "Mensah", "Garcia", "O'Neil", "Balogun", "Silva", "Kane", "Diallo"]
+POSITIONS = ["Striker", "CB", "goalkeeper", "Left Wing", "CDM", "keeper", "Centre Back", "RB"]
+CERTIFICATIONS = ["UEFA Pro", "CAF A", "USSF A", "FIFA diploma", "B license", "A license"]
+SPECIALTIES = ["Youth Development", "Tactics", "Goalkeeping", "Fitness", "Set Pieces"]
+ROUTER_PROMPTS = [
+    "hi", "I'm new here", "existing member, here is my talent id", "what is the next step?",
+    "can I get the recruitment form", "I want to join as a player", "interested in coaching development",
+    "tell me about your programs", "how do I progress to the trials form", "no id yet but I want to enroll",
+    "I mentor young players and manage a team", "what facilities does the academy have?",
+]
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def player_corpus(rng, size):
+    """Comma-separated player submissions: 60% valid, 20% warning-triggering, 20% invalid."""
+    submissions = []
+    for i in range(size):
+        kind = i % 5
+        if kind < 3:
+            fields = [_name(rng), str(rng.randint(16, 24)), rng.choice(POSITIONS), str(rng.randint(3, 10)),
+                      rng.choice(["Semi-pro", "Professional"]),
+                      f"5'{rng.randint(6, 11)} {rng.randint(140, 190)}lbs right foot pace {rng.randint(6, 10)}",
+                      "Regional Cup winner", f"http://youtube.com/{i}", "Yes"]
+        elif kind == 3:
+            fields = [_name(rng), str(rng.randint(25, 30)), "keeper", str(rng.randint(1, 2)), "pro",
+                      "tall", "x", "yes", rng.choice(["Yes", "No"])]
+        else:
+            fields = ["J" + str(i), str(rng.randint(8, 13)), "Q", "x", "amateur", "short", "x", "maybe", "No"]
+        submissions.append(", ".join(fields))
+    return submissions
+
+
+def coach_corpus(rng, size):
+    """Comma-separated coach submissions: 60% valid, 20% warning-triggering, 20% invalid."""
+    submissions = []
+    for i in range(size):
+        kind = i % 5
+        if kind < 3:
+            fields = [_name(rng), str(rng.randint(32, 55)), str(rng.randint(8, 25)), rng.choice(CERTIFICATIONS),
+                      rng.choice(SPECIALTIES), "Head Coach U19s Dynamo", "Yes", "Immediately"]
+        elif kind == 3:
+            fields = [_name(rng), str(rng.randint(70, 80)), str(rng.randint(40, 50)), "B license",
+                      rng.choice(SPECIALTIES), "manager", "Yes", "Now"]
+        else:
+            fields = ["C" + str(i), "x", "-1", "none", "", "", "maybe", ""]
+        submissions.append(", ".join(fields))
+    return submissions
+
+
+REPLY_SENTENCES = [
+    "Focus on your first touch by receiving the ball on the half-turn in every session.",
+    "Two extra sessions a week on your weaker foot will pay off within a season.",
+    "Scouts at the next level look at decision-making as much as technique.",
+    "Keep a training diary so your coach can see how your workload changes.",
+    "Recovery matters: sleep, hydration and mobility work keep you available for selection.",
+    "🎯 Set one measurable goal for the next month, such as completed passes under pressure.",
+    "Watch full matches of players in your position and note their movement off the ball.",
+    "Ask your coach for video clips of your last match and review them together.",
+    "Short sprints with changes of direction build the acceleration a winger needs.",
+    "Communication with your back line is part of a goalkeeper's job from the first minute.",
+]
+
+
+def reply_corpus(rng, size):
+    """Assistant replies of 3-8 sentences, like Gemini's mentorship answers."""
+    return [" ".join(rng.choice(REPLY_SENTENCES) for _ in range(rng.randint(3, 8))) for _ in range(size)]
+
+
+def router_corpus(rng, size):
+    return [rng.choice(ROUTER_PROMPTS) for _ in range(size)]
+
+
+def conversation_corpus(rng, size):
+    """Whole conversations mixing every route of the engine."""
+    players, coaches = player_corpus(rng, size), coach_corpus(rng, size)
+    conversations = []
+    for i in range(size):
+        route = i % 4
+        if route == 0:
+            conversations.append(["hi", "I'm new", "tell me about the academy", "player", players[i], "yes"])
+        elif route == 1:
+            conversations.append(["new", "coaching", coaches[i], "y"])
+        elif route == 2:
+            conversations.append(["existing", rng.choice(["P001", "C001", "Z999"]), "what is the next step form?"])
+        else:
+            conversations.append([rng.choice(ROUTER_PROMPTS) for _ in range(4)])
+    return conversations
+
+
+class StubTransport(BaseAdapter):
+    """requests adapter that answers every generateContent call locally."""
+
+    def __init__(self, reply="Our academy programs build careers step by step."):
+        super().__init__()
+        self.body = json.dumps({"candidates": [{"content": {"parts": [{"text": reply}]}}]}).encode("utf-8")
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.body
+        response.headers["Content-Type"] = "application/json"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def percentiles(samples_ns):
+    ordered = sorted(samples_ns)
+    count = len(ordered)
+
+    def pick(fraction):
+        return ordered[min(count - 1, int(fraction * count))] / 1000
+
+    total = sum(ordered)
+    return {
+        "iterations": count,
+        "mean_us": total / count / 1000,
+        "p50_us": pick(0.50),
+        "p95_us": pick(0.95),
+        "p99_us": pick(0.99),
+        "ops_per_sec": count / (total / 1e9) if total else 0.0,
+    }
+
+
+def time_calls(function, inputs, iterations, warmup=100):
+    """Calls function(item) over the inputs (cycled) and returns latency stats."""
+    for i in range(min(warmup, iterations)):
+        function(inputs[i % len(inputs)])
+    samples = []
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        started = clock()
+        function(item)
+        samples.append(clock() - started)
+    return percentiles(samples)
+
+
+# --- Benchmarks: each takes (rng, iterations) and returns latency stats ---
+
+def bench_contains_any_keyword(rng, iterations):
+    from utils import contains_any_keyword
+    keywords = ["next stage", "next step", "recruitment form", "trials form", "progress", "application", "form"]
+    prompts = router_corpus(rng, 500)
+    return time_calls(lambda prompt: contains_any_keyword(prompt, keywords), prompts, iterations)
+
+
+def bench_validate_player_input(rng, iterations):
+    from player_agent import validate_player_input
+    submissions = [[item.strip() for item in text.split(",")] for text in player_corpus(rng, 500)]
+    return time_calls(lambda inputs: validate_player_input(list(inputs)), submissions, iterations)
+
+
+def bench_validate_coach_input(rng, iterations):
+    from coach_agent import validate_coach_input
+    submissions = [[item.strip() for item in text.split(",")] for text in coach_corpus(rng, 500)]
+    return time_calls(lambda inputs: validate_coach_input(list(inputs)), submissions, iterations)
+
+
+def _validated_records(schema, submissions):
+    records = []
+    for text in submissions:
+        inputs = [item.strip() for item in text.split(",")]
+        errors, warnings = schema.validate(inputs)
+        if not errors:
+            records.append(dict(zip(schema.keys, inputs), warnings=warnings, received_at=time.time()))
+    return records
+
+
+def bench_generate_scouting_report(rng, iterations):
+    from conversation_engine import SessionState
+    from player_agent import generate_scouting_report
+    from validation import PLAYER_SCHEMA
+    records = _validated_records(PLAYER_SCHEMA, player_corpus(rng, 500))
+
+    def run(record):
+        state = SessionState(scouting_mode=True, scouting_data=dict(record))
+        generate_scouting_report(state)
+
+    return time_calls(run, records, iterations)
+
+
+def bench_generate_coach_recruitment_report(rng, iterations):
+    from coach_agent import generate_coach_recruitment_report
+    from conversation_engine import SessionState
+    from validation import COACH_SCHEMA
+    records = _validated_records(COACH_SCHEMA, coach_corpus(rng, 500))
+
+    def run(record):
+        state = SessionState(coach_recruitment_mode=True, coach_recruitment_data=dict(record))
+        generate_coach_recruitment_report(state)
+
+    return time_calls(run, records, iterations)
+
+
+def bench_routing(rng, iterations):
+    """One engine turn (state machine, keyword routing, agents) with a stub LLM responder."""
+    from conversation_engine import ConversationEngine, SessionState
+    engine = ConversationEngine(lambda prompt, state: ["Our academy programs build careers."])
+    turns = []
+    for conversation in conversation_corpus(rng, 200):
+        state = SessionState()
+        engine.start(state)
+        for message in conversation:
+            turns.append((SessionState.from_dict(state.to_dict()), message))
+            engine.handle(state, message)
+
+    # Each timed turn starts from a snapshot of the conversation just before it
+    prepared = [(SessionState.from_dict(state.to_dict()), message) for state, message in turns]
+    samples = []
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        if i and i % len(prepared) == 0:
+            prepared = [(SessionState.from_dict(state.to_dict()), message) for state, message in turns]
+        state, message = prepared[i % len(prepared)]
+        started = clock()
+        engine.handle(state, message)
+        samples.append(clock() - started)
+    return percentiles(samples)
+
+
+def bench_faq_lookup(rng, iterations):
+    """FAQ index lookup over curated questions mixed with prompts that miss."""
+    from faq_cache import CURATED_FAQ, FaqCache
+    faq = FaqCache(approved_path=None, pending_path=None)
+    questions = [question for item in CURATED_FAQ for question in item["questions"]] + router_corpus(rng, 100)
+    return time_calls(faq.lookup, questions, iterations)
+
+
+def bench_rank_players(rng, iterations):
+    """Scoring, filtering and top-20 selection over a 100k-candidate roster."""
+    from ranking import Roster, rank_players
+    from validation import VALID_POSITIONS
+    levels = ["Elite", "Advanced", "Intermediate", "Semi-professional", "Professional", "Amateur"]
+    candidates = [
+        (f"P{i:06d}", _name(rng), i % 2, rng.randint(14, 32), rng.randint(0, 10), rng.choice(levels),
+         rng.choice(VALID_POSITIONS), rng.randint(1, 10) if i % 2 else float("nan"))
+        for i in range(RANKING_CANDIDATES)
+    ]
+    roster = Roster.from_candidates(candidates)
+    queries = [(rng.choice(VALID_POSITIONS), rng.choice([None, 21]), rng.random() < 0.5) for _ in range(50)]
+    return time_calls(lambda query: rank_players(roster, query[0], 20, max_age=query[1], eligible_only=query[2]),
+                      queries, iterations)
+
+
+def bench_get_gemini_response(rng, iterations):
+    """
+    Sync LLM path on a stubbed transport; unique messages so every call misses
+    the cache. The scheduler runs without limits, so only its overhead is timed.
+    """
+    import gemini_service
+    import scheduler
+    from conversation_engine import SessionState
+    from gemini_client import get_client
+
+    session = get_client(gemini_service.GEMINI_API_KEY).session
+    previous = session.adapters["https://"]
+    session.mount("https://", StubTransport())
+    previous_scheduler = scheduler.get_scheduler()
+    scheduler._scheduler = scheduler.Scheduler(rpm=0, tpm=0, max_concurrent=0)
+    try:
+        state = SessionState(user_type="new_user_general_inquiry")
+        history = router_corpus(rng, 40)
+        for i, text in enumerate(history):
+            state.messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": text})
+        messages = [f"{prompt} #{i}" for i, prompt in enumerate(router_corpus(rng, iterations + 100))]
+        return time_calls(lambda message: gemini_service.get_gemini_response(message, "bench-key", state), messages, iterations)
+    finally:
+        session.mount("https://", previous)
+        scheduler._scheduler = previous_scheduler
+
+
+def _session_store():
+    from session_store import SessionStore, SQLiteSessionBackend
+    return SessionStore(SQLiteSessionBackend(os.path.join(tempfile.mkdtemp(prefix="bench-sessions-"), "sessions.sqlite3")))
+
+
+def bench_session_save(rng, iterations):
+    """Checkpoint after a mentorship turn (one question, one reply) to the SQLite session store."""
+    from session_state import SessionState
+    store = _session_store()
+    state = SessionState(user_type="existing_player", mentorship_mode=True)
+    turns = list(zip(router_corpus(rng, 100), reply_corpus(rng, 100)))
+
+    def turn(pair):
+        state.add_message("user", pair[0])
+        state.add_message("assistant", pair[1])
+        started = time.perf_counter_ns()
+        store.save("bench", state)
+        return time.perf_counter_ns() - started
+
+    for i in range(min(100, iterations)):
+        turn(turns[i % len(turns)])
+    return percentiles([turn(turns[i % len(turns)]) for i in range(iterations)])
+
+
+def bench_session_load(rng, iterations):
+    """Rehydrating 1000 sessions of 50 turns each from the SQLite session store."""
+    from session_state import SessionState
+    store = _session_store()
+    replies = reply_corpus(rng, 100)
+    session_ids = [f"bench-{i}" for i in range(1000)]
+    for session_id in session_ids:
+        state = SessionState(user_type="existing_player", mentorship_mode=True)
+        for turn in range(50):
+            state.add_message("user", rng.choice(ROUTER_PROMPTS))
+            state.add_message("assistant", rng.choice(replies))
+        store.save(session_id, state)
+    return time_calls(store.load, session_ids, iterations)
+
+
+def bench_import_time(rng, iterations):
+    """Cold import of the modules appp.py loads, each sample in a fresh interpreter."""
+    code = ("import time, streamlit; started = time.perf_counter_ns(); "
+            "import config, conversation_engine, metrics; print(time.perf_counter_ns() - started)")
+    samples = []
+    for _ in range(min(iterations, IMPORT_SAMPLES)):
+        result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+        samples.append(int(result.stdout.strip().splitlines()[-1]))
+    return percentiles(samples)
+
+
+def _app_test():
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(APP_DIR, "appp.py"), default_timeout=30)
+    app.run()
+    return app
+
+
+def _time_app(step, iterations, clear_every=None):
+    previous = os.getcwd()
+    os.chdir(APP_DIR)  # the app reads its logo relative to the working directory
+    try:
+        app = _app_test()
+        samples = []
+        clock = time.perf_counter_ns
+        for i in range(min(iterations, RERUN_SAMPLES)):
+            if clear_every and i and i % clear_every == 0:
+                app.button(key="clear_chat").click().run()  # Clear Chat, so history length stays comparable
+            started = clock()
+            step(app)
+            samples.append(clock() - started)
+        return percentiles(samples)
+    finally:
+        os.chdir(previous)
+
+
+def bench_rerun(rng, iterations):
+    """A full Streamlit rerun of appp.py with no new input, e.g. after a widget interaction."""
+    return _time_app(lambda app: app.run(), iterations)
+
+
+def bench_rerun_turn(rng, iterations):
+    """A rerun carrying a chat message that is answered without the LLM, with up to 20 messages shown."""
+    prompts = ["hi", "what can you do?", "hello there"]
+    return _time_app(lambda app: app.chat_input[0].set_value(rng.choice(prompts)).run(), iterations, clear_every=10)
+
+
+BENCHMARKS = {
+    "contains_any_keyword": bench_contains_any_keyword,
+    "validate_player_input": bench_validate_player_input,
+    "validate_coach_input": bench_validate_coach_input,
+    "generate_scouting_report": bench_generate_scouting_report,
+    "generate_coach_recruitment_report": bench_generate_coach_recruitment_report,
+    "routing": bench_routing,
+    "faq_lookup": bench_faq_lookup,
+    "rank_players": bench_rank_players,
+    "get_gemini_response": bench_get_gemini_response,
+    "session_save": bench_session_save,
+    "session_load": bench_session_load,
+    "import_time": bench_import_time,
+    "rerun": bench_rerun,
+    "rerun_turn": bench_rerun_turn,
+}
+
+
+def run_benchmarks(names=None, iterations=DEFAULT_ITERATIONS):
+    """Runs the named benchmarks (all by default) and returns the results document."""
+    import application_store
+    import session_store
+
+    # Reports append to the application store; keep benchmark records out of the real one
+    application_store._store = application_store.ApplicationStore(tempfile.mkdtemp(prefix="bench-store-"))
+    # Likewise for the checkpoints appp.py writes during the rerun benchmarks
+    session_store._store = _session_store()
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](random.Random(CORPUS_SEED), iterations)
+    application_store._store.close()
+    return {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "corpus_seed": CORPUS_SEED,
+        },
+        "benchmarks": results,
+    }
+
+
+def check_budgets(document, budgets=BUDGETS):
+    """(benchmark, metric, budget, measured) for every budget the results exceed."""
+    violations = []
+    for name, limits in budgets.items():
+        stats = document["benchmarks"].get(name)
+        if stats is None:
+            continue
+        for metric, limit in limits.items():
+            if stats[metric] > limit:
+                violations.append((name, metric, limit, stats[metric]))
+    return violations
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, metrics=("p50_us", "p95_us")):
+    """
+    Compares two results documents. Returns a list of (benchmark, metric,
+    baseline, current, change) rows and the subset that regressed past threshold.
+    """
+    rows, regressions = [], []
+    for name, base in baseline["benchmarks"].items():
+        now = current["benchmarks"].get(name)
+        if now is None:
+            continue
+        for metric in metrics:
+            change = now[metric] / base[metric] - 1 if base[metric] else 0.0
+            row = (name, metric, base[metric], now[metric], change)
+            rows.append(row)
+            if change > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def print_results(document, stream=sys.stderr):
+    print(f"{'benchmark':36} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'ops/s':>12}", file=stream)
+    for name, stats in document["benchmarks"].items():
+        print(f"{name:36} {stats['p50_us']:10.1f} {stats['p95_us']:10.1f} {stats['p99_us']:10.1f} "
+              f"{stats['ops_per_sec']:12,.0f}", file=stream)
+
+
+def session_memory(turns, sessions, compact):
+    """Traced bytes per session for `sessions` mentorship sessions of `turns` turns each."""
+    import gc
+    import tracemalloc
+    from types import MappingProxyType
+    from session_state import SessionState
+
+    rng = random.Random(CORPUS_SEED)
+    prompts, replies = router_corpus(rng, 200), reply_corpus(rng, 200)
+    profile = {"name": "Marcus Johnson", "age": 19, "position": "CB", "years_played": 4, "level": "Advanced",
+               "current_club": "Youth Academy FC"}
+    shared_profile = MappingProxyType(profile)  # what the registry hands every session
+    plain_fields = SessionState().to_dict()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = []
+    for session in range(sessions):
+        if compact:
+            state = SessionState(user_type="existing_player", user_data=shared_profile, mentorship_mode=True,
+                                 initial_question_asked=True)
+            add = state.add_message
+        else:
+            state = {**plain_fields, "messages": [], "user_type": "existing_player", "user_data": dict(profile),
+                     "mentorship_mode": True, "initial_question_asked": True, "conversation_summary": {"text": "", "covered": 0}}
+            add = lambda role, content, messages=state["messages"]: messages.append({"role": role, "content": content})
+        for turn in range(turns):
+            # Fresh string objects, as every real message is
+            add("user", f"{prompts[(session + turn) % len(prompts)]} ({turn})")
+            add("assistant", f"{replies[(session * 7 + turn) % len(replies)]}\n")
+        held.append(state)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / sessions
+
+
+def run_memory(turn_counts=MEMORY_TURNS):
+    """Bytes per session at each turn count, for the compact SessionState and the plain representation."""
+    results = {}
+    for turns in turn_counts:
+        sessions = max(1, MEMORY_MESSAGES // (2 * turns))
+        plain = session_memory(turns, sessions, compact=False)
+        compact = session_memory(turns, sessions, compact=True)
+        results[str(turns)] = {"sessions": sessions, "plain_bytes": round(plain), "compact_bytes": round(compact),
+                               "ratio": plain / compact}
+    return {"meta": {"created_at": time.time(), "python": platform.python_version(), "corpus_seed": CORPUS_SEED},
+            "memory": results}
+
+
+class _LoadConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client for `load`: one request at a time over
+    one connection. Lighter than httpx, so the load generator doesn't use up
+    the CPU the server under test needs.
+    """
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        import asyncio
+
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = b"" if body is None else json.dumps(body).encode("utf-8")
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        if token is not None:
+            head += f"Authorization: Bearer {token}\r\n"
+        try:
+            self.writer.write(head.encode("ascii") + b"\r\n" + payload)
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionResetError("connection closed by the server")
+            length, close = 0, False
+            while (line := await self.reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "connection" and value.strip().lower() == "close":
+                    close = True
+            content = await self.reader.readexactly(length)
+        except BaseException:
+            self.close()
+            raise
+        if close:
+            self.close()
+        return int(status_line.split()[1]), content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _load_client(connection, rng, stop_at, samples, statuses):
+    """One simulated API client: conversations, application submissions and talent lookups until stop_at."""
+    players, coaches = player_corpus(rng, 50), coach_corpus(rng, 50)
+    conversations = conversation_corpus(rng, 50)
+
+    async def call(method, path, body=None, token=None):
+        started = time.perf_counter_ns()
+        try:
+            status, content = await connection.request(method, path, body, token)
+        except Exception as e:  # connection refused or reset
+            status, content = type(e).__name__, None
+        samples.append(time.perf_counter_ns() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+        return status, content
+
+    while time.monotonic() < stop_at:
+        kind = rng.random()
+        if kind < 0.4:
+            status, content = await call("POST", "/v1/sessions")
+            if status != 201:
+                continue
+            token = json.loads(content)["session_token"]
+            for message in rng.choice(conversations):
+                if time.monotonic() >= stop_at:
+                    break
+                await call("POST", "/v1/chat", {"message": message}, token)
+        elif kind < 0.7:
+            pathway, corpus = rng.choice((("player", players), ("coach", coaches)))
+            await call("POST", f"/v1/applications/{pathway}", {"submission": rng.choice(corpus), "confirm": True})
+        else:
+            await call("GET", f"/v1/talent/{rng.choice(['P001', 'P002', 'C001', 'Z999'])}")
+    connection.close()
+
+
+async def _run_load(url, concurrency, seconds):
+    import asyncio
+    from urllib.parse import urlsplit
+
+    address = urlsplit(url)
+    samples, statuses = [], {}
+    stop_at = time.monotonic() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _load_client(_LoadConnection(address.hostname, address.port or 80), random.Random(CORPUS_SEED + i),
+                     stop_at, samples, statuses)
+        for i in range(concurrency)
+    ))
+    return samples, statuses, time.perf_counter() - started
+
+
+def run_load(url=LOAD_URL, concurrency=LOAD_CONCURRENCY, seconds=LOAD_SECONDS):
+    """Drives a running api_server.py with `concurrency` clients for `seconds`. Returns the results document."""
+    import asyncio
+
+    samples, statuses, elapsed = asyncio.run(_run_load(url, concurrency, seconds))
+    stats = percentiles(samples)
+    stats["ops_per_sec"] = len(samples) / elapsed
+    return {"meta": {"created_at": time.time(), "python": platform.python_version(), "url": url,
+                     "concurrency": concurrency, "seconds": round(elapsed, 1), "requests": len(samples)},
+            "load": {**stats, "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)}}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chat hot paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runner = commands.add_parser("run", help="run benchmarks and write JSON results")
+    runner.add_argument("-o", "--output", help="results file (default: stdout)")
+    runner.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run")
+    runner.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    runner.add_argument("--budgets", action="store_true", help="exit 1 when a result exceeds BUDGETS")
+    memory = commands.add_parser("memory", help="measure bytes held per chat session")
+    memory.add_argument("-o", "--output", help="results file (default: stdout)")
+    memory.add_argument("--turns", type=int, nargs="+", default=list(MEMORY_TURNS))
+    load = commands.add_parser("load", help="load-test a running api_server.py")
+    load.add_argument("-o", "--output", help="results file (default: stdout)")
+    load.add_argument("--url", default=LOAD_URL)
+    load.add_argument("--concurrency", type=int, default=LOAD_CONCURRENCY, help="simultaneous clients")
+    load.add_argument("--seconds", type=float, default=LOAD_SECONDS)
+    comparer = commands.add_parser("compare", help="compare results against a stored baseline")
+    comparer.add_argument("baseline")
+    comparer.add_argument("current")
+    comparer.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                          help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        document = run_benchmarks(args.only, args.iterations)
+        print_results(document)
+        text = json.dumps(document, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        if args.budgets:
+            violations = check_budgets(document)
+            for name, metric, limit, measured in violations:
+                print(f"{name} {metric} {measured:,.0f} us is over its {limit:,.0f} us budget.", file=sys.stderr)
+            return 1 if violations else 0
+        return 0
+
+    if args.command == "memory":
+        document = run_memory(args.turns)
+        print(f"{'turns':>6} {'sessions':>9} {'plain B/session':>16} {'compact B/session':>18} {'ratio':>6}", file=sys.stderr)
+        for turns, row in document["memory"].items():
+            print(f"{turns:>6} {row['sessions']:>9} {row['plain_bytes']:>16,} {row['compact_bytes']:>18,} "
+                  f"{row['ratio']:>5.1f}x", file=sys.stderr)
+        text = json.dumps(document, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    if args.command == "load":
+        document = run_load(args.url, args.concurrency, args.seconds)
+        meta, stats = document["meta"], document["load"]
+        print(f"{meta['requests']:,} requests from {meta['concurrency']} clients in {meta['seconds']} s: "
+              f"{stats['ops_per_sec']:,.0f} req/s, p50 {stats['p50_us'] / 1000:.1f} ms, "
+              f"p99 {stats['p99_us'] / 1000:.1f} ms, statuses {stats['statuses']}", file=sys.stderr)
+        text = json.dumps(document, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    rows, regressions = compare(baseline, current, args.threshold)
+    for name, metric, base, now, change in rows:
+        flag = "  REGRESSION" if change > args.threshold else ""
+        print(f"{name:36} {metric:7} {base:10.1f} -> {now:10.1f} us ({change:+.0%}){flag}", file=sys.stderr)
+    if regressions:
+        print(f"{len(regressions)} regression(s) past {args.threshold:.0%}.", file=sys.stderr)
+        return 1
+    print("No regressions.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
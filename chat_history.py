@@ -0,0 +1,34 @@
+# chat_history.py
+"""
+What the chat view draws from a conversation's messages.
+
+Only the newest pages of the history are rendered; older turns stay in
+state.messages (for the LLM context and the transcript export) and are
+revealed a page at a time by the "load earlier" pager in appp.py.
+"""
+import textwrap
+from functools import lru_cache
+
+from config import CHAT_HISTORY_PAGE_SIZE
+
+
+def history_window(messages, pages=1, page_size=CHAT_HISTORY_PAGE_SIZE):
+    """Returns (number of hidden messages, the newest `pages` pages of messages)."""
+    shown = max(1, pages) * page_size
+    hidden = max(0, len(messages) - shown)
+    return hidden, messages[hidden:]
+
+
+@lru_cache(maxsize=4096)
+def rendered_markdown(content):
+    """
+    Markdown for one message, dedented and stripped once per distinct message
+    (reports are built from indented f-strings) rather than on every rerun.
+    """
+    return textwrap.dedent(content).strip()
+
+
+def transcript_markdown(messages):
+    """The whole conversation as a markdown document, for download."""
+    blocks = [f"**{message['role'].title()}:**\n\n{rendered_markdown(message['content'])}" for message in messages]
+    return "\n\n---\n\n".join(blocks) + "\n"
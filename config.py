@@ -1,3 +1,118 @@
 # config.py 
-GEMINI_API_KEY = ''
+import os
+
+from dotenv import load_dotenv
+
+# Read .env once per process, before any setting below is looked up
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 INITIAL_APPLICATION_FORM_URL = "https://forms.gle/CNRysREiz8WaoAny5"
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Point at a local stand-in (fake_gemini_server.py), e.g. http://127.0.0.1:8765/v1beta, to run without quota
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+# Response cache for get_gemini_response. A TTL of 0 disables caching;
+# set RESPONSE_CACHE_PATH (e.g. "response_cache.sqlite3") to keep answers across restarts.
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+
+# Pooled HTTP client for the Gemini endpoint (gemini_client.py)
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "10"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", "60"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_FACTOR = float(os.getenv("GEMINI_BACKOFF_FACTOR", "0.5"))
+
+# Admission control for Gemini calls (scheduler.py). A limit of 0 disables that check.
+# Each call is charged its estimated prompt tokens plus GEMINI_OUTPUT_TOKEN_ALLOWANCE.
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "60"))
+GEMINI_TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+GEMINI_MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "8"))
+GEMINI_QUEUE_SIZE = int(os.getenv("GEMINI_QUEUE_SIZE", "100"))
+GEMINI_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", "30"))
+GEMINI_OUTPUT_TOKEN_ALLOWANCE = int(os.getenv("GEMINI_OUTPUT_TOKEN_ALLOWANCE", "512"))
+
+# Tail-latency guards for Gemini calls (resilience.py). A call must answer (or,
+# streaming, start answering) within GEMINI_DEADLINE_SECONDS, queueing included.
+# A call still unanswered at the GEMINI_HEDGE_PERCENTILE of recent latencies gets
+# a duplicate request (0 turns hedging off). After GEMINI_BREAKER_FAILURES failures
+# in a row, callers get a fallback reply without trying Gemini, with one trial
+# call every GEMINI_BREAKER_RESET_SECONDS until one succeeds.
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "25"))
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+
+# Identical Gemini requests in flight at the same time share one HTTP call (singleflight.py)
+GEMINI_COALESCE = os.getenv("GEMINI_COALESCE", "1") == "1"
+
+# Conversation window sent to Gemini (context_window.py): the last messages go
+# verbatim, older ones are folded into a running summary, all within the budget
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "6000"))
+CONTEXT_KEEP_LAST_MESSAGES = int(os.getenv("CONTEXT_KEEP_LAST_MESSAGES", "12"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "800"))
+
+# Upload persona preambles once as Gemini cachedContents and reference them by
+# name (prompts.py). Gemini requires a minimum context size, so this is opt-in.
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+# Chat view (chat_history.py): messages rendered per rerun, older pages load on demand
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+
+# Per-session chat log (session_state.py): messages older than the newest
+# SESSION_PLAIN_MESSAGES are kept zlib-compressed, and a session holds at most
+# SESSION_MAX_MESSAGES (older ones live on only in the conversation summary)
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "400"))
+SESSION_PLAIN_MESSAGES = int(os.getenv("SESSION_PLAIN_MESSAGES", "20"))
+SESSION_COMPRESS_MIN_CHARS = int(os.getenv("SESSION_COMPRESS_MIN_CHARS", "200"))
+
+# Conversation checkpoints (session_store.py), so a session survives restarts and
+# can be served by any worker: "sqlite" (one file for every worker on the
+# machine), "memory" (this process only) or "off". Sessions idle for
+# SESSION_STORE_TTL_SECONDS are purged when the store opens.
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+SESSION_STORE_TTL_SECONDS = int(os.getenv("SESSION_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Headless JSON API (api_server.py), served by uvicorn: API_WORKERS processes,
+# each one event loop accepting up to API_MAX_CONCURRENCY requests at once
+# (503 beyond that). Workers share conversations through SESSION_STORE.
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "1000"))
+
+# Offline FAQ answers for general inquiries (faq_cache.py). Questions at least
+# FAQ_MATCH_THRESHOLD similar to an indexed one skip Gemini; Gemini replies are
+# queued in FAQ_PENDING_PATH until approved into FAQ_APPROVED_PATH.
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "1") == "1"
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.6"))
+FAQ_APPROVED_PATH = os.getenv("FAQ_APPROVED_PATH", "faq_approved.jsonl")
+FAQ_PENDING_PATH = os.getenv("FAQ_PENDING_PATH", "faq_pending.jsonl")
+
+# Academy registry database (academy_registry.py)
+ACADEMY_DB_PATH = os.getenv("ACADEMY_DB_PATH", "academy.sqlite3")
+ACADEMY_DB_POOL_SIZE = int(os.getenv("ACADEMY_DB_POOL_SIZE", "4"))
+ACADEMY_DB_CACHE_SIZE = int(os.getenv("ACADEMY_DB_CACHE_SIZE", "1024"))
+
+# Candidate ranking (ranking.py): the roster is rebuilt from the registry and the
+# application store when older than this
+RANKING_ROSTER_TTL_SECONDS = float(os.getenv("RANKING_ROSTER_TTL_SECONDS", "60"))
+
+# Append-only store of processed applications (application_store.py): records are
+# fsynced in batches every FLUSH_SECONDS and compacted into an indexed snapshot
+APPLICATION_STORE_DIR = os.getenv("APPLICATION_STORE_DIR", "application_store")
+APPLICATION_STORE_FLUSH_SECONDS = float(os.getenv("APPLICATION_STORE_FLUSH_SECONDS", "0.05"))
+APPLICATION_STORE_SEGMENT_BYTES = int(os.getenv("APPLICATION_STORE_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+APPLICATION_STORE_COMPACT_SEGMENTS = int(os.getenv("APPLICATION_STORE_COMPACT_SEGMENTS", "4"))
+
+# Per-turn timings and counters (metrics.py), exported in the Prometheus text format
+# on http://127.0.0.1:METRICS_PORT/metrics and/or to METRICS_PATH. Off by default.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) or None
+METRICS_PATH = os.getenv("METRICS_PATH")
+METRICS_EXPORT_SECONDS = float(os.getenv("METRICS_EXPORT_SECONDS", "15"))
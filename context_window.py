@@ -0,0 +1,76 @@
+# context_window.py
+"""
+Token-budgeted conversation window for Gemini requests.
+
+The last few turns are sent verbatim; everything older is folded into a
+running summary kept in session state. The summary is updated incrementally:
+each call only summarizes the turns evicted since the previous call, so long
+sessions never re-process their whole history.
+"""
+import re
+
+from config import CONTEXT_KEEP_LAST_MESSAGES, CONTEXT_MAX_TOKENS, CONTEXT_SUMMARY_MAX_TOKENS
+
+# Rough local estimate (~4 characters per token for English text); no tokenizer call needed
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 200
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def new_summary():
+    """Summary state for a fresh conversation: `covered` messages are folded into `text`."""
+    return {"text": "", "covered": 0}
+
+
+def summarize_turns(turns, summary="", max_tokens=CONTEXT_SUMMARY_MAX_TOKENS):
+    """
+    Default summarizer: appends one line per evicted turn (its first sentence)
+    to the existing summary, then drops the oldest lines to stay within max_tokens.
+    Any callable with this signature (e.g. an LLM-backed one) can replace it.
+    """
+    lines = [summary] if summary else []
+    for message in turns:
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        text = " ".join(message["content"].split())
+        first_sentence = _SENTENCE_END.split(text, 1)[0]
+        if len(first_sentence) > SUMMARY_LINE_CHARS:
+            first_sentence = first_sentence[:SUMMARY_LINE_CHARS].rstrip() + "..."
+        lines.append(f"- {speaker}: {first_sentence}")
+    summary = "\n".join(lines)
+    while estimate_tokens(summary) > max_tokens and "\n" in summary:
+        summary = summary.split("\n", 1)[1]
+    return summary
+
+
+def fit_context(messages, summary, fixed_tokens=0, max_tokens=CONTEXT_MAX_TOKENS,
+                keep_last=CONTEXT_KEEP_LAST_MESSAGES, summarizer=summarize_turns):
+    """
+    Chooses which messages to send verbatim and folds the rest into `summary`
+    (updated in place). `fixed_tokens` covers the parts always sent, such as the
+    system prompt and the new user message. The fixed part, the summary and
+    the verbatim messages together stay within max_tokens whenever they can.
+    Returns the list of messages to send verbatim.
+    """
+    if summary["covered"] > len(messages):
+        # The chat was cleared underneath us; start over
+        summary.update(new_summary())
+
+    keep_from = max(summary["covered"], len(messages) - keep_last)
+    recent_tokens = sum(estimate_tokens(message["content"]) for message in messages[keep_from:])
+    while True:
+        budget = max_tokens - fixed_tokens - estimate_tokens(summary["text"])
+        while keep_from < len(messages) and recent_tokens > budget:
+            recent_tokens -= estimate_tokens(messages[keep_from]["content"])
+            keep_from += 1
+        if keep_from <= summary["covered"]:
+            break
+        # Folding the evicted turns in grows the summary, which may evict more
+        summary["text"] = summarizer(messages[summary["covered"]:keep_from], summary["text"])
+        summary["covered"] = keep_from
+
+    return messages[keep_from:]
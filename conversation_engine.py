@@ -0,0 +1,267 @@
+# conversation_engine.py
+"""
+Headless conversation engine: all routing between the welcome flow, talent ID
+lookup, general inquiries, mentorship and the player/coach recruitment agents.
+
+A conversation is a compact SessionState object (session_state.py) that
+round-trips through to_dict()/from_dict(), so it can live in Streamlit's
+session, a database or a load-test loop. The engine holds no per-conversation state:
+
+    engine = ConversationEngine(responder=lambda prompt, state: ["Stub reply."])
+    state = SessionState()
+    engine.start(state)
+    state, reply = engine.handle(state, "I'm new")
+
+The responder produces LLM answers as an iterable of text chunks; by default
+it streams from Gemini. Swap in a stub to drive the engine without network
+calls (e.g. `python conversation_engine.py --turns 100000`).
+
+Async servers (api_server.py) run turns with handle_async() instead, which
+awaits a coroutine for LLM answers rather than streaming them:
+
+    state, reply = await engine.handle_async(state, message, respond=async_gemini_responder(api_key))
+"""
+import argparse
+import itertools
+import sys
+import tempfile
+import time
+
+from coach_agent import handle_coach_recruitment_agent
+from config import INITIAL_APPLICATION_FORM_URL
+from data_manager import get_user_data
+from metrics import timed
+from player_agent import handle_scouting_agent
+from session_state import SessionState, UserType
+from utils import KeywordMatcher
+
+WELCOME_MESSAGE = "Welcome to QUCOON Football Academy! Are you an **existing** member (with a talent ID) or **new** to our academy?"
+# Mentorship command for academy coaches: ranked candidates for a position (ranking.py)
+SHORTLIST_COMMAND = "/shortlist"
+PATHWAY_CHOICE = "\n\nWhen you're ready, let me know if you're interested in **Player Development** or **Coaching Development**."
+
+NEXT_STAGE_KEYWORDS = KeywordMatcher(["next stage", "next step", "recruitment form", "trials form", "progress", "application", "form"])
+# Set order is the routing priority: an ID mention wins over 'new'
+ENTRY_KEYWORDS = KeywordMatcher({
+    "talent_id": ["talent id", "talentid", "your id", "player id", "coach id", "existing"],
+    "new_user": ["new", "join", "enroll", "no id", "i'm new"],
+})
+PATHWAY_KEYWORDS = KeywordMatcher({
+    "player": ["player", "footballer", "aspiring player", "play", "join as player", "player development"],
+    "coach": ["coach", "coaching", "future coach", "manage", "mentor", "join as coach", "coaching development"],
+})
+
+
+def gemini_responder(api_key):
+    """Default responder: streams the answer from Gemini."""
+    def respond(prompt, state):
+        # Deferred so the HTTP stack is only imported once a turn needs the LLM
+        from gemini_service import stream_gemini_response
+
+        return stream_gemini_response(prompt, api_key, state)
+
+    return respond
+
+
+def async_gemini_responder(api_key):
+    """Responder for handle_async(): the whole answer from Gemini, awaited on the event loop."""
+    async def respond(prompt, state):
+        from gemini_service import get_gemini_response_async
+
+        return await get_gemini_response_async(prompt, api_key, state)
+
+    return respond
+
+
+class ConversationEngine:
+    def __init__(self, responder, faq=None):
+        # responder(prompt, state) -> iterable of text chunks
+        self.responder = responder
+        # Optional FaqCache (faq_cache.py) answering common general inquiries offline
+        self.faq = faq
+
+    def start(self, state):
+        """Adds the welcome message to a new conversation. Returns it, or None if already shown."""
+        if state.initial_question_asked:
+            return None
+        state.add_message("assistant", WELCOME_MESSAGE)
+        state.initial_question_asked = True
+        return WELCOME_MESSAGE
+
+    def handle(self, state, message):
+        """Runs one turn. `state` is updated in place and returned with the full reply."""
+        return state, "".join(self.stream(state, message))
+
+    def stream(self, state, message):
+        """
+        Runs one turn, yielding the reply in chunks as the responder produces
+        them. The reply is added to state.messages once it is complete.
+        """
+        state.questions_asked += 1
+        state.add_message("user", message)
+
+        response_text, response_stream, offer_pathway_choice = self._route(state, message, self.responder)
+        if response_stream is not None:
+            chunks = []
+            for chunk in response_stream:
+                chunks.append(chunk)
+                yield chunk
+            response_text = "".join(chunks)
+            if offer_pathway_choice and _mentions_academy(response_text):
+                yield PATHWAY_CHOICE
+                response_text += PATHWAY_CHOICE
+        else:
+            yield response_text
+
+        state.add_message("assistant", response_text)
+
+    async def handle_async(self, state, message, respond):
+        """
+        handle() for async callers: respond(prompt, state) is awaited for LLM
+        answers, so no thread is held while Gemini works. Calls for the same
+        `state` must not overlap.
+        """
+        state.questions_asked += 1
+        state.add_message("user", message)
+
+        # Routing stays synchronous; an LLM answer is filled into the list its
+        # (lazy) stream reads from before the stream is consumed
+        deferred = []
+        faq_misses = set()
+
+        def defer(prompt, state):
+            chunks = []
+            deferred.append((prompt, chunks))
+            return chunks
+
+        def watch(prompt, chunks):
+            # The FAQ cache is told about the answer once it has been awaited
+            faq_misses.add(prompt)
+            return chunks
+
+        response_text, response_stream, offer_pathway_choice = self._route(state, message, defer, watch)
+        if response_stream is not None:
+            for prompt, chunks in deferred:
+                started = time.perf_counter()
+                chunks.append(await respond(prompt, state))
+                if prompt in faq_misses:
+                    self.faq.record(prompt, chunks[-1], time.perf_counter() - started)
+            response_text = "".join(response_stream)
+            if offer_pathway_choice and _mentions_academy(response_text):
+                response_text += PATHWAY_CHOICE
+
+        state.add_message("assistant", response_text)
+        return state, response_text
+
+    @timed("route")
+    def _route(self, state, prompt, responder, faq_watch=None):
+        """
+        Returns (reply text, LLM chunk stream or None, whether to offer the
+        pathway choice). LLM answers to questions the FAQ cache missed pass
+        through faq_watch(prompt, chunks), FaqCache.watch by default.
+        """
+        # Priority to recruitment agents if active
+        if state.scouting_mode:
+            return handle_scouting_agent(state, prompt), None, False
+        if state.coach_recruitment_mode:
+            return handle_coach_recruitment_agent(state, prompt), None, False
+
+        if state.user_type in (UserType.EXISTING_PLAYER, UserType.EXISTING_COACH, UserType.NEW_COACH):
+            if state.user_type == UserType.EXISTING_COACH and prompt.lstrip().lower().startswith(SHORTLIST_COMMAND):
+                # Imported on first use: ranking.py pulls in NumPy
+                from ranking import shortlist_command
+
+                return shortlist_command(prompt.lstrip()[len(SHORTLIST_COMMAND):]), None, False
+            if NEXT_STAGE_KEYWORDS.contains(prompt):
+                return f"Here is the link to the official application form: [Application Form]({INITIAL_APPLICATION_FORM_URL})", None, False
+            return "", responder(prompt, state), False
+
+        if state.user_type is None:
+            entry = ENTRY_KEYWORDS.first_match(prompt)
+            if entry and entry[0] == "talent_id":
+                state.user_type = UserType.AWAITING_TALENT_ID
+                return "Please enter your QUCOON Academy talent ID (starts with P for players or C for coaches).", None, False
+            if entry and entry[0] == "new_user":
+                state.user_type = UserType.NEW_USER_GENERAL_INQUIRY
+                return "Welcome to QUCOON Football Academy! How can I help you today? Feel free to ask about our programs, facilities, or anything else about football careers. We're here to guide you.", None, False
+            return "To provide you with the best assistance, could you please confirm if you are an **existing** QUCOON Academy player/coach with a talent ID, or if you are **new** to our academy and interested in joining?", None, False
+
+        if state.user_type == UserType.AWAITING_TALENT_ID:
+            user_data, user_type_found = get_user_data(prompt.upper().strip())
+            if user_data:
+                state.user_type = f"existing_{user_type_found}"
+                state.user_data = user_data
+                state.mentorship_mode = True
+                return f"🎯 Welcome back, {state.user_data['name']}! How can I help your career today?", None, False
+            return "ID not recognized. Please re-enter or say 'new' to join.", None, False
+
+        if state.user_type == UserType.NEW_USER_GENERAL_INQUIRY:
+            pathway = PATHWAY_KEYWORDS.first_match(prompt)
+            if pathway and pathway[0] == "player":
+                state.scouting_mode = True
+                state.user_type = UserType.NEW_USER
+                return handle_scouting_agent(state, None), None, False
+            if pathway and pathway[0] == "coach":
+                state.coach_recruitment_mode = True
+                state.user_type = UserType.NEW_COACH
+                return handle_coach_recruitment_agent(state, None), None, False
+            if self.faq is None:
+                return "", responder(prompt, state), True
+            answer = self.faq.lookup(prompt)
+            if answer is not None:
+                return answer, None, False
+            return "", (faq_watch or self.faq.watch)(prompt, responder(prompt, state)), True
+
+        return "", None, False
+
+
+def _mentions_academy(reply):
+    lowered = reply.lower()
+    return "academy" in lowered or "program" in lowered or "career" in lowered
+
+
+# A mixed workload covering every route, used by the simulation below
+SIMULATED_CONVERSATIONS = [
+    ["hi", "existing", "P001", "what is the next step form?", "how do I improve my first touch?"],
+    ["I'm new", "tell me about the academy", "I want to be a player",
+     "John Doe, 18, Striker, 4, Semi-pro, 5'10 160lbs right foot pace 8, Regional Cup winner, http://youtube.com/2, Yes"],
+    ["new", "coaching", "Jane Smith, 35, 10, UEFA Pro, Youth Development, Head Coach U19s Dynamo, Yes, Immediately"],
+    ["new", "player", "J, 12, Q, x, amateur, short, x, maybe, No", "a,b"],
+    ["existing", "Z999", "new"],
+]
+
+
+def simulate(turns, engine=None):
+    """Drives `turns` turns through fresh conversations with a stub responder. Returns turns per second."""
+    import application_store
+
+    engine = engine or ConversationEngine(lambda prompt, state: ["Our academy programs build careers."])
+    scripts = itertools.cycle(SIMULATED_CONVERSATIONS)
+    # The scripted applications are recorded like real ones; keep them out of the real store
+    real_store = application_store._store
+    application_store._store = application_store.ApplicationStore(tempfile.mkdtemp(prefix="simulate-store-"))
+    done = 0
+    started = time.perf_counter()
+    try:
+        while done < turns:
+            state = SessionState()
+            engine.start(state)
+            for message in next(scripts)[:turns - done]:
+                engine.handle(state, message)
+                done += 1
+        elapsed = time.perf_counter() - started
+    finally:
+        application_store._store.close()
+        application_store._store = real_store
+    return turns / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure conversation engine throughput without a UI or network.")
+    parser.add_argument("--turns", type=int, default=100000)
+    args = parser.parse_args(argv)
+    print(f"{args.turns} simulated turns ({simulate(args.turns):,.0f} turns/s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
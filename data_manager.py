@@ -1,3 +1,8 @@
+import threading
+from academy_registry import AcademyRegistry
+from config import ACADEMY_DB_CACHE_SIZE, ACADEMY_DB_PATH, ACADEMY_DB_POOL_SIZE
+
+# Seed roster, loaded into the registry database the first time it is created
 ACADEMY_DATABASE = {
     "players": {
         "P001": {"name": "Marcus Johnson", "age": 19, "position": "CB", "years_played": 4, "level": "Advanced", "current_club": "Youth Academy FC"},
@@ -13,9 +18,22 @@ ACADEMY_DATABASE = {
     }
 }
 
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """
+    The academy registry (academy_registry.py), opened on first use.
+    ACADEMY_DATABASE above only seeds a brand-new database.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AcademyRegistry(
+                ACADEMY_DB_PATH, pool_size=ACADEMY_DB_POOL_SIZE,
+                cache_size=ACADEMY_DB_CACHE_SIZE, seed=ACADEMY_DATABASE,
+            )
+        return _registry
+
 def get_user_data(talent_id):
-    if talent_id.startswith('P') and talent_id in ACADEMY_DATABASE["players"]:
-        return ACADEMY_DATABASE["players"][talent_id], "player"
-    elif talent_id.startswith('C') and talent_id in ACADEMY_DATABASE["coaches"]:
-        return ACADEMY_DATABASE["coaches"][talent_id], "coach"
-    return None, None
\ No newline at end of file
+    return get_registry().get_user_data(talent_id)
@@ -0,0 +1,217 @@
+# fake_gemini_server.py
+"""
+Local stand-in for the Gemini REST API, for load tests and for exercising the
+error paths of gemini_service without network access or quota.
+
+It serves generateContent, streamGenerateContent (?alt=sse) and
+cachedContents under /v1beta. Replies come from a template, latency is drawn
+from a configurable distribution, and a fraction of requests can be made to
+fail with 429 (with Retry-After), 500 or a malformed JSON body.
+Bodies are raw UTF-8 JSON (non-ASCII text is not escaped), and the stream
+is sent as text/event-stream without a charset, so clients must decode it
+as UTF-8 themselves.
+
+    python fake_gemini_server.py --port 8765 --latency lognormal:0.4:0.3 --rate-429 0.05
+    GEMINI_API_BASE=http://127.0.0.1:8765/v1beta streamlit run appp.py
+
+Latency specs: "fixed:S", "uniform:LOW:HIGH", "normal:MEAN:STDDEV",
+"lognormal:MEDIAN:SIGMA" and "exponential:MEAN", all in seconds.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_TEMPLATE = "Thanks for your question about \"{message}\". At QUCOON Academy we focus on your football career."
+
+_MODEL_PATH = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+def parse_latency(spec):
+    """Turns a latency spec into a function returning a delay in seconds."""
+    kind, *params = spec.split(":")
+    values = [float(value) for value in params]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "lognormal": lambda: random.lognormvariate(math.log(values[0]), values[1]),
+        "exponential": lambda: random.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {kind}")
+    sampler = samplers[kind]
+    return lambda: max(0.0, sampler())
+
+
+class FakeGeminiOptions:
+    def __init__(self, template=DEFAULT_TEMPLATE, latency="fixed:0", rate_429=0.0, rate_500=0.0,
+                 rate_malformed=0.0, retry_after=1, stream_chunks=4, chunk_delay=0.0, seed=None):
+        self.template = template
+        self.latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_malformed = rate_malformed
+        self.retry_after = retry_after
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self.random = random.Random(seed)
+        self.counts = {"requests": 0, "ok": 0, "429": 0, "500": 0, "malformed": 0}
+        self.lock = threading.Lock()
+
+    def fault(self):
+        """Picks the injected failure for one request: '429', '500', 'malformed' or None."""
+        roll = self.random.random()
+        for name, rate in (("429", self.rate_429), ("500", self.rate_500), ("malformed", self.rate_malformed)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+    def count(self, outcome):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[outcome] += 1
+
+
+def _last_user_text(payload):
+    for content in reversed(payload.get("contents", [])):
+        if content.get("role") == "user":
+            return "".join(part.get("text", "") for part in content.get("parts", []))
+    return ""
+
+
+def _candidate(text, finish=True):
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+    server_version = "FakeGemini/1.0"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        options = self.server.options
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON payload received."}})
+
+        if url.path == "/v1beta/cachedContents":
+            return self._send_json(200, {"name": f"cachedContents/fake-{int(time.time() * 1000)}", "model": payload.get("model")})
+        match = _MODEL_PATH.match(url.path)
+        if match is None:
+            return self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {url.path}"}})
+
+        time.sleep(options.latency())
+        fault = options.fault()
+        options.count(fault or "ok")
+        if fault == "429":
+            return self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                                   "status": "RESOURCE_EXHAUSTED"}},
+                                   {"Retry-After": str(options.retry_after)})
+        if fault == "500":
+            return self._send_json(500, {"error": {"code": 500, "message": "An internal error has occurred.", "status": "INTERNAL"}})
+
+        message = _last_user_text(payload)
+        text = options.template.format(message=message, model=match.group("model"), turns=len(payload.get("contents", [])))
+        if match.group("method") == "streamGenerateContent" and query.get("alt") == ["sse"]:
+            return self._send_stream(text, malformed=fault == "malformed")
+        if fault == "malformed":
+            return self._send_raw(200, b'{"candidates": [{"content": {"parts": [{"text": "trunc', "application/json")
+        return self._send_json(200, _candidate(text))
+
+    def _send_json(self, status, body, headers=None):
+        self._send_raw(status, json.dumps(body, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def _send_raw(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, text, malformed=False):
+        options = self.server.options
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = text.split(" ")
+        size = max(1, math.ceil(len(words) / max(1, options.stream_chunks)))
+        pieces = [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            event = "data: " + ('{"candidates": [{"content": ' if malformed and last else json.dumps(_candidate(piece, last), ensure_ascii=False)) + "\r\n\r\n"
+            data = event.encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+            if options.chunk_delay and not last:
+                time.sleep(options.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_fake_server(host="127.0.0.1", port=0, **options):
+    """
+    Starts the fake server on a background thread. Returns (server, base_url);
+    pass base_url as GeminiClient(base_url=...) or GEMINI_API_BASE, and call
+    server.shutdown() when done. server.options.counts tallies the outcomes.
+    """
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.options = FakeGeminiOptions(**options)
+    threading.Thread(target=server.serve_forever, name="fake-gemini", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1beta"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Gemini API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE,
+                        help="reply text; may use {message}, {model} and {turns}")
+    parser.add_argument("--latency", default="fixed:0", help="latency distribution, e.g. uniform:0.2:0.8")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="fraction of replies with broken JSON")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--stream-chunks", type=int, default=4, help="chunks per streamed reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible fault injection")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.options = FakeGeminiOptions(
+        args.template, args.latency, args.rate_429, args.rate_500, args.rate_malformed,
+        args.retry_after, args.stream_chunks, args.chunk_delay, args.seed,
+    )
+    print(f"Fake Gemini API on http://{args.host}:{server.server_address[1]}/v1beta", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served: {server.options.counts}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+# faq_cache.py
+"""
+Offline FAQ answers for general inquiries, so common questions skip Gemini.
+
+Questions are matched against a TF-IDF index over curated Q/A pairs
+(CURATED_FAQ) and answers approved from earlier Gemini replies. A question
+whose cosine similarity with an indexed question reaches FAQ_MATCH_THRESHOLD
+is answered from the index; anything else goes to Gemini, and the reply is
+queued in FAQ_PENDING_PATH for review. A question that names players or
+coaches is only matched against entries about that role or about both. Approved answers are appended to
+FAQ_APPROVED_PATH and picked up by running apps within RELOAD_SECONDS:
+
+    python faq_cache.py ask "how old do I have to be?"   # best match and score
+    python faq_cache.py pending
+    python faq_cache.py approve Q-01JA...
+    python faq_cache.py reject Q-01JA...
+
+stats() reports the hit rate, lookup latency and the Gemini time saved,
+estimated from the latency of the replies that did go to Gemini.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter as TermCounts
+
+from config import FAQ_APPROVED_PATH, FAQ_MATCH_THRESHOLD, FAQ_PENDING_PATH
+from metrics import CACHE_HITS, FAQ_LOOKUPS, FAQ_SECONDS_SAVED, timed
+from talent_ids import new_talent_id
+from utils import tokenize_message
+
+# Seconds between checks for answers approved by another process
+RELOAD_SECONDS = 5
+
+# One-word questions ("coaches?") match too loosely to answer without Gemini
+MIN_QUERY_TERMS = 2
+
+# Replies in the wording gemini_service uses for failures; never queued for approval
+ERROR_PREFIXES = ("Sorry, couldn't process", "API error", "Unreadable API response",
+                  "Unexpected error", "Please enter your Gemini API Key", "⏳ We're answering",
+                  "⚠️ Our AI assistant is unavailable")
+
+STOPWORDS = frozenset("""
+a about an and any are as at be by can could do does for from have hi hello how i if im in
+is it know like me my of on or please so tell that the there this to want what whats when
+where which who will with would you your
+""".split())
+
+# Spelling variants folded into one term before weighting
+SYNONYMS = {"programme": "program", "course": "program", "pathway": "program", "cost": "fee",
+            "price": "fee", "tuition": "fee", "eligible": "eligibility", "requirement": "eligibility",
+            "criterion": "eligibility", "criteria": "eligibility", "qualification": "eligibility",
+            "old": "age", "young": "age", "tryout": "trial", "move": "relocate", "relocation": "relocate",
+            "highlight": "video"}
+
+# A question naming one role is never answered with an entry for the other
+ROLE_TERMS = {"player": frozenset({"player", "footballer"}), "coach": frozenset({"coach"})}
+
+# Several phrasings per answer; facts follow the eligibility rules in validation.py.
+# "role" is the applicant the answer is about: "player", "coach" or "any".
+CURATED_FAQ = [
+    {
+        "role": "any",
+        "questions": ["What programs do you offer?", "What does the academy offer?",
+                      "What pathways are there?", "Tell me about your programs"],
+        "answer": "QUCOON Football Academy has two pathways: **Player Development** for aspiring footballers "
+                  "and **Coaching Development** for experienced coaches. Say **player** or **coach** to start "
+                  "an application.",
+    },
+    {
+        "role": "player",
+        "questions": ["What is the age limit for players?", "How old do I have to be to join as a player?",
+                      "Am I too old to join?", "What ages do you accept?", "Minimum age to join"],
+        "answer": "Player applicants must be **16 to 24** years old. If you are older, our **Coaching "
+                  "Development** pathway may be a better fit.",
+    },
+    {
+        "role": "player",
+        "questions": ["What are the requirements for players?", "Who is eligible to join as a player?",
+                      "What do I need to get into the academy?", "Player eligibility criteria"],
+        "answer": "To be eligible as a player you need to be **16 to 24**, have **3 to 5 years** of organized "
+                  "football, play at a **semi-professional or professional** level, and be **available to "
+                  "relocate**. Say **player** to start your application.",
+    },
+    {
+        "role": "coach",
+        "questions": ["What are the requirements for coaches?", "Who can apply as a coach?",
+                      "Coach eligibility criteria", "What qualifications do coaches need?",
+                      "What is the age limit for coaches?", "How old do you have to be to coach?"],
+        "answer": "Coaching applicants need to be **30 or older** with **8+ years** of experience, a "
+                  "high-level certification (e.g. UEFA Pro or A License), previous **head or senior** coaching "
+                  "roles, and professional references. Say **coach** to start your application.",
+    },
+    {
+        "role": "any",
+        "questions": ["How do I apply?", "How do trials work?", "How can I sign up for trials?",
+                      "What is the application process?", "How do I get a trial?"],
+        "answer": "Tell me whether you are a **player** or a **coach** and I'll ask for all your details in one "
+                  "message. Your application is screened straight away; if you are eligible you get a talent ID "
+                  "and a link to the official application form.",
+    },
+    {
+        "role": "player",
+        "questions": ["Do I have to relocate?", "Is relocation required?", "Can I train remotely?"],
+        "answer": "Yes. Players must be **available to relocate** to be considered for the academy.",
+    },
+    {
+        "role": "player",
+        "questions": ["Do I need video highlights?", "Should I send a highlight video?"],
+        "answer": "Highlights are optional, but they help. If you have them, include a full link (e.g. YouTube) "
+                  "in your player application.",
+    },
+]
+
+
+def _stem(word):
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text):
+    """Content words of a question, lightly stemmed so 'trials' matches 'trial' and 'coaching' 'coach'."""
+    words, _ = tokenize_message(text)
+    stems = (_stem(word) for word in words if word not in STOPWORDS)
+    return [SYNONYMS.get(stem, stem) for stem in stems]
+
+
+def role_of(question_terms):
+    """"player" or "coach" if the terms name exactly one of them, else "any"."""
+    named = [role for role, role_terms in ROLE_TERMS.items() if role_terms.intersection(question_terms)]
+    return named[0] if len(named) == 1 else "any"
+
+
+class _Index:
+    """Immutable TF-IDF index: one L2-normalized vector per indexed question."""
+
+    def __init__(self, entries):
+        # entries: [(question, answer, role), ...]
+        self.entries = entries
+        documents = [TermCounts(terms(question)) for question, _, _ in entries]
+        doc_freq = TermCounts(term for counts in documents for term in counts)
+        self.size = len(documents)
+        self.idf = {term: math.log((1 + self.size) / (1 + df)) + 1 for term, df in doc_freq.items()}
+        self.unseen_idf = math.log(1 + self.size) + 1
+        self.postings = {}  # term -> [(entry index, weight), ...]
+        for index, counts in enumerate(documents):
+            for term, weight in self._vector(counts).items():
+                self.postings.setdefault(term, []).append((index, weight))
+
+    def _vector(self, counts):
+        vector = {term: (1 + math.log(count)) * self.idf.get(term, self.unseen_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+
+    def best(self, question):
+        """
+        Returns (cosine similarity, entry index) of the closest question, or
+        (0.0, None). Entries about the other role than the one the question
+        names are skipped.
+        """
+        query = TermCounts(terms(question))
+        if len(query) < MIN_QUERY_TERMS:
+            return 0.0, None
+        role = role_of(query)
+        scores = {}
+        for term, weight in self._vector(query).items():
+            for index, doc_weight in self.postings.get(term, ()):
+                if role == "any" or self.entries[index][2] in ("any", role):
+                    scores[index] = scores.get(index, 0.0) + weight * doc_weight
+        if not scores:
+            return 0.0, None
+        index = max(scores, key=scores.get)
+        return scores[index], index
+
+
+def _read_jsonl(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FaqCache:
+    def __init__(self, threshold=FAQ_MATCH_THRESHOLD, approved_path=FAQ_APPROVED_PATH,
+                 pending_path=FAQ_PENDING_PATH, curated=CURATED_FAQ):
+        self.threshold = threshold
+        self.approved_path = approved_path
+        self.pending_path = pending_path
+        self._curated = [(question, item["answer"], item.get("role", "any"))
+                         for item in curated for question in item["questions"]]
+        self._lock = threading.Lock()
+        self._approved_mtime = None
+        self._next_reload = 0.0
+        self._index = None
+        self._reload()
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def _reload(self):
+        """Rebuilds the index if the approved file changed since the last build."""
+        try:
+            mtime = os.stat(self.approved_path).st_mtime_ns if self.approved_path else None
+        except FileNotFoundError:
+            mtime = None
+        if self._index is not None and mtime == self._approved_mtime:
+            return
+        approved = [(record["question"], record["answer"], role_of(terms(record["question"])))
+                    for record in _read_jsonl(self.approved_path)]
+        self._index = _Index(self._curated + approved)
+        self._approved_mtime = mtime
+
+    def match(self, question):
+        """Returns (score, question, answer) for the closest indexed question, or (score, None, None)."""
+        now = time.monotonic()
+        if now >= self._next_reload:
+            with self._lock:
+                self._next_reload = now + RELOAD_SECONDS
+                self._reload()
+        index = self._index
+        score, position = index.best(question)
+        if position is None:
+            return score, None, None
+        question, answer, _ = index.entries[position]
+        return score, question, answer
+
+    @timed("faq_lookup")
+    def lookup(self, question):
+        """The indexed answer for question if it is a close enough match, else None."""
+        started = time.perf_counter()
+        score, _, answer = self.match(question)
+        hit = answer is not None and score >= self.threshold
+        with self._lock:
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+            if hit:
+                self.hits += 1
+                saved = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        FAQ_LOOKUPS.inc("hit" if hit else "miss")
+        if hit:
+            CACHE_HITS.inc("faq")
+            FAQ_SECONDS_SAVED.inc(amount=saved)
+            return answer
+        return None
+
+    def watch(self, question, chunks):
+        """Passes a Gemini reply stream through, then record()s it with the time it took."""
+        started = time.perf_counter()
+        received = []
+        for chunk in chunks:
+            received.append(chunk)
+            yield chunk
+        self.record(question, "".join(received), time.perf_counter() - started)
+
+    def record(self, question, answer, seconds):
+        """
+        Counts a Gemini answer to a question the index missed: its latency feeds
+        the time-saved estimate, and the answer is queued for approval.
+        """
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+        self.propose(question, answer)
+
+    def propose(self, question, answer):
+        """Queues a served answer for review. Returns its pending ID, or None if it was not queued."""
+        if not self.pending_path or not answer.strip() or answer.startswith(ERROR_PREFIXES):
+            return None
+        record = {"id": new_talent_id("Q"), "question": question, "answer": answer,
+                  "proposed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        with self._lock, open(self.pending_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record["id"]
+
+    def pending(self):
+        return _read_jsonl(self.pending_path)
+
+    def approve(self, pending_id, answer=None):
+        """Moves a pending answer (optionally edited) into the index. Returns the approved record."""
+        record = self._take_pending(pending_id)
+        approved = {"question": record["question"], "answer": answer or record["answer"],
+                    "approved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        with self._lock:
+            with open(self.approved_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(approved, ensure_ascii=False) + "\n")
+            self._reload()
+        return approved
+
+    def reject(self, pending_id):
+        return self._take_pending(pending_id)
+
+    def _take_pending(self, pending_id):
+        with self._lock:
+            records = self.pending()
+            matches = [record for record in records if record["id"] == pending_id]
+            if not matches:
+                raise KeyError(f"No pending answer with ID {pending_id}")
+            temp_path = f"{self.pending_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    if record["id"] != pending_id:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(temp_path, self.pending_path)
+        return matches[0]
+
+    def stats(self):
+        with self._lock:
+            average_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "indexed_questions": self._index.size,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "avg_lookup_ms": 1000 * self.lookup_seconds / self.lookups if self.lookups else 0.0,
+                "avg_gemini_seconds": average_llm,
+                "seconds_saved": self.hits * average_llm,
+            }
+
+
+_faq_cache = None
+_faq_cache_lock = threading.Lock()
+
+
+def get_faq_cache():
+    """The process-wide FAQ cache, built on first use."""
+    global _faq_cache
+    with _faq_cache_lock:
+        if _faq_cache is None:
+            _faq_cache = FaqCache()
+        return _faq_cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the FAQ index and review answers queued for it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ask = commands.add_parser("ask", help="show the closest indexed question and its score")
+    ask.add_argument("question")
+    commands.add_parser("pending", help="list answers waiting for approval")
+    approve = commands.add_parser("approve", help="add a pending answer to the index")
+    approve.add_argument("id")
+    approve.add_argument("--answer", help="replacement answer text")
+    reject = commands.add_parser("reject", help="discard a pending answer")
+    reject.add_argument("id")
+    args = parser.parse_args(argv)
+
+    cache = FaqCache()
+    if args.command == "ask":
+        score, question, answer = cache.match(args.question)
+        verdict = "HIT" if answer is not None and score >= cache.threshold else "MISS"
+        print(f"{verdict} {score:.3f} (threshold {cache.threshold}): {question}\n{answer or ''}")
+    elif args.command == "pending":
+        for record in cache.pending():
+            print(f"{record['id']}  {record['proposed_at']}\n  Q: {record['question']}\n  A: {record['answer']}\n")
+    elif args.command == "approve":
+        cache.approve(args.id, args.answer)
+        print(f"Approved {args.id}.", file=sys.stderr)
+    else:
+        cache.reject(args.id)
+        print(f"Rejected {args.id}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
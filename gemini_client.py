@@ -0,0 +1,150 @@
+# gemini_client.py
+"""
+Process-wide HTTP client for the Gemini generateContent endpoint.
+
+The sync path uses one pooled requests.Session (keep-alive, so TCP/TLS
+handshakes are paid once per connection, not once per message) with urllib3
+retries and exponential backoff on 429/5xx. The async path uses a pooled
+httpx.AsyncClient, so many sessions' calls can be in flight on one event loop
+without a thread per call.
+"""
+import asyncio
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    GEMINI_API_BASE, GEMINI_BACKOFF_FACTOR, GEMINI_CONNECT_TIMEOUT, GEMINI_MAX_RETRIES, GEMINI_MODEL,
+    GEMINI_POOL_SIZE, GEMINI_READ_TIMEOUT,
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class GeminiClient:
+    def __init__(self, api_key, model=GEMINI_MODEL, base_url=GEMINI_API_BASE,
+                 pool_size=GEMINI_POOL_SIZE, connect_timeout=GEMINI_CONNECT_TIMEOUT,
+                 read_timeout=GEMINI_READ_TIMEOUT, max_retries=GEMINI_MAX_RETRIES,
+                 backoff_factor=GEMINI_BACKOFF_FACTOR):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.session = self._build_session()
+        self._async_client = None
+        self._async_loop = None  # the event loop the httpx pool belongs to
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=0,  # a read timeout may mean the model is still generating; don't pile on
+            status=self.max_retries,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            backoff_factor=self.backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False,  # hand the last 429/5xx back so callers can report it
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
+    def url_for(self, method="generateContent"):
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def generate_content(self, payload, timeout=None):
+        """POSTs a generateContent payload and returns the requests.Response. timeout: (connect, read) override."""
+        return self.session.post(self.url_for(), params={"key": self.api_key}, json=payload, timeout=timeout or self.timeout)
+
+    def create_cached_content(self, contents, ttl_seconds):
+        """Uploads shared context once as a cachedContents resource; its name can replace the contents later."""
+        body = {"model": f"models/{self.model}", "contents": contents, "ttl": f"{int(ttl_seconds)}s"}
+        return self.session.post(f"{self.base_url}/cachedContents", params={"key": self.api_key}, json=body, timeout=self.timeout)
+
+    def stream_generate_content(self, payload, timeout=None):
+        """
+        POSTs to streamGenerateContent with server-sent events and returns the
+        streaming requests.Response; iterate its lines to read chunks as they arrive.
+        """
+        return self.session.post(
+            self.url_for("streamGenerateContent"), params={"key": self.api_key, "alt": "sse"},
+            json=payload, timeout=timeout or self.timeout, stream=True,
+        )
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            import httpx  # only needed by async callers
+
+            self._async_loop = asyncio.get_running_loop()
+            self._async_client = httpx.AsyncClient(
+                headers={"Content-Type": "application/json"},
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            )
+        return self._async_client
+
+    async def generate_content_async(self, payload, timeout=None):
+        """
+        Async generateContent with the same retry/backoff policy; returns an httpx.Response.
+        The underlying httpx pool belongs to the event loop that first uses it.
+        """
+        import httpx
+
+        client = self._get_async_client()
+        request_timeout = httpx.Timeout(timeout[1], connect=timeout[0]) if timeout else httpx.USE_CLIENT_DEFAULT
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await client.post(self.url_for(), params={"key": self.api_key}, json=payload,
+                                             timeout=request_timeout)
+            except httpx.ConnectError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    await asyncio.sleep(int(retry_after))
+                    continue
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    def close(self):
+        """
+        Closes the requests pool, and the httpx pool on its event loop if that
+        loop is still running (from any thread). Calls in flight may fail.
+        """
+        self.session.close()
+        client, loop = self._async_client, self._async_loop
+        self._async_client = self._async_loop = None
+        if client is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            client, self._async_client, self._async_loop = self._async_client, None, None
+            await client.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """Returns the process-wide client, creating it on first use (or when the key changes, closing the old one)."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            if _client is not None:
+                _client.close()
+            _client = GeminiClient(api_key)
+        return _client
@@ -1,68 +1,79 @@
-import requests
+import itertools
 import json
-import google.generativeai as genai
-import streamlit as st
-import os 
-from dotenv import load_dotenv 
+import math
+import time
+from collections import deque
+from config import GEMINI_API_KEY, GEMINI_COALESCE, GEMINI_DEADLINE_SECONDS, GEMINI_HEDGE_PERCENTILE, GEMINI_MODEL, GEMINI_OUTPUT_TOKEN_ALLOWANCE, METRICS_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL_SECONDS
+from context_window import estimate_tokens, fit_context
+from gemini_client import get_client
+from metrics import (
+    CACHE_HITS, COALESCED_CALLS, FALLBACK_REPLIES, FIRST_CHUNK_SECONDS, HEDGED_CALLS, LLM_CALLS, PAYLOAD_BYTES,
+    STAGE_SECONDS, timed,
+)
+from prompts import PROMPTS
+from resilience import CircuitBreaker, Deadline, DeadlineExceeded, LatencyTracker, hedged, hedged_async
+from response_cache import ResponseCache, payload_key
+from scheduler import SchedulerBusy, get_scheduler, lane_for
+from singleflight import SingleFlight
 
-load_dotenv()
+# Process-wide: module state survives Streamlit reruns and is shared by all sessions
+response_cache = ResponseCache(
+    ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    path=RESPONSE_CACHE_PATH,
+)
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Shown instead of the raw error when the scheduler queue is full or Gemini answers 429
+BUSY_REPLY = "⏳ We're answering a lot of questions right now. Please ask again in about {seconds} seconds."
+# Pause applied after a 429 without a usable Retry-After header
+DEFAULT_RETRY_AFTER_SECONDS = 5
 
+# Coalesces identical in-flight requests across the sessions of this process
+gemini_flights = SingleFlight()
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Shared by every session: failures in a row open it for all of them (resilience.py)
+gemini_breaker = CircuitBreaker()
+# Recent latencies of answered calls and of streams' first chunk; their percentile is the hedge delay
+call_latency = {"response": LatencyTracker(), "first_chunk": LatencyTracker()}
 
-def get_gemini_response(user_message, api_key_param):
-    if not api_key_param:
-        return "Please enter your Gemini API Key to continue."
+# Latency of recent streamed calls, newest last:
+# {"time_to_first_chunk": s, "total": s, "chunks": n, "cached": bool}
+recent_call_timings = deque(maxlen=100)
+
+def build_payload(user_message, state, block=True):
+    """
+    Builds the generateContent payload (persona prompt, history, message) from
+    a SessionState. block=False (for event loops) never waits on a context cache upload.
+    """
+    # Persona prompts come from the registry: static preambles are built once,
+    # profile blocks are rendered once per profile and memoized
+    persona = PROMPTS.persona_for(state)
+    preamble = PROMPTS.preamble(persona)
+    current_system_prompt = PROMPTS.profile_block(persona, state.user_data)
 
-    current_system_prompt = ""
-    # System prompt logic based on st.session_state (passed or accessed here if needed)
-    if st.session_state.mentorship_mode and st.session_state.user_type == "existing_player":
-        user_data = st.session_state.user_data
-        current_system_prompt = f"""
-        You are the exclusive CAREER DEVELOPMENT & MENTORSHIP AGENT for QUCOON FOOTBALL ACADEMY.
-        # ... (rest of your existing system prompt for existing_player) ...
-        PLAYER PROFILE - {user_data['name']}:
-        - Age: {user_data['age']}
-        - Position: {user_data['position']}
-        - Years Played: {user_data['years_played']}
-        - Level: {user_data['level']}
-        - Current Club: {user_data['current_club']}
-        # ... (rest of the prompt) ...
-        """
-    elif st.session_state.mentorship_mode and st.session_state.user_type == "existing_coach":
-        user_data = st.session_state.user_data
-        current_system_prompt = f"""
-        You are the COACHING CAREER CONSULTANT for QUCOON FOOTBALL ACADEMY.
-        # ... (rest of your existing system prompt for existing_coach) ...
-        COACH PROFILE - {user_data['name']}:
-        - Age: {user_data['age']}
-        - Specialty: {user_data['specialty']}
-        - Years Experience: {user_data['years_experience']}
-        - Level: {user_data['level']}
-        # ... (rest of the prompt) ...
-        """
-    elif st.session_state.user_type == "new_user_selecting_pathway":
-        current_system_prompt = f"""
-        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
-        # ... (rest of your existing system prompt for new_user_selecting_pathway) ...
-        """
-    elif st.session_state.user_type == "new_user_general_inquiry":
-        current_system_prompt = f"""
-        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
-        # ... (rest of your existing system prompt for new_user_general_inquiry) ...
-        """
-    else: # user_type is None (initial state)
-        current_system_prompt = f"""
-        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
-        # ... (rest of your existing system prompt for initial state) ...
-        """
+    # Keep the request under the token budget: recent turns verbatim, older ones
+    # folded into the running summary stored in session state
+    recent_messages = fit_context(
+        state.messages,
+        state.conversation_summary,
+        fixed_tokens=estimate_tokens(preamble) + estimate_tokens(current_system_prompt) + estimate_tokens(user_message),
+    )
+    if state.conversation_summary["text"]:
+        current_system_prompt += "\nSUMMARY OF THE EARLIER CONVERSATION:\n" + state.conversation_summary["text"]
+
+    # With context caching on, the preamble is referenced by handle instead of resent
+    context_handle = (PROMPTS.context_handle(persona, get_client(GEMINI_API_KEY), block)
+                      if PROMPTS.context_cache else None)
+    PROMPTS.record_request(persona, context_handle is not None)
+    if context_handle is None:
+        current_system_prompt = preamble + current_system_prompt
 
     # Build chat history for Gemini
-    chat_history = [{"role": "user", "parts": [{"text": current_system_prompt}]}]
+    chat_history = []
+    if current_system_prompt:
+        chat_history.append({"role": "user", "parts": [{"text": current_system_prompt}]})
 
-    for msg in st.session_state.messages:
+    for msg in recent_messages:
         gemini_role = "user" if msg["role"] == "user" else "model"
         chat_history.append({"role": gemini_role, "parts": [{"text": msg["content"]}]})
 
@@ -76,22 +87,402 @@ def get_gemini_response(user_message, api_key_param):
         "contents": chat_history,
         "generationConfig": generation_config
     }
+    if context_handle is not None:
+        payload["cachedContent"] = context_handle
+
+    if METRICS_ENABLED:
+        PAYLOAD_BYTES.observe(len(json.dumps(payload)))
+    return payload
+
+
+def _payload_tokens(payload):
+    """Tokens the scheduler charges for a call: the prompt estimate plus an allowance for the answer."""
+    texts = (part.get("text", "") for content in payload["contents"] for part in content["parts"])
+    return sum(estimate_tokens(text) for text in texts) + GEMINI_OUTPUT_TOKEN_ALLOWANCE
+
+
+def _used_tokens(result):
+    """Total tokens Gemini reports for a call, or None when the response has no usage metadata."""
+    return result.get("usageMetadata", {}).get("totalTokenCount")
+
+
+def _busy_reply(wait_seconds, mode, outcome="busy"):
+    LLM_CALLS.inc(mode, outcome)
+    return BUSY_REPLY.format(seconds=max(1, math.ceil(wait_seconds)))
+
+
+def _rate_limited(headers, mode):
+    """Pauses the scheduler for the server's Retry-After and returns the busy reply for a 429."""
+    retry_after = headers.get("Retry-After", "")
+    seconds = int(retry_after) if retry_after.isdigit() else DEFAULT_RETRY_AFTER_SECONDS
+    get_scheduler().backoff(seconds)
+    return _busy_reply(seconds, mode, "rate_limited")
+
+
+def _reply_from_result(result, cache_key, mode):
+    """Extracts the reply text from a generateContent result, caching successful answers."""
+    if result.get("candidates") and len(result["candidates"]) > 0:
+        response_text = result["candidates"][0]["content"]["parts"][0]["text"]
+        # Only successful answers are cached; errors are always retried
+        response_cache.put(cache_key, response_text)
+        LLM_CALLS.inc(mode, "ok")
+        return response_text
+    LLM_CALLS.inc(mode, "error")
+    error_message = result.get("error", {}).get("message", "Unknown API error.")
+    return f"Sorry, couldn't process. API error: {error_message}"
+
+
+def _failed(fallback, mode, reason, error=None):
+    """Counts a failed call against the circuit breaker and returns the persona's fallback reply."""
+    LLM_CALLS.inc(mode, "error")
+    gemini_breaker.record_failure(reason if error is None else f"{reason}: {_describe(error)}")
+    return _fallback_reply(fallback, mode, reason)
+
+
+def _describe(error):
+    """Error type and HTTP status, without the message: request URLs carry the API key."""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return type(error).__name__ if status is None else f"{type(error).__name__} {status}"
+
+
+def _out_of_time(fallback, mode, attempted_at):
+    """
+    Reply for a call that reached its deadline. Only a call that gave Gemini at
+    least half the deadline counts against the breaker; one that spent most of
+    it waiting for a scheduler slot gets the busy reply.
+    """
+    if time.perf_counter() - attempted_at < GEMINI_DEADLINE_SECONDS / 2:
+        return _busy_reply(DEFAULT_RETRY_AFTER_SECONDS, mode)
+    return _failed(fallback, mode, "deadline")
+
+
+def _fallback_reply(fallback, mode, reason):
+    FALLBACK_REPLIES.inc(mode, reason)
+    return fallback
+
+
+def _succeeded(kind, started, mode, winner, attempts):
+    gemini_breaker.record_success()
+    call_latency[kind].observe(time.perf_counter() - started)
+    if attempts > 1:
+        HEDGED_CALLS.inc(mode, "hedge" if winner else "primary")
+
+
+def _hedge_after(kind):
+    """Seconds before a hedged duplicate goes out; None when hedging is off or there is too little history."""
+    return call_latency[kind].percentile(GEMINI_HEDGE_PERCENTILE) if GEMINI_HEDGE_PERCENTILE else None
+
+
+def _hedge(attempt, lane, tokens):
+    """The hedge() for resilience.hedged: a duplicate attempt with its own scheduler slot, if one is free now."""
+    def duplicate():
+        ticket = get_scheduler().try_acquire(lane, tokens)
+        return None if ticket is None else (lambda: attempt(ticket))
+
+    return duplicate
+
+
+@timed("gemini_response")
+def get_gemini_response(user_message, api_key_param, state):
+    if not api_key_param:
+        return "Please enter your Gemini API Key to continue."
+
+    payload = build_payload(user_message, state)
+    cache_key = payload_key({"model": GEMINI_MODEL, **payload})
+    cached_text = response_cache.get(cache_key)
+    if cached_text is not None:
+        CACHE_HITS.inc("sync")
+        return cached_text
+
+    fallback = PROMPTS.fallback(PROMPTS.persona_for(state))
+    if not gemini_breaker.allow():
+        return _fallback_reply(fallback, "sync", "circuit_open")
+    lane, tokens, deadline = lane_for(state), _payload_tokens(payload), Deadline(GEMINI_DEADLINE_SECONDS)
+    if not GEMINI_COALESCE:
+        return _generate(payload, cache_key, lane, tokens, deadline, fallback)
+    # Identical payloads already in flight share that call (singleflight.py)
+    response_text, shared = gemini_flights.do(
+        cache_key, lambda: _generate(payload, cache_key, lane, tokens, deadline, fallback))
+    if shared:
+        COALESCED_CALLS.inc("sync")
+    return response_text
+
+
+def _post(payload, ticket, deadline):
+    """One generateContent attempt, run on a worker thread. Holds `ticket` until the response is read."""
+    with ticket:
+        # Pooled keep-alive session with retry/backoff on 429/5xx (gemini_client.py)
+        client = get_client(GEMINI_API_KEY)
+        response = client.generate_content(payload, timeout=deadline.timeout(*client.timeout))
+        if response.status_code == 429:
+            return response, None
+        response.raise_for_status()
+        result = response.json()
+        ticket.settle(_used_tokens(result))
+        return response, result
 
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}" # Use the globally loaded key here
 
+def _generate(payload, cache_key, lane, tokens, deadline, fallback):
+    """
+    One generateContent call once the scheduler admits it, hedged and bounded
+    by the deadline. Failures come back as the fallback reply.
+    """
     try:
-        response = requests.post(api_url, headers={'Content-Type': 'application/json'}, data=json.dumps(payload))
+        ticket = get_scheduler().acquire(lane, tokens, timeout=deadline.remaining())
+    except SchedulerBusy as busy:
+        return _busy_reply(busy.wait_seconds, "sync")
+
+    started = time.perf_counter()
+    attempt = lambda attempt_ticket: _post(payload, attempt_ticket, deadline)
+    try:
+        (response, result), winner, attempts = hedged(
+            lambda: attempt(ticket), deadline, _hedge_after("response"), _hedge(attempt, lane, tokens))
+    except DeadlineExceeded:
+        return _out_of_time(fallback, "sync", started)
+    except Exception as e:  # connection errors, 5xx after retries, unreadable JSON
+        return _failed(fallback, "sync", "error", e)
+    if response.status_code == 429:
+        return _rate_limited(response.headers, "sync")
+    _succeeded("response", started, "sync", winner, attempts)
+    return _reply_from_result(result, cache_key, "sync")
+
+
+async def get_gemini_response_async(user_message, api_key_param, state):
+    """
+    Async variant of get_gemini_response: many sessions' calls can share one
+    event loop and the client's connection pool. The payload is built from
+    `state` before the first await.
+    """
+    if not api_key_param:
+        return "Please enter your Gemini API Key to continue."
+
+    payload = build_payload(user_message, state, block=False)
+    cache_key = payload_key({"model": GEMINI_MODEL, **payload})
+    cached_text = response_cache.get(cache_key)
+    if cached_text is not None:
+        CACHE_HITS.inc("async")
+        return cached_text
+
+    fallback = PROMPTS.fallback(PROMPTS.persona_for(state))
+    if not gemini_breaker.allow():
+        return _fallback_reply(fallback, "async", "circuit_open")
+    lane, tokens, deadline = lane_for(state), _payload_tokens(payload), Deadline(GEMINI_DEADLINE_SECONDS)
+    if not GEMINI_COALESCE:
+        return await _generate_async(payload, cache_key, lane, tokens, deadline, fallback)
+    response_text, shared = await gemini_flights.do_async(
+        cache_key, lambda: _generate_async(payload, cache_key, lane, tokens, deadline, fallback))
+    if shared:
+        COALESCED_CALLS.inc("async")
+    return response_text
+
+
+async def _post_async(payload, ticket, deadline):
+    """Async form of _post(); a cancelled attempt gives its slot back."""
+    with ticket:
+        client = get_client(GEMINI_API_KEY)
+        response = await client.generate_content_async(payload, timeout=deadline.timeout(*client.timeout))
+        if response.status_code == 429:
+            return response, None
         response.raise_for_status()
         result = response.json()
+        ticket.settle(_used_tokens(result))
+        return response, result
+
+
+async def _generate_async(payload, cache_key, lane, tokens, deadline, fallback):
+    """Async form of _generate()."""
+    try:
+        ticket = await get_scheduler().acquire_async(lane, tokens, timeout=deadline.remaining())
+    except SchedulerBusy as busy:
+        return _busy_reply(busy.wait_seconds, "async")
+
+    started = time.perf_counter()
+    attempt = lambda attempt_ticket: _post_async(payload, attempt_ticket, deadline)
+    try:
+        (response, result), winner, attempts = await hedged_async(
+            lambda: attempt(ticket), deadline, _hedge_after("response"), _hedge(attempt, lane, tokens))
+    except DeadlineExceeded:
+        return _out_of_time(fallback, "async", started)
+    except Exception as e:  # connection errors, 5xx after retries, unreadable JSON
+        return _failed(fallback, "async", "error", e)
+    if response.status_code == 429:
+        return _rate_limited(response.headers, "async")
+    _succeeded("response", started, "async", winner, attempts)
+    return _reply_from_result(result, cache_key, "async")
+
+
+def _chunk_text(chunk):
+    """Text carried by one streamed generateContent chunk ('' for metadata-only chunks)."""
+    candidates = chunk.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _sse_chunks(lines):
+    """
+    Decoded JSON chunks of a server-sent event stream, given its lines as bytes.
+    The stream is UTF-8 whatever its Content-Type says; requests would decode a
+    text/event-stream without a charset as ISO-8859-1.
+    """
+    for line in lines:
+        if line and line.startswith(b"data:"):
+            yield json.loads(line[len(b"data:"):].decode("utf-8"))
+
+
+def stream_gemini_response(user_message, api_key_param, state):
+    """
+    Streaming variant of get_gemini_response: yields text chunks as the model
+    produces them (server-sent events from streamGenerateContent). Failures are
+    yielded as the same fallback reply get_gemini_response gives. Complete
+    answers are cached, and each call's time-to-first-chunk and total latency
+    are appended to recent_call_timings.
+    """
+    if not api_key_param:
+        yield "Please enter your Gemini API Key to continue."
+        return
+
+    started = time.perf_counter()
+    timing = {"time_to_first_chunk": None, "total": None, "chunks": 0, "cached": False}
+
+    payload = build_payload(user_message, state)
+    cache_key = payload_key({"model": GEMINI_MODEL, **payload})
+    cached_text = response_cache.get(cache_key)
+    if cached_text is not None:
+        timing["cached"] = True
+        timing["chunks"] = 1
+        timing["time_to_first_chunk"] = timing["total"] = time.perf_counter() - started
+        recent_call_timings.append(timing)
+        CACHE_HITS.inc("stream")
+        yield cached_text
+        return
+
+    fallback = PROMPTS.fallback(PROMPTS.persona_for(state))
+    if not gemini_breaker.allow():
+        yield _fallback_reply(fallback, "stream", "circuit_open")
+        return
+    lane, tokens, deadline = lane_for(state), _payload_tokens(payload), Deadline(GEMINI_DEADLINE_SECONDS)
+    generate = lambda: _stream_generate(payload, cache_key, started, timing, lane, tokens, deadline, fallback)
+    if not GEMINI_COALESCE:
+        yield from generate()
+        return
+    # Identical payloads already streaming replay that stream instead of opening another
+    chunks, shared = gemini_flights.stream(cache_key, generate)
+    if shared:
+        COALESCED_CALLS.inc("stream")
+    yield from chunks
+
+
+def _open_stream(payload, ticket, deadline):
+    """
+    One streamGenerateContent attempt, run on a worker thread: sends the
+    request and reads up to the first chunk with text. Returns (ticket,
+    response, chunks read, iterator over the rest); on failure the response is
+    closed and the ticket released.
+    """
+    response = None
+    try:
+        client = get_client(GEMINI_API_KEY)
+        response = client.stream_generate_content(payload, timeout=deadline.timeout(*client.timeout))
+        if response.status_code == 429:
+            return ticket, response, [], iter(())
+        response.raise_for_status()
+        rest = _sse_chunks(response.iter_lines())
+        read = []
+        for chunk in rest:
+            read.append(chunk)
+            if "error" in chunk or _chunk_text(chunk):
+                break
+        return ticket, response, read, rest
+    except BaseException:
+        if response is not None:
+            response.close()
+        ticket.release()
+        raise
+
+
+def _close_stream(opened):
+    ticket, response, _, _ = opened
+    response.close()
+    ticket.release()
+
+
+def _stream_generate(payload, cache_key, started, timing, lane, tokens, deadline, fallback):
+    """
+    One streamGenerateContent call once the scheduler admits it, yielding text
+    chunks. Opening the stream (up to its first chunk) is hedged and bounded by
+    the deadline.
+    """
+    try:
+        ticket = get_scheduler().acquire(lane, tokens, timeout=deadline.remaining())
+    except SchedulerBusy as busy:
+        yield _busy_reply(busy.wait_seconds, "stream")
+        return
+
+    opened_at = time.perf_counter()
+    attempt = lambda attempt_ticket: _open_stream(payload, attempt_ticket, deadline)
+    try:
+        opened, winner, attempts = hedged(lambda: attempt(ticket), deadline, _hedge_after("first_chunk"),
+                                          _hedge(attempt, lane, tokens), discard=_close_stream)
+    except DeadlineExceeded:
+        _record_stream_timing(started, timing)
+        yield _out_of_time(fallback, "stream", opened_at)
+        return
+    except Exception as e:  # connection errors, 5xx after retries, unreadable JSON
+        _record_stream_timing(started, timing)
+        yield _failed(fallback, "stream", "error", e)
+        return
+    if attempts > 1:
+        HEDGED_CALLS.inc("stream", "hedge" if winner else "primary")
+    if opened[1].status_code != 429:
+        call_latency["first_chunk"].observe(time.perf_counter() - opened_at)
+    yield from _stream_chunks(opened, cache_key, started, timing, fallback)
+
+
+def _stream_chunks(opened, cache_key, started, timing, fallback):
+    """Reads the rest of an opened streamGenerateContent response; failures are yielded as the fallback."""
+    ticket, response, read, rest = opened
+    received = []
+    try:
+        with ticket:
+            if response.status_code == 429:
+                yield _rate_limited(response.headers, "stream")
+                return
+            for chunk in itertools.chain(read, rest):
+                if "error" in chunk:
+                    LLM_CALLS.inc("stream", "error")
+                    yield f"Sorry, couldn't process. API error: {chunk['error'].get('message', 'Unknown API error.')}"
+                    return
+                if "usageMetadata" in chunk:
+                    ticket.settle(_used_tokens(chunk))
+                text = _chunk_text(chunk)
+                if not text:
+                    continue
+                if timing["time_to_first_chunk"] is None:
+                    timing["time_to_first_chunk"] = time.perf_counter() - started
+                timing["chunks"] += 1
+                received.append(text)
+                yield text
+            gemini_breaker.record_success()
+            if received:
+                response_cache.put(cache_key, "".join(received))
+                LLM_CALLS.inc("stream", "ok")
+            else:
+                LLM_CALLS.inc("stream", "error")
+                yield "Sorry, couldn't process. API error: Unknown API error."
+    except Exception as e:  # the connection dropped or a chunk was unreadable mid-stream
+        reply = _failed(fallback, "stream", "error", e)
+        if not received:
+            yield reply
+    finally:
+        response.close()
+        _record_stream_timing(started, timing)
+
 
-        if result.get("candidates") and len(result["candidates"]) > 0:
-            return result["candidates"][0]["content"]["parts"][0]["text"]
-        else:
-            error_message = result.get("error", {}).get("message", "Unknown API error.")
-            return f"Sorry, couldn't process. API error: {error_message}"
-    except requests.exceptions.RequestException as e:
-        return f"API error: {e}. Check internet/key. Full response: {response.text if 'response' in locals() else 'N/A'}"
-    except json.JSONDecodeError:
-        return f"Unreadable API response. Full response: {response.text if 'response' in locals() else 'N/A'}"
-    except Exception as e:
-        return f"Unexpected error: {e}."
\ No newline at end of file
+def _record_stream_timing(started, timing):
+    timing["total"] = time.perf_counter() - started
+    recent_call_timings.append(timing)
+    STAGE_SECONDS.observe(timing["total"], "gemini_stream")
+    if timing["time_to_first_chunk"] is not None:
+        FIRST_CHUNK_SECONDS.observe(timing["time_to_first_chunk"])
@@ -0,0 +1,268 @@
+# metrics.py
+"""
+Lightweight per-turn timing and counters, exported in the Prometheus text format.
+
+Set METRICS_ENABLED=1 to collect. Stages of a turn are timed into the
+chat_stage_seconds histogram, either with a span around a block or with the
+timed() decorator on a function:
+
+    with span("render_history"):
+        ...
+
+    @timed("scouting_agent")
+    def handle_scouting_agent(state, user_message): ...
+
+When metrics are disabled, timed() returns the function unchanged, span()
+returns a shared no-op context manager, and inc()/observe() return at once.
+Exports are served at http://127.0.0.1:METRICS_PORT/metrics and/or written to
+METRICS_PATH every METRICS_EXPORT_SECONDS (see start_exporters()).
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_ENABLED, METRICS_EXPORT_SECONDS, METRICS_PATH, METRICS_PORT
+
+ENABLED = METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+_NULL_SPAN = nullcontext()
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class _HistogramSeries:
+    """
+    One label combination of a histogram; bind it once with Histogram.labels()
+    on hot paths. Each thread writes to its own shard, so observe() takes no
+    lock; snapshot() adds the shards up. Shards of threads that have exited
+    are folded into one base shard, so short-lived threads (a Streamlit rerun,
+    a stream pump) don't pile up.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._base = self._empty()
+        self._shards = []  # per live thread: (weakref to the thread, [bucket counts..., +Inf count, sum])
+        self._lock = threading.Lock()
+
+    def _empty(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def _new_shard(self):
+        shard = self._local.shard = self._empty()
+        with self._lock:
+            self._fold_exited()
+            self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _fold_exited(self):
+        """Adds the shards of exited threads to the base shard. Called with the lock held."""
+        live = []
+        for thread, shard in self._shards:
+            owner = thread()
+            if owner is not None and owner.is_alive():
+                live.append((thread, shard))
+            else:
+                self._base = [total + value for total, value in zip(self._base, shard)]
+        self._shards = live
+
+    def observe(self, value):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            self._fold_exited()
+            shards = [self._base] + [shard for _, shard in self._shards]
+        return [sum(column) for column in zip(*shards)]
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> _HistogramSeries
+        self._lock = threading.Lock()
+
+    def labels(self, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(label_values, _HistogramSeries(self.buckets))
+        return series
+
+    def observe(self, value, *label_values):
+        if not ENABLED:
+            return
+        self.labels(*label_values).observe(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for label_values, series in ((key, series.snapshot()) for key, series in items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _labels(self.label_names + ("le",), label_values + (str(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+STAGE_SECONDS = Histogram("chat_stage_seconds", "Time spent in each stage of a chat turn.", ("stage",))
+LLM_CALLS = Counter("gemini_calls_total", "Gemini calls by mode and outcome.", ("mode", "outcome"))
+CACHE_HITS = Counter("gemini_cache_hits_total", "Gemini calls answered from the response cache.", ("mode",))
+VALIDATION_FAILURES = Counter("validation_failures_total", "Submissions rejected by field validation.", ("pathway",))
+PAYLOAD_BYTES = Histogram("gemini_payload_bytes", "Size of generateContent request payloads.", buckets=BYTES_BUCKETS)
+FIRST_CHUNK_SECONDS = Histogram("gemini_time_to_first_chunk_seconds", "Latency until the first streamed chunk.")
+COALESCED_CALLS = Counter("gemini_coalesced_calls_total", "Gemini calls that joined an identical request in flight.", ("mode",))
+QUEUE_WAIT_SECONDS = Histogram("gemini_queue_wait_seconds", "Time Gemini calls waited for a scheduler slot.", ("lane",))
+SCHEDULER_REJECTIONS = Counter("gemini_scheduler_rejections_total", "Gemini calls turned away by the scheduler.", ("lane", "reason"))
+HEDGED_CALLS = Counter("gemini_hedged_calls_total", "Gemini calls that sent a hedged duplicate, by the attempt that answered.", ("mode", "winner"))
+FALLBACK_REPLIES = Counter("gemini_fallback_replies_total", "Fallback replies served instead of a Gemini answer.", ("mode", "reason"))
+FAQ_LOOKUPS = Counter("faq_lookups_total", "FAQ index lookups by outcome (hit/miss).", ("outcome",))
+FAQ_SECONDS_SAVED = Counter("faq_seconds_saved_total", "Estimated Gemini latency avoided by FAQ answers.")
+
+REGISTRY = [STAGE_SECONDS, LLM_CALLS, CACHE_HITS, COALESCED_CALLS, VALIDATION_FAILURES, PAYLOAD_BYTES,
+            FIRST_CHUNK_SECONDS, QUEUE_WAIT_SECONDS, SCHEDULER_REJECTIONS, HEDGED_CALLS, FALLBACK_REPLIES,
+            FAQ_LOOKUPS, FAQ_SECONDS_SAVED]
+
+
+class _Span:
+    __slots__ = ("series", "started")
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.series.observe(time.perf_counter() - self.started)
+        return False
+
+
+def span(stage):
+    """Times a block into chat_stage_seconds{stage=...}."""
+    return _Span(STAGE_SECONDS.labels(stage)) if ENABLED else _NULL_SPAN
+
+
+def timed(stage):
+    """Decorator form of span(); returns the function itself when metrics are disabled."""
+    def decorate(function):
+        if not ENABLED:
+            return function
+        series = STAGE_SECONDS.labels(stage)
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                series.observe(clock() - started)
+        return wrapper
+    return decorate
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path):
+    """Writes render() to path atomically, for node_exporter's textfile collector or similar."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_PATH, interval=METRICS_EXPORT_SECONDS):
+    """Starts the /metrics endpoint and/or the periodic file export once per process."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started or not ENABLED:
+            return
+        _exporters_started = True
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    if path:
+        def export_loop():
+            while True:
+                time.sleep(interval)
+                write_file(path)
+        threading.Thread(target=export_loop, name="metrics-file-export", daemon=True).start()
@@ -0,0 +1,212 @@
+# prompts.py
+"""
+Registry of the persona system prompts sent to Gemini.
+
+Each persona has a static preamble, built once at import, and an optional
+profile block for existing players/coaches. The profile block is rendered
+once per profile and memoized, not rebuilt from session state on every message.
+
+With GEMINI_CONTEXT_CACHE enabled, a persona's preamble is uploaded once as a
+Gemini cachedContents resource and later requests refer to it by name instead
+of resending it. The registry counts the payload bytes this saves. Gemini only
+caches contexts above a minimum token count, so this is off by default and
+falls back to sending the preamble inline whenever a handle can't be created.
+One upload per persona runs at a time, outside the registry lock; requests
+made meanwhile send the preamble inline.
+
+Each persona also has a canned fallback reply, served when Gemini is failing
+or too slow (resilience.py).
+"""
+import threading
+import time
+from functools import lru_cache
+from textwrap import dedent
+
+from config import GEMINI_CONTEXT_CACHE, GEMINI_CONTEXT_CACHE_TTL_SECONDS, INITIAL_APPLICATION_FORM_URL
+
+# After a failed cachedContents upload, send prompts inline for this long before retrying
+CONTEXT_CACHE_RETRY_SECONDS = 300
+
+# Start of every fallback reply (faq_cache.py never proposes these as answers)
+FALLBACK_PREFIX = "⚠️ Our AI assistant is unavailable right now."
+
+
+class PersonaPrompt:
+    def __init__(self, name, preamble, profile_template=None, fallback=""):
+        self.name = name
+        self.preamble = dedent(preamble).strip() + "\n"
+        self.profile_template = dedent(profile_template).strip() + "\n" if profile_template else None
+        self.fallback = f"{FALLBACK_PREFIX} {fallback}".strip()
+        self.preamble_bytes = len(self.preamble.encode("utf-8"))
+
+
+class PromptRegistry:
+    def __init__(self, personas, context_cache=GEMINI_CONTEXT_CACHE,
+                 context_cache_ttl=GEMINI_CONTEXT_CACHE_TTL_SECONDS):
+        self._personas = {persona.name: persona for persona in personas}
+        self.context_cache = context_cache
+        self.context_cache_ttl = context_cache_ttl
+        self._handles = {}  # persona name -> (cachedContents name, expires_at)
+        self._uploading = set()  # personas with an upload in flight
+        self._retry_after = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_saved = 0
+        self.last_bytes_saved = 0
+        self.render_profile = lru_cache(maxsize=4096)(self._render_profile)
+
+    @staticmethod
+    def persona_for(state):
+        """Picks the persona for the current conversation state."""
+        if state.mentorship_mode and state.user_type == "existing_player":
+            return "existing_player"
+        if state.mentorship_mode and state.user_type == "existing_coach":
+            return "existing_coach"
+        if state.user_type in ("new_user_selecting_pathway", "new_user_general_inquiry"):
+            return state.user_type
+        return "initial"
+
+    def preamble(self, persona):
+        return self._personas[persona].preamble
+
+    def fallback(self, persona):
+        """Canned reply for when Gemini can't answer in time."""
+        return self._personas[persona].fallback
+
+    def _render_profile(self, persona, profile_items):
+        template = self._personas[persona].profile_template
+        return template.format_map(dict(profile_items)) if template else ""
+
+    def profile_block(self, persona, user_data):
+        """Profile section for existing members; memoized per (persona, profile)."""
+        if self._personas[persona].profile_template is None:
+            return ""
+        return self.render_profile(persona, tuple(sorted(user_data.items())))
+
+    def context_handle(self, persona, client, block=True):
+        """
+        Name of a cachedContents resource holding the persona preamble, or None
+        when context caching is disabled or unavailable. A missing or expiring
+        handle is uploaded in the calling thread, or with block=False (event
+        loops) on a background thread, in which case this call gets None.
+        """
+        if not self.context_cache:
+            return None
+        now = time.time()
+        with self._lock:
+            handle = self._handles.get(persona)
+            if handle and handle[1] > now + 60:
+                return handle[0]
+            if now < self._retry_after or persona in self._uploading:
+                return None
+            self._uploading.add(persona)
+        if not block:
+            threading.Thread(target=self._upload, args=(persona, client), name=f"context-cache-{persona}",
+                             daemon=True).start()
+            return None
+        return self._upload(persona, client)
+
+    def _upload(self, persona, client):
+        """Creates the persona's cachedContents resource. Returns its name, or None on failure."""
+        now = time.time()
+        name = None
+        try:
+            response = client.create_cached_content(
+                [{"role": "user", "parts": [{"text": self.preamble(persona)}]}], self.context_cache_ttl
+            )
+            response.raise_for_status()
+            name = response.json()["name"]
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._uploading.discard(persona)
+                if name is None:
+                    self._retry_after = now + CONTEXT_CACHE_RETRY_SECONDS
+                else:
+                    self._handles[persona] = (name, now + self.context_cache_ttl)
+        return name
+
+    def record_request(self, persona, used_handle):
+        """Counts one request and the preamble bytes it did not have to send."""
+        saved = self._personas[persona].preamble_bytes if used_handle else 0
+        with self._lock:
+            self.requests += 1
+            self.bytes_saved += saved
+            self.last_bytes_saved = saved
+        return saved
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "bytes_saved": self.bytes_saved,
+            "last_bytes_saved": self.last_bytes_saved,
+            "avg_bytes_saved": self.bytes_saved / self.requests if self.requests else 0.0,
+            "profiles_memoized": self.render_profile.cache_info().currsize,
+        }
+
+
+PROMPTS = PromptRegistry([
+    PersonaPrompt(
+        "existing_player",
+        """
+        You are the exclusive CAREER DEVELOPMENT & MENTORSHIP AGENT for QUCOON FOOTBALL ACADEMY.
+        # ... (rest of your existing system prompt for existing_player) ...
+        """,
+        """
+        PLAYER PROFILE - {name}:
+        - Age: {age}
+        - Position: {position}
+        - Years Played: {years_played}
+        - Level: {level}
+        - Current Club: {current_club}
+        # ... (rest of the prompt) ...
+        """,
+        fallback=("Meanwhile, keep following your training plan. If you're ready for the next stage, "
+                  f"the official application form is here: [Application Form]({INITIAL_APPLICATION_FORM_URL}). "
+                  "Please ask your question again in a few minutes."),
+    ),
+    PersonaPrompt(
+        "existing_coach",
+        """
+        You are the COACHING CAREER CONSULTANT for QUCOON FOOTBALL ACADEMY.
+        # ... (rest of your existing system prompt for existing_coach) ...
+        """,
+        """
+        COACH PROFILE - {name}:
+        - Age: {age}
+        - Specialty: {specialty}
+        - Years Experience: {years_experience}
+        - Level: {level}
+        # ... (rest of the prompt) ...
+        """,
+        fallback=("If you're ready for the next stage of your coaching pathway, the official application form "
+                  f"is here: [Application Form]({INITIAL_APPLICATION_FORM_URL}). "
+                  "Please ask your question again in a few minutes."),
+    ),
+    PersonaPrompt(
+        "new_user_selecting_pathway",
+        """
+        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
+        # ... (rest of your existing system prompt for new_user_selecting_pathway) ...
+        """,
+        fallback="You can still apply: say **player** for Player Development or **coach** for Coaching Development.",
+    ),
+    PersonaPrompt(
+        "new_user_general_inquiry",
+        """
+        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
+        # ... (rest of your existing system prompt for new_user_general_inquiry) ...
+        """,
+        fallback=("QUCOON Academy offers Player Development and Coaching Development pathways, and you can apply "
+                  "to either now: say **player** or **coach**. For other questions, please ask again in a few minutes."),
+    ),
+    PersonaPrompt(
+        "initial",
+        """
+        You are the AI Career Assistant for QUCOON FOOTBALL ACADEMY.
+        # ... (rest of your existing system prompt for initial state) ...
+        """,
+        fallback="Are you an **existing** member with a talent ID, or **new** to the academy?",
+    ),
+])
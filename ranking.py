@@ -0,0 +1,297 @@
+# ranking.py
+"""
+Shortlists of players ranked by a weighted fit score for a position.
+
+Candidates come from the academy registry and from screened player
+applications in the application store. They are held as a columnar Roster of
+NumPy arrays (age, years played, level code, position code, pace), so scoring,
+filtering and top-k selection over 100k+ candidates are a few array operations:
+
+    shortlist("CB", k=10, max_age=21)
+    rank_players(roster, "ST", k=20, eligible_only=True)
+
+The score (0-100) adds up weighted parts, each between 0 and 1:
+
+- age and experience fit against the eligibility windows in validation.py
+  (PLAYER_ELIGIBILITY), tapering off outside them
+- playing level
+- pace, parsed from the application's physical attributes (neutral when unknown or outside 1-10)
+- position fit: 1 for the position itself, 0.5 for the same unit (e.g. CB for LB)
+
+Weights differ per unit (POSITION_WEIGHTS); pace matters more up front than in goal.
+
+    python ranking.py ST --top 10 --max-age 21
+"""
+import argparse
+import math
+import sys
+import threading
+import time
+
+import numpy as np
+
+from application_store import get_store
+from config import RANKING_ROSTER_TTL_SECONDS
+from data_manager import get_registry
+from validation import PACE_PATTERN, POSITION_ALIASES, VALID_POSITIONS
+
+SOURCES = ("registry", "applicant")
+
+# Eligibility windows (PLAYER_ELIGIBILITY) and how far outside them the fit tapers to 0
+AGE_WINDOW, AGE_FALLOFF = (16, 24), 6
+EXPERIENCE_WINDOW, EXPERIENCE_FALLOFF = (3, 5), 4
+
+# Ages and years played are capped here; -1 marks an unreadable value
+MAX_YEARS = 120
+
+# Pace is rated 1-10; anything else counts as unknown
+PACE_RANGE = (1, 10)
+
+# Registry levels and applicants' free-text levels on one ordinal scale
+MAX_LEVEL = 4
+ELIGIBLE_LEVEL = 3  # semi-professional and up
+LEVEL_CODES = (
+    ("semi", 3), ("elite", 4), ("professional", 4), ("pro", 4),
+    ("advanced", 3), ("intermediate", 2), ("amateur", 1), ("beginner", 1),
+)
+
+POSITION_CODES = {position: code for code, position in enumerate(VALID_POSITIONS)}
+UNKNOWN_POSITION = len(VALID_POSITIONS)
+UNITS = {
+    "goalkeeper": ("GK",),
+    "defence": ("CB", "LB", "RB"),
+    "midfield": ("CDM", "CM", "CAM", "LM", "RM"),
+    "attack": ("LW", "RW", "ST", "CF"),
+}
+UNIT_OF = {position: unit for unit, positions in UNITS.items() for position in positions}
+
+# Weights of (age, experience, level, pace, position) per unit; each row sums to 1
+POSITION_WEIGHTS = {
+    "goalkeeper": (0.20, 0.25, 0.30, 0.00, 0.25),
+    "defence": (0.20, 0.20, 0.25, 0.10, 0.25),
+    "midfield": (0.20, 0.20, 0.25, 0.10, 0.25),
+    "attack": (0.15, 0.15, 0.25, 0.20, 0.25),
+}
+
+# POSITION_FIT[target, candidate]: 1 same position, 0.5 same unit, 0 otherwise (and for unknown positions)
+POSITION_FIT = np.zeros((UNKNOWN_POSITION + 1, UNKNOWN_POSITION + 1), dtype=np.float32)
+for _target, _target_code in POSITION_CODES.items():
+    for _candidate, _candidate_code in POSITION_CODES.items():
+        if _target == _candidate:
+            POSITION_FIT[_target_code, _candidate_code] = 1.0
+        elif UNIT_OF[_target] == UNIT_OF[_candidate]:
+            POSITION_FIT[_target_code, _candidate_code] = 0.5
+
+
+def level_code(level):
+    """Ordinal playing level (0 unknown .. MAX_LEVEL) for registry levels and applicants' answers."""
+    text = str(level or "").lower()
+    for keyword, code in LEVEL_CODES:
+        if keyword in text:
+            return code
+    return 0
+
+
+def position_code(position):
+    text = str(position or "").strip().upper()
+    return POSITION_CODES.get(POSITION_ALIASES.get(text, text), UNKNOWN_POSITION)
+
+
+def parse_pace(physical_attributes):
+    match = PACE_PATTERN.search(str(physical_attributes or "").lower())
+    return float(match.group(1)) if match else math.nan
+
+
+def _int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return -1
+
+
+def _years(values):
+    """Whole years as int16: unreadable or negative values become -1, huge ones MAX_YEARS."""
+    years = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=-1)
+    return np.clip(years, -1, MAX_YEARS).astype(np.int16)
+
+
+def _window_fit(values, window, falloff):
+    """1 inside [low, high], falling linearly to 0 at `falloff` outside it."""
+    low, high = window
+    distance = np.maximum(low - values, 0) + np.maximum(values - high, 0)
+    return np.clip(1.0 - distance / falloff, 0.0, 1.0)
+
+
+class Roster:
+    """Column arrays of candidates; row i of every array is candidate i."""
+
+    def __init__(self, talent_ids, names, sources, age, years_played, level, position, pace):
+        self.talent_ids = talent_ids
+        self.names = names
+        self.sources = np.asarray(sources, dtype=np.int8)
+        self.age = _years(age)
+        self.years_played = _years(years_played)
+        self.level = np.asarray(level, dtype=np.int8)
+        self.position = np.asarray(position, dtype=np.int8)
+        self.pace = np.array(pace, dtype=np.float32)
+        self.pace[(self.pace < PACE_RANGE[0]) | (self.pace > PACE_RANGE[1])] = np.nan
+        # Position-independent parts of the score, one column each: age, experience, level, pace
+        self.features = np.column_stack([
+            _window_fit(self.age.astype(np.float32), AGE_WINDOW, AGE_FALLOFF),
+            _window_fit(self.years_played.astype(np.float32), EXPERIENCE_WINDOW, EXPERIENCE_FALLOFF),
+            self.level / np.float32(MAX_LEVEL),
+            np.nan_to_num(self.pace / np.float32(10), nan=0.5),
+        ]).astype(np.float32)
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.talent_ids)
+
+    @classmethod
+    def from_candidates(cls, candidates):
+        """Builds a roster from (talent_id, name, source, age, years_played, level, position, pace) tuples."""
+        columns = list(zip(*candidates)) or [()] * 8
+        talent_ids, names, sources, age, years_played, level, position, pace = columns
+        return cls(list(talent_ids), list(names), sources, age, years_played,
+                   [level_code(value) for value in level], [position_code(value) for value in position],
+                   pace)
+
+
+def load_roster(registry=None, store=None, include_rejected=False):
+    """Registry players plus screened player applicants (only eligible ones unless include_rejected)."""
+    registry = registry or get_registry()
+    store = store or get_store()
+    candidates = [
+        (row["talent_id"], row["name"], 0, row["age"], row["years_played"], row["level"], row["position"], math.nan)
+        for row in registry.all_players()
+    ]
+    for record in store.query_range(0, math.inf):
+        if record.get("pathway") != "player" or not (include_rejected or record.get("talent_id")):
+            continue
+        inputs = record["inputs"]
+        candidates.append((
+            record.get("talent_id") or record["application_id"], inputs.get("name"), 1,
+            _int(inputs.get("age")), _int(inputs.get("years_played")), inputs.get("current_level"),
+            inputs.get("position"), parse_pace(inputs.get("physical_attributes")),
+        ))
+    return Roster.from_candidates(candidates)
+
+
+def score_players(roster, position):
+    """Fit score (0-100) of every roster row for `position` (a code or alias such as 'Striker')."""
+    target = position_code(position)
+    if target == UNKNOWN_POSITION:
+        raise ValueError(f"Unknown position: {position}")
+    weights = POSITION_WEIGHTS[UNIT_OF[VALID_POSITIONS[target]]]
+    scores = roster.features @ np.asarray(weights[:4], dtype=np.float32)
+    scores += weights[4] * POSITION_FIT[target][roster.position]
+    scores[roster.age < 0] = 0.0  # unreadable age: not a usable candidate
+    return scores * 100
+
+
+def rank_players(roster, position, k=10, min_age=None, max_age=None, min_level=None,
+                 eligible_only=False, source=None):
+    """The k best-scoring players for `position` after filtering, best first, as dicts."""
+    scores = score_players(roster, position)
+    mask = roster.age >= 0
+    if min_age is not None:
+        mask &= roster.age >= min_age
+    if max_age is not None:
+        mask &= roster.age <= max_age
+    if min_level is not None:
+        mask &= roster.level >= (level_code(min_level) if isinstance(min_level, str) else min_level)
+    if eligible_only:
+        mask &= (roster.age >= AGE_WINDOW[0]) & (roster.age <= AGE_WINDOW[1])
+        mask &= (roster.years_played >= EXPERIENCE_WINDOW[0]) & (roster.years_played <= EXPERIENCE_WINDOW[1])
+        mask &= roster.level >= ELIGIBLE_LEVEL
+    if source is not None:
+        mask &= roster.sources == SOURCES.index(source)
+
+    candidates = np.flatnonzero(mask)
+    if len(candidates) > k:
+        # argpartition finds the top k in linear time; only those k are sorted
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    best = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [
+        {
+            "talent_id": roster.talent_ids[i],
+            "name": roster.names[i],
+            "source": SOURCES[roster.sources[i]],
+            "position": VALID_POSITIONS[roster.position[i]] if roster.position[i] != UNKNOWN_POSITION else None,
+            "age": int(roster.age[i]),
+            "years_played": int(roster.years_played[i]),
+            "level": int(roster.level[i]),
+            "pace": None if math.isnan(roster.pace[i]) else float(roster.pace[i]),
+            "score": round(float(scores[i]), 1),
+        }
+        for i in best
+    ]
+
+
+_roster = None
+_roster_lock = threading.Lock()
+
+
+def get_roster(max_age_seconds=RANKING_ROSTER_TTL_SECONDS):
+    """The process-wide roster, rebuilt from the registry and store when older than max_age_seconds."""
+    global _roster
+    with _roster_lock:
+        if _roster is None or time.monotonic() - _roster.built_at > max_age_seconds:
+            _roster = load_roster()
+        return _roster
+
+
+def shortlist(position, k=10, **filters):
+    """Scouting API: the k best candidates for a position across the registry and screened applicants."""
+    return rank_players(get_roster(), position, k, **filters)
+
+
+def shortlist_command(arguments):
+    """
+    Markdown reply for the mentorship command `/shortlist <position> [count]`,
+    e.g. '/shortlist CB 5' or '/shortlist striker'.
+    """
+    words = arguments.split()
+    count = 10
+    if len(words) > 1 and words[-1].isdigit():
+        count = min(int(words.pop()), 50)
+    position = " ".join(words)
+    if not position or position_code(position) == UNKNOWN_POSITION:
+        return f"Usage: `/shortlist <position> [count]`, e.g. `/shortlist CB 5`. Positions: {', '.join(VALID_POSITIONS)}."
+
+    rows = shortlist(position, count)
+    if not rows:
+        return f"No candidates found for {position.upper()}."
+    lines = [f"**Top {len(rows)} candidates for {VALID_POSITIONS[position_code(position)]}**", "",
+             "| # | Name | ID | Pos | Age | Yrs | Pace | Score |", "|---|---|---|---|---|---|---|---|"]
+    for rank, row in enumerate(rows, 1):
+        pace = "-" if row["pace"] is None else f"{row['pace']:.0f}"
+        lines.append(f"| {rank} | {row['name']} | {row['talent_id']} | {row['position'] or '?'} | {row['age']} "
+                     f"| {row['years_played']} | {pace} | {row['score']} |")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank registry players and screened applicants for a position.")
+    parser.add_argument("position")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--min-age", type=int)
+    parser.add_argument("--max-age", type=int)
+    parser.add_argument("--eligible-only", action="store_true")
+    parser.add_argument("--source", choices=SOURCES)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    roster = load_roster()
+    loaded = time.perf_counter()
+    rows = rank_players(roster, args.position, args.top, min_age=args.min_age, max_age=args.max_age,
+                        eligible_only=args.eligible_only, source=args.source)
+    ranked = time.perf_counter()
+    for rank, row in enumerate(rows, 1):
+        print(f"{rank:>3}. {row['score']:5.1f}  {row['talent_id']:<26} {row['name']} ({row['position']}, {row['age']}, {row['source']})")
+    print(f"{len(roster)} candidates loaded in {1000 * (loaded - started):.1f} ms, "
+          f"ranked in {1000 * (ranked - loaded):.2f} ms.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# resilience.py
+"""
+Guards that keep the tail latency of Gemini calls bounded.
+
+- Deadline: the time budget of one call. Its remaining time caps the HTTP
+  timeouts and how long the caller waits.
+- hedged() / hedged_async(): run the call and, if it hasn't answered after the
+  hedge delay, send a duplicate; the first answer wins. The sync form runs the
+  attempts on worker threads, so the caller gives up at the deadline even if
+  the HTTP call is stuck.
+- LatencyTracker: recent latencies, whose GEMINI_HEDGE_PERCENTILE becomes the
+  hedge delay, so only the slowest few calls are duplicated.
+- CircuitBreaker: opens after GEMINI_BREAKER_FAILURES failures in a row. While
+  open, calls aren't attempted and callers serve a fallback reply at once;
+  every GEMINI_BREAKER_RESET_SECONDS one trial call goes through, and a
+  success closes the breaker again.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from config import GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS, GEMINI_MAX_CONCURRENT
+
+# Every admitted call holds a scheduler slot, and so does every hedge, so two
+# workers per slot means attempts never wait for a thread
+_workers = ThreadPoolExecutor(max_workers=2 * GEMINI_MAX_CONCURRENT if GEMINI_MAX_CONCURRENT else 32,
+                              thread_name_prefix="gemini-call")
+
+
+class DeadlineExceeded(Exception):
+    """No attempt answered within the call's deadline."""
+
+
+class Deadline:
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, connect_timeout, read_timeout):
+        """(connect, read) timeouts for an HTTP request, cut down to the time left."""
+        remaining = max(0.001, self.remaining())
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+
+class LatencyTracker:
+    def __init__(self, size=200, min_samples=20):
+        self._samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """The given percentile (0-1) of recent latencies, or None until min_samples are in."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def hedged(call, deadline, hedge_after=None, hedge=None, discard=None):
+    """
+    Runs call() on a worker thread and waits for it until the deadline. If it is
+    still running after hedge_after seconds, hedge() may return a duplicate
+    callable (or None to skip hedging), which runs alongside it.
+
+    Returns (result, winner, attempts): winner 0 is call(), 1 the hedge, and
+    attempts how many were sent. The result of an attempt that finishes after
+    the winner goes to discard(). Raises DeadlineExceeded, or the error of the
+    last attempt when every one failed.
+    """
+    attempts = [_workers.submit(call)]
+    pending = set(attempts)
+    hedge_at = None if hedge_after is None or hedge is None else time.monotonic() + hedge_after
+    error = None
+    while pending:
+        wake_at = deadline.expires_at if hedge_at is None else min(hedge_at, deadline.expires_at)
+        done, pending = wait(pending, timeout=max(0.0, wake_at - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as exc:
+                error = exc
+                continue
+            _abandon(pending, discard)
+            return result, attempts.index(future), len(attempts)
+        if done:
+            continue
+        if deadline.remaining() <= 0:
+            _abandon(pending, discard)
+            raise DeadlineExceeded(f"no answer within the deadline after {len(attempts)} attempt(s)")
+        if hedge_at is not None and time.monotonic() >= hedge_at:
+            hedge_at = None
+            duplicate = hedge()
+            if duplicate is not None:
+                attempts.append(_workers.submit(duplicate))
+                pending.add(attempts[-1])
+    raise error
+
+
+def _abandon(futures, discard):
+    if discard is None:
+        return
+    for future in futures:
+        future.add_done_callback(lambda done: done.exception() is None and discard(done.result()))
+
+
+async def hedged_async(call, deadline, hedge_after=None, hedge=None):
+    """
+    hedged() for coroutines: call() and the hedge's duplicate return awaitables.
+    Attempts that lose, or outlive the deadline, are cancelled.
+    """
+    attempts = [asyncio.ensure_future(call())]
+    pending = set(attempts)
+    hedge_at = None if hedge_after is None or hedge is None else time.monotonic() + hedge_after
+    error = None
+    try:
+        while pending:
+            wake_at = deadline.expires_at if hedge_at is None else min(hedge_at, deadline.expires_at)
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, wake_at - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                return task.result(), attempts.index(task), len(attempts)
+            if done:
+                continue
+            if deadline.remaining() <= 0:
+                raise DeadlineExceeded(f"no answer within the deadline after {len(attempts)} attempt(s)")
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                duplicate = hedge()
+                if duplicate is not None:
+                    attempts.append(asyncio.ensure_future(duplicate()))
+                    pending.add(attempts[-1])
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=GEMINI_BREAKER_FAILURES, reset_seconds=GEMINI_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._open = False
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.last_failure = None
+
+    def allow(self):
+        """True if a call may go out: always while closed, and once per reset period while open."""
+        with self._lock:
+            if not self._open:
+                return True
+            now = time.monotonic()
+            if now < self._retry_at:
+                return False
+            self._retry_at = now + self.reset_seconds  # one trial call per period
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open = False
+
+    def record_failure(self, reason):
+        with self._lock:
+            self._failures += 1
+            self.last_failure = reason
+            if self.failure_threshold and self._failures >= self.failure_threshold and not self._open:
+                self._open = True
+                self._retry_at = time.monotonic() + self.reset_seconds
+                self.opened += 1
+
+    @property
+    def state(self):
+        with self._lock:
+            if not self._open:
+                return "closed"
+            return "open" if time.monotonic() < self._retry_at else "half_open"
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self._failures, "opened": self.opened,
+                "last_failure": self.last_failure}
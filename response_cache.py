@@ -0,0 +1,116 @@
+# response_cache.py
+"""
+Cache for Gemini replies, keyed on a stable hash of the full request payload
+(model, system prompt, role-mapped history, user message, generation config).
+
+Entries live in a size-bounded in-memory LRU with a TTL. When a path is given,
+they are also written to a SQLite file so answers survive restarts; a memory
+miss falls back to disk and promotes the entry.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def payload_key(payload):
+    """Stable SHA-256 of a JSON-serializable request payload."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with optional SQLite persistence and hit/miss counters."""
+
+    # Expired rows on disk are purged every this many writes
+    PURGE_EVERY = 256
+
+    def __init__(self, ttl_seconds=3600, max_entries=512, path=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._purge_disk(time.time())
+
+    @property
+    def enabled(self):
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key):
+        """Returns the cached response for key, or None on a miss or expiry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, response FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response):
+        if not self.enabled:
+            return
+        now = time.time()
+        entry = (now + self.ttl_seconds, response)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                        (key, response, entry[0]),
+                    )
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._purge_disk(now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM responses")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _purge_disk(self, now):
+        with self._db:
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
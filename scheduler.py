@@ -0,0 +1,344 @@
+# scheduler.py
+"""
+Process-wide admission control for Gemini calls.
+
+Every call takes a slot from the scheduler before it goes out. A slot needs:
+
+- room under GEMINI_MAX_CONCURRENT calls in flight,
+- a request from the requests-per-minute bucket (GEMINI_RPM_LIMIT), and
+- the call's estimated tokens from the tokens-per-minute bucket (GEMINI_TPM_LIMIT).
+
+Callers that can't be admitted yet wait in a bounded queue (GEMINI_QUEUE_SIZE),
+served by lane priority and then in arrival order. Mentorship sessions for
+existing players and coaches come before general inquiries. A caller that has
+waited AGING_SECONDS is served as if it were in the first lane, so general
+inquiries are never starved. When the queue is full, or a caller has waited
+GEMINI_QUEUE_TIMEOUT_SECONDS, SchedulerBusy carries an estimate of how long
+until a call would be admitted.
+
+    with get_scheduler().acquire("mentorship", tokens=1200) as ticket:
+        response = client.generate_content(payload)
+        ticket.settle(actual_total_tokens)   # optional: correct the estimate
+
+A limit of 0 turns that check off.
+"""
+import itertools
+import math
+import threading
+import time
+
+from config import (
+    GEMINI_MAX_CONCURRENT, GEMINI_QUEUE_SIZE, GEMINI_QUEUE_TIMEOUT_SECONDS, GEMINI_RPM_LIMIT, GEMINI_TPM_LIMIT,
+)
+from metrics import QUEUE_WAIT_SECONDS, SCHEDULER_REJECTIONS
+
+# Lane name -> priority (lower is served first)
+LANES = {"mentorship": 0, "general": 1}
+
+# Seconds after which a waiting call is served ahead of every lane
+AGING_SECONDS = 10
+
+# Starting guess for how long a call holds its slot; updated as calls finish
+INITIAL_CALL_SECONDS = 2.0
+
+
+class SchedulerBusy(Exception):
+    """No slot within the queue limits; wait_seconds estimates when one would be free."""
+
+    def __init__(self, wait_seconds, reason):
+        super().__init__(f"Gemini scheduler busy ({reason}); estimated wait {wait_seconds:.1f}s")
+        self.wait_seconds = wait_seconds
+        self.reason = reason
+
+
+def lane_for(state):
+    """Mentorship sessions of existing members get the first lane; everyone else is general."""
+    return "mentorship" if state.mentorship_mode else "general"
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to per_minute. Not thread-safe; the scheduler locks it."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount, now):
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full bucket)."""
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        self.level -= amount  # may go negative when a call turns out bigger than estimated
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "tokens", "enqueued", "wake")
+
+    def __init__(self, priority, sequence, tokens, enqueued, wake=None):
+        self.priority = priority
+        self.sequence = sequence
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.wake = wake  # set for acquire_async waiters, which don't wait on the condition
+
+
+class Ticket:
+    """An admitted call. Release it (or leave the `with` block) when the call is done."""
+
+    def __init__(self, scheduler, tokens):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.actual_tokens = None
+        self.started = time.monotonic()
+        self._released = False
+
+    def settle(self, actual_tokens):
+        """Records the tokens the call really used (e.g. usageMetadata.totalTokenCount)."""
+        self.actual_tokens = actual_tokens
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+        return False
+
+
+class Scheduler:
+    def __init__(self, rpm=GEMINI_RPM_LIMIT, tpm=GEMINI_TPM_LIMIT, max_concurrent=GEMINI_MAX_CONCURRENT,
+                 queue_size=GEMINI_QUEUE_SIZE, queue_timeout=GEMINI_QUEUE_TIMEOUT_SECONDS, aging_seconds=AGING_SECONDS):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrent = max_concurrent or math.inf
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.aging_seconds = aging_seconds
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._paused_until = 0.0
+        self._call_seconds = INITIAL_CALL_SECONDS
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    def _head(self, now):
+        """The waiter to admit next: aged waiters first, then by lane, then in arrival order."""
+        aged_before = now - self.aging_seconds
+        return min(self._waiters, key=lambda w: (w.priority if w.enqueued > aged_before else -1, w.sequence))
+
+    def _admission_delay(self, tokens, now):
+        """Seconds until a call needing `tokens` fits the budgets, or None while all slots are taken."""
+        if self._running >= self.max_concurrent:
+            return None
+        delay = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            delay = max(delay, self.requests.time_until(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.time_until(tokens, now))
+        return delay
+
+    def _estimate(self, waiters_ahead, tokens_ahead, now):
+        """Seconds until a call behind `waiters_ahead` others (needing `tokens_ahead` in total) would start."""
+        calls = waiters_ahead + 1
+        estimate = max(0.0, self._paused_until - now)
+        if self.requests is not None:
+            self.requests.refill(now)
+            estimate = max(estimate, (calls - self.requests.level) / self.requests.rate)
+        if self.tokens is not None:
+            self.tokens.refill(now)
+            estimate = max(estimate, (tokens_ahead - self.tokens.level) / self.tokens.rate)
+        if self.max_concurrent != math.inf:
+            rounds = math.ceil(max(0, calls - (self.max_concurrent - self._running)) / self.max_concurrent)
+            estimate = max(estimate, rounds * self._call_seconds)
+        return estimate
+
+    def _estimate_for(self, priority, tokens, now):
+        ahead = [w for w in self._waiters if w.priority <= priority]
+        return self._estimate(len(ahead), sum(w.tokens for w in ahead) + tokens, now)
+
+    def estimate_wait(self, lane, tokens=0):
+        """Seconds a new call in `lane` would probably wait before being admitted."""
+        with self._condition:
+            return self._estimate_for(LANES[lane], tokens, time.monotonic())
+
+    def _reject(self, lane, reason, wait_seconds):
+        self.rejected += 1
+        SCHEDULER_REJECTIONS.inc(lane, reason)
+        return SchedulerBusy(wait_seconds, reason)
+
+    def acquire(self, lane, tokens=0, timeout=None):
+        """
+        Blocks until the call may start and returns its Ticket; raises SchedulerBusy
+        on backpressure. timeout caps the wait below the scheduler's queue_timeout.
+        """
+        priority = LANES[lane]
+        with self._condition:
+            now = time.monotonic()
+            started = now
+            # Nobody waiting and the budgets allow it: go straight through
+            if self._waiters or self._admission_delay(tokens, now) != 0.0:
+                queue_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+                now = self._wait_turn(lane, priority, tokens, now, queue_timeout)
+            ticket = self._admit(tokens)
+            waited = now - started
+            self.wait_seconds += waited
+        QUEUE_WAIT_SECONDS.observe(waited, lane)
+        return ticket
+
+    def try_acquire(self, lane, tokens=0):
+        """A Ticket if the call can start right now without queueing, else None (e.g. for hedged duplicates)."""
+        with self._condition:
+            if self._waiters or self._admission_delay(tokens, time.monotonic()) != 0.0:
+                return None
+            ticket = self._admit(tokens)
+        QUEUE_WAIT_SECONDS.observe(0.0, lane)
+        return ticket
+
+    def _admit(self, tokens):
+        self._running += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self.admitted += 1
+        return Ticket(self, tokens)
+
+    async def acquire_async(self, lane, tokens=0, timeout=None):
+        """
+        acquire() for coroutines. The caller waits in the same queue as threads
+        do, but on an asyncio.Event, so no thread is held while it waits.
+        """
+        import asyncio
+
+        priority = LANES[lane]
+        queue_timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        with self._condition:
+            now = started = time.monotonic()
+            if not self._waiters and self._admission_delay(tokens, now) == 0.0:
+                ticket = self._admit(tokens)
+                QUEUE_WAIT_SECONDS.observe(0.0, lane)
+                return ticket
+            waiter = self._enqueue(lane, priority, tokens, now)
+            loop, woken = asyncio.get_running_loop(), asyncio.Event()
+            waiter.wake = lambda: loop.call_soon_threadsafe(woken.set)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    delay = self._turn_delay(waiter, lane, priority, tokens, now, started + queue_timeout)
+                    if delay == 0.0:
+                        self._dequeue(waiter)
+                        waiter = None
+                        ticket = self._admit(tokens)
+                        self.wait_seconds += now - started
+                        break
+                    woken.clear()
+                try:
+                    await asyncio.wait_for(woken.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if waiter is not None:  # rejected or cancelled
+                with self._condition:
+                    self._dequeue(waiter)
+        QUEUE_WAIT_SECONDS.observe(now - started, lane)
+        return ticket
+
+    def _enqueue(self, lane, priority, tokens, now):
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject(lane, "queue_full", self._estimate_for(priority, tokens, now))
+        waiter = _Waiter(priority, next(self._sequence), tokens, now)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _dequeue(self, waiter):
+        self._waiters.remove(waiter)
+        # The head changed: let the next waiter re-check
+        self._notify()
+
+    def _notify(self):
+        self._condition.notify_all()
+        for waiter in self._waiters:
+            if waiter.wake is not None:
+                waiter.wake()
+
+    def _turn_delay(self, waiter, lane, priority, tokens, now, deadline):
+        """
+        0.0 once `waiter` is the head and fits the budgets, else how long to wait
+        before checking again. Raises SchedulerBusy at the deadline. Called with the lock held.
+        """
+        delay = self._admission_delay(tokens, now) if self._head(now) is waiter else None
+        if delay == 0.0:
+            return delay
+        remaining = deadline - now
+        if remaining <= 0:
+            raise self._reject(lane, "timeout", self._estimate_for(priority, tokens, now))
+        return remaining if delay is None else min(delay, remaining)
+
+    def _wait_turn(self, lane, priority, tokens, now, queue_timeout):
+        """Queues the caller until it is the head and fits the budgets. Called with the lock held."""
+        waiter = self._enqueue(lane, priority, tokens, now)
+        deadline = now + queue_timeout
+        try:
+            while True:
+                delay = self._turn_delay(waiter, lane, priority, tokens, now, deadline)
+                if delay == 0.0:
+                    return now
+                self._condition.wait(delay)
+                now = time.monotonic()
+        finally:
+            self._dequeue(waiter)
+
+    def _release(self, ticket):
+        with self._condition:
+            self._running -= 1
+            if ticket.actual_tokens is not None and self.tokens is not None:
+                self.tokens.take(ticket.actual_tokens - ticket.tokens)
+            elapsed = time.monotonic() - ticket.started
+            self._call_seconds = 0.8 * self._call_seconds + 0.2 * elapsed
+            self._notify()
+
+    def backoff(self, seconds):
+        """Holds back every admission for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._condition:
+            queued = {lane: sum(1 for w in self._waiters if w.priority == priority) for lane, priority in LANES.items()}
+            return {
+                "running": self._running,
+                "queued": queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "avg_wait_seconds": self.wait_seconds / self.admitted if self.admitted else 0.0,
+                "avg_call_seconds": self._call_seconds,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler shared by every session's Gemini calls."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -0,0 +1,290 @@
+# session_state.py
+"""
+Compact per-conversation state, built to be held by thousands of sessions at once.
+
+SessionState uses __slots__ instead of a per-instance __dict__. User types and
+recruitment stages are enum members shared by every session, and profiles
+from the registry are read-only views rather than per-session copies.
+Messages go to a MessageLog:
+
+- roles are stored as one byte per message and read back as interned strings
+- messages older than the newest SESSION_PLAIN_MESSAGES are zlib-compressed
+  (when they are at least SESSION_COMPRESS_MIN_CHARS long)
+- a session keeps at most SESSION_MAX_MESSAGES; older ones are dropped after
+  being folded into the conversation summary that Gemini already receives
+
+Reading the log works like reading a list of {"role", "content"} dicts, so the
+chat view, the transcript and the context window need no changes:
+
+    state = SessionState()
+    state.add_message("user", "How do I improve my first touch?")
+    state.messages[-1]["content"]
+
+`python benchmarks.py memory` reports bytes per session at 10/100/1000 turns.
+"""
+import sys
+import zlib
+from enum import Enum
+from types import MappingProxyType
+
+from config import SESSION_COMPRESS_MIN_CHARS, SESSION_MAX_MESSAGES, SESSION_PLAIN_MESSAGES
+from context_window import new_summary, summarize_turns
+
+
+class _Code(str, Enum):
+    """Enum members that compare, hash, format and serialize as their string value."""
+
+    def __str__(self):
+        return self.value
+
+    __format__ = str.__format__
+
+
+class UserType(_Code):
+    AWAITING_TALENT_ID = "awaiting_talent_id"
+    NEW_USER_GENERAL_INQUIRY = "new_user_general_inquiry"
+    NEW_USER_SELECTING_PATHWAY = "new_user_selecting_pathway"
+    NEW_USER = "new_user"
+    NEW_COACH = "new_coach"
+    EXISTING_PLAYER = "existing_player"
+    EXISTING_COACH = "existing_coach"
+
+
+class Stage(_Code):
+    """Where a player or coach application is in its recruitment agent."""
+    AWAITING_INPUT = "awaiting_input"
+    AWAITING_CONFIRMATION = "awaiting_confirmation_after_warnings"
+    PROCESSED = "processed"
+
+
+def _code(enum, value):
+    return None if value is None else enum(value)
+
+
+def _copy(items):
+    return None if items is None else list(items)
+
+
+ROLES = (sys.intern("user"), sys.intern("assistant"))
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+EMPTY_PROFILE = MappingProxyType({})
+
+
+def _pack(text):
+    """zlib-compressed UTF-8 for long messages, when that is smaller; the text itself otherwise."""
+    if len(text) >= SESSION_COMPRESS_MIN_CHARS:
+        packed = zlib.compress(text.encode("utf-8"))
+        if len(packed) < len(text):
+            return packed
+    return text
+
+
+class MessageLog:
+    """
+    Append-only chat messages of one session. Indexing and slicing return
+    fresh {"role", "content"} dicts, so callers cannot change the log.
+
+    A log rehydrated from a session store (session_store.py) may start with
+    only its newest messages: `older` more precede them, fetched with
+    loader(older) -> [(role, content), ...] the first time one is read.
+    """
+
+    __slots__ = ("_roles", "_contents", "_older", "_loader")
+
+    def __init__(self, messages=(), older=0, loader=None):
+        self._roles = bytearray()
+        self._contents = []  # str, or zlib-compressed UTF-8 bytes for older messages
+        self._older = older
+        self._loader = loader
+        for message in messages:
+            self.append(message)
+
+    def add(self, role, content):
+        self._roles.append(ROLE_CODES[role])
+        self._contents.append(content)
+        # The message leaving the plain window is compressed once, if that saves space
+        older = len(self._contents) - SESSION_PLAIN_MESSAGES - 1
+        if older >= 0 and isinstance(self._contents[older], str):
+            self._contents[older] = _pack(self._contents[older])
+
+    def append(self, message):
+        """list.append() for {"role", "content"} dicts."""
+        self.add(message["role"], message["content"])
+
+    def drop_oldest(self, count):
+        unloaded = min(count, self._older)
+        self._older -= unloaded
+        del self._roles[:count - unloaded]
+        del self._contents[:count - unloaded]
+
+    def _load_older(self):
+        entries = self._loader(self._older)
+        self._roles[:0] = bytes(ROLE_CODES[role] for role, _ in entries)
+        self._contents[:0] = [_pack(content) for _, content in entries]
+        self._older = 0
+        self._loader = None
+
+    def _message(self, index):
+        if index < 0:
+            index += len(self)
+        if index < self._older:
+            self._load_older()
+        index -= self._older
+        if index < 0:
+            raise IndexError("message index out of range")
+        content = self._contents[index]
+        if not isinstance(content, str):
+            content = zlib.decompress(content).decode("utf-8")
+        return {"role": ROLES[self._roles[index]], "content": content}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._message(i) for i in range(*index.indices(len(self)))]
+        return self._message(index)
+
+    def __len__(self):
+        return self._older + len(self._contents)
+
+    def __iter__(self):
+        if self._older:
+            self._load_older()
+        for index in range(len(self._contents)):
+            yield self._message(index)
+
+    def __repr__(self):
+        return f"MessageLog({len(self)} messages)"
+
+    def to_list(self):
+        return list(self)
+
+    def since(self, index):
+        """(role, content) of every message from `index` on."""
+        return [(message["role"], message["content"]) for message in self[index:]]
+
+
+class SessionState:
+    """Everything one conversation needs between turns. to_dict() gives plain, JSON-friendly values."""
+
+    __slots__ = (
+        "messages", "_user_type", "_user_data", "questions_asked", "mentorship_mode", "initial_question_asked",
+        "conversation_summary", "dropped_messages",
+        # Player recruitment
+        "scouting_mode", "scouting_data", "_scouting_stage", "pending_scouting_inputs",
+        # Coach recruitment
+        "coach_recruitment_mode", "coach_recruitment_data", "_coach_stage", "pending_coach_inputs",
+        # Messages written to the session store so far (session_store.py); not part of to_dict()
+        "checkpointed",
+    )
+
+    def __init__(self, messages=(), user_type=None, user_data=None, questions_asked=0, mentorship_mode=False,
+                 initial_question_asked=False, conversation_summary=None, dropped_messages=0,
+                 scouting_mode=False, scouting_data=None, current_scouting_stage=None, pending_scouting_inputs=None,
+                 coach_recruitment_mode=False, coach_recruitment_data=None, current_coach_stage=None,
+                 pending_coach_inputs=None):
+        self.messages = MessageLog(messages)
+        self.user_type = user_type
+        self.user_data = user_data
+        self.questions_asked = questions_asked
+        self.mentorship_mode = mentorship_mode
+        self.initial_question_asked = initial_question_asked
+        self.conversation_summary = conversation_summary if conversation_summary is not None else new_summary()
+        self.dropped_messages = dropped_messages  # messages removed by the SESSION_MAX_MESSAGES cap
+        self.scouting_mode = scouting_mode
+        self.scouting_data = scouting_data if scouting_data is not None else {}
+        self.current_scouting_stage = current_scouting_stage
+        self.pending_scouting_inputs = pending_scouting_inputs
+        self.coach_recruitment_mode = coach_recruitment_mode
+        self.coach_recruitment_data = coach_recruitment_data if coach_recruitment_data is not None else {}
+        self.current_coach_stage = current_coach_stage
+        self.pending_coach_inputs = pending_coach_inputs
+        self.checkpointed = None
+
+    # Enum-coded fields accept their plain string values too
+    @property
+    def user_type(self):
+        return self._user_type
+
+    @user_type.setter
+    def user_type(self, value):
+        self._user_type = _code(UserType, value)
+
+    @property
+    def current_scouting_stage(self):
+        return self._scouting_stage
+
+    @current_scouting_stage.setter
+    def current_scouting_stage(self, value):
+        self._scouting_stage = _code(Stage, value)
+
+    @property
+    def current_coach_stage(self):
+        return self._coach_stage
+
+    @current_coach_stage.setter
+    def current_coach_stage(self, value):
+        self._coach_stage = _code(Stage, value)
+
+    @property
+    def user_data(self):
+        """The member's profile, read-only (and shared with the registry cache when it came from there)."""
+        return self._user_data
+
+    @user_data.setter
+    def user_data(self, value):
+        if not value:
+            value = EMPTY_PROFILE
+        elif not isinstance(value, MappingProxyType):
+            value = MappingProxyType(dict(value))
+        self._user_data = value
+
+    def add_message(self, role, content):
+        """Appends a message, dropping the oldest ones beyond SESSION_MAX_MESSAGES."""
+        self.messages.add(role, content)
+        excess = len(self.messages) - SESSION_MAX_MESSAGES
+        if excess > 0:
+            self._drop_oldest(excess)
+
+    def _drop_oldest(self, count):
+        summary = self.conversation_summary
+        if summary["covered"] < count:
+            # Not summarized yet: fold them in so Gemini still hears about them
+            summary["text"] = summarize_turns(self.messages[summary["covered"]:count], summary["text"])
+        summary["covered"] = max(summary["covered"], count) - count
+        self.messages.drop_oldest(count)
+        self.dropped_messages += count
+
+    def to_dict(self):
+        return {"messages": self.messages.to_list(), **self.header()}
+
+    def header(self):
+        """to_dict() without the messages."""
+        return {
+            "user_type": None if self.user_type is None else self.user_type.value,
+            "user_data": dict(self.user_data),
+            "questions_asked": self.questions_asked,
+            "mentorship_mode": self.mentorship_mode,
+            "initial_question_asked": self.initial_question_asked,
+            "conversation_summary": dict(self.conversation_summary),
+            "dropped_messages": self.dropped_messages,
+            "scouting_mode": self.scouting_mode,
+            "scouting_data": dict(self.scouting_data),
+            "current_scouting_stage": None if self.current_scouting_stage is None else self.current_scouting_stage.value,
+            "pending_scouting_inputs": _copy(self.pending_scouting_inputs),
+            "coach_recruitment_mode": self.coach_recruitment_mode,
+            "coach_recruitment_data": dict(self.coach_recruitment_data),
+            "current_coach_stage": None if self.current_coach_stage is None else self.current_coach_stage.value,
+            "pending_coach_inputs": _copy(self.pending_coach_inputs),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __reduce__(self):
+        # Pickles as its plain dict (mapping proxies can't be pickled)
+        return self.from_dict, (self.to_dict(),)
+
+    def __repr__(self):
+        return (f"SessionState(user_type={self.user_type!s}, messages={len(self.messages)}, "
+                f"scouting_mode={self.scouting_mode}, coach_recruitment_mode={self.coach_recruitment_mode})")
@@ -0,0 +1,205 @@
+# session_store.py
+"""
+Conversation checkpoints outside the Streamlit process.
+
+After each turn the app saves the session's SessionState under a session ID
+kept in the page URL (?session=...). When a browser reconnects, whether after a
+restart or to another worker behind a load balancer, the conversation
+(including a half-finished recruitment flow) is rehydrated from the store:
+
+    store = get_session_store()
+    state = store.load(session_id) or SessionState()
+    ...
+    store.save(session_id, state)
+
+A checkpoint is a delta: the session header (every SessionState field except
+the messages, as JSON) is rewritten, and only the messages added since the
+last checkpoint are appended. Messages are numbered by their position in the
+whole conversation, so those dropped by the SESSION_MAX_MESSAGES cap are
+deleted from the store as well. load() reads the header and the newest
+SESSION_PLAIN_MESSAGES messages; older ones are fetched if the chat view or the
+transcript asks for them.
+
+Backends implement four methods:
+
+    load_header(session_id) -> header dict, or None
+    load_messages(session_id, start, end) -> [(role, content), ...] for message numbers start..end-1
+    save(session_id, header, first, messages, keep_from, replace)
+        header replaces the stored one; messages are numbered from `first`;
+        numbers below keep_from are deleted; replace drops all stored messages first
+    delete(session_id)
+
+SQLiteSessionBackend keeps sessions in one database file, shared by every
+worker on the machine. MemorySessionBackend keeps them in dicts, laid out the
+way a Redis backend would store them (a string per header, and a list of
+messages per conversation next to the number of its first message).
+"""
+import json
+import threading
+import time
+
+from academy_registry import ConnectionPool
+from config import SESSION_PLAIN_MESSAGES, SESSION_STORE, SESSION_STORE_PATH, SESSION_STORE_TTL_SECONDS
+from session_state import MessageLog, SessionState
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    header TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS session_messages (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteSessionBackend:
+    def __init__(self, path, pool_size=4, ttl_seconds=SESSION_STORE_TTL_SECONDS):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as connection, connection:
+            connection.executescript(SCHEMA)
+        if ttl_seconds:
+            self.purge(ttl_seconds)
+
+    def load_header(self, session_id):
+        with self.pool.connection() as connection:
+            row = connection.execute("SELECT header FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def load_messages(self, session_id, start, end):
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT role, content FROM session_messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, end),
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def save(self, session_id, header, first, messages, keep_from, replace=False):
+        with self.pool.connection() as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, header, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(header), time.time()),
+            )
+            if replace:
+                connection.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            elif keep_from:
+                connection.execute("DELETE FROM session_messages WHERE session_id = ? AND seq < ?", (session_id, keep_from))
+            connection.executemany(
+                "INSERT OR REPLACE INTO session_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, first + i, role, content) for i, (role, content) in enumerate(messages)],
+            )
+
+    def delete(self, session_id):
+        with self.pool.connection() as connection, connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+
+    def purge(self, max_idle_seconds):
+        """Deletes sessions untouched for max_idle_seconds. Returns how many."""
+        cutoff = time.time() - max_idle_seconds
+        with self.pool.connection() as connection, connection:
+            connection.execute(
+                "DELETE FROM session_messages WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,),
+            )
+            return connection.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+class MemorySessionBackend:
+    """In-process stand-in for a Redis backend: SET/GET for headers, RPUSH/LRANGE/LTRIM for messages."""
+
+    def __init__(self):
+        self._headers = {}  # session_id -> header JSON
+        self._messages = {}  # session_id -> [first message number, [(role, content), ...]]
+        self._lock = threading.Lock()
+
+    def load_header(self, session_id):
+        with self._lock:
+            header = self._headers.get(session_id)
+        return None if header is None else json.loads(header)
+
+    def load_messages(self, session_id, start, end):
+        with self._lock:
+            first, messages = self._messages.get(session_id, (0, []))
+            return messages[max(0, start - first):max(0, end - first)]
+
+    def save(self, session_id, header, first, messages, keep_from, replace=False):
+        with self._lock:
+            self._headers[session_id] = json.dumps(header)
+            stored = self._messages.get(session_id)
+            if replace or stored is None:
+                stored = self._messages[session_id] = [first, []]
+            del stored[1][first - stored[0]:]  # a retried checkpoint rewrites its messages
+            stored[1].extend(messages)
+            if keep_from > stored[0]:
+                del stored[1][:keep_from - stored[0]]
+                stored[0] = keep_from
+
+    def delete(self, session_id):
+        with self._lock:
+            self._headers.pop(session_id, None)
+            self._messages.pop(session_id, None)
+
+
+class SessionStore:
+    def __init__(self, backend):
+        self.backend = backend
+        self.saves = 0
+        self.loads = 0
+
+    def save(self, session_id, state):
+        """Checkpoints `state`: its header, plus the messages added since the last save or load."""
+        header = state.header()
+        total = state.dropped_messages + len(state.messages)
+        header["message_count"] = total
+        replace = state.checkpointed is None
+        first = state.dropped_messages if replace else max(state.checkpointed, state.dropped_messages)
+        messages = state.messages.since(first - state.dropped_messages)
+        self.backend.save(session_id, header, first, messages, state.dropped_messages, replace)
+        state.checkpointed = total
+        self.saves += 1
+
+    def load(self, session_id):
+        """The saved conversation, with only its newest messages read so far; None if unknown."""
+        header = self.backend.load_header(session_id)
+        if header is None:
+            return None
+        total = header.pop("message_count")
+        dropped = header["dropped_messages"]
+        start = max(dropped, total - SESSION_PLAIN_MESSAGES)
+        recent = self.backend.load_messages(session_id, start, total)
+        state = SessionState.from_dict(header)
+        state.messages = MessageLog(
+            ({"role": role, "content": content} for role, content in recent),
+            older=start - dropped,
+            loader=lambda count: self.backend.load_messages(session_id, start - count, start),
+        )
+        state.checkpointed = total
+        self.loads += 1
+        return state
+
+    def delete(self, session_id):
+        self.backend.delete(session_id)
+
+    def stats(self):
+        return {"saves": self.saves, "loads": self.loads}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """The process-wide session store picked by SESSION_STORE, or None when it is off."""
+    global _store
+    with _store_lock:
+        if _store is None and SESSION_STORE != "off":
+            backend = MemorySessionBackend() if SESSION_STORE == "memory" else SQLiteSessionBackend(SESSION_STORE_PATH)
+            _store = SessionStore(backend)
+        return _store
@@ -0,0 +1,186 @@
+# singleflight.py
+"""
+Request coalescing: while a call for a key is in flight, identical calls wait
+for its result instead of starting their own.
+
+    flights = SingleFlight()
+    text, shared = flights.do(cache_key, lambda: fetch(payload))
+
+The first caller for a key (the leader) runs the function; callers arriving
+before it finishes get the same result, or the same exception. The key is
+released when the call ends, so later calls (and retries after an error)
+start fresh. If the leader is interrupted rather than failing (KeyboardInterrupt,
+task cancellation), waiting callers start over and one of them leads.
+
+stream() does the same for iterators of chunks: a background thread reads the
+source once and every caller replays the chunks from the start, so a caller
+that stops reading does not cut the stream off for the others.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class _Abandoned(Exception):
+    """The leader stopped without a result; waiting callers retry."""
+
+
+class _Broadcast:
+    """Chunks of one shared stream, readable from the start by any number of callers."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def publish(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def __iter__(self):
+        position = 0
+        while True:
+            with self.condition:
+                while position >= len(self.chunks) and not self.done:
+                    self.condition.wait()
+                batch = self.chunks[position:]
+                position = len(self.chunks)
+                if not batch:
+                    if self.error is not None:
+                        raise self.error
+                    return
+            yield from batch
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # key -> Future of the in-flight call
+        self._streams = {}  # key -> _Broadcast of the in-flight stream
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Returns (future, True if the caller leads the call)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _count(self, shared):
+        with self._lock:
+            self.calls += 1
+            self.coalesced += shared
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key, function):
+        """Runs function() once per key at a time. Returns (result, True if it came from another caller's call)."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                try:
+                    result = future.result()
+                except _Abandoned:
+                    continue
+                except Exception:
+                    self._count(True)
+                    raise
+                self._count(True)
+                return result, True
+            self._count(False)
+            try:
+                result = function()
+            except Exception as error:
+                self._settle(key, future, error=error)
+                raise
+            except BaseException:
+                self._settle(key, future, error=_Abandoned())
+                raise
+            self._settle(key, future, result)
+            return result, False
+
+    async def do_async(self, key, function):
+        """Coroutine form of do(); function() returns an awaitable. Shares in-flight calls with do()."""
+        while True:
+            future, leader = self._join(key)
+            if not leader:
+                waiter = asyncio.wrap_future(future)
+                # Marks the outcome retrieved even if this caller is cancelled before reading it
+                waiter.add_done_callback(lambda done: done.cancelled() or done.exception())
+                try:
+                    # shield: a cancelled caller must not cancel the shared future
+                    result = await asyncio.shield(waiter)
+                except _Abandoned:
+                    continue
+                except Exception:
+                    self._count(True)
+                    raise
+                self._count(True)
+                return result, True
+            self._count(False)
+            try:
+                result = await function()
+            except Exception as error:
+                self._settle(key, future, error=error)
+                raise
+            except BaseException:
+                self._settle(key, future, error=_Abandoned())
+                raise
+            self._settle(key, future, result)
+            return result, False
+
+    def stream(self, key, function):
+        """
+        Chunks of function() (an iterable), read once per key at a time on a
+        background thread. Returns (iterator over every chunk, True if it joined
+        another caller's stream).
+        """
+        with self._lock:
+            self.calls += 1
+            broadcast = self._streams.get(key)
+            if broadcast is not None:
+                self.coalesced += 1
+                return iter(broadcast), True
+            broadcast = self._streams[key] = _Broadcast()
+
+        def pump():
+            error = None
+            try:
+                for chunk in function():
+                    broadcast.publish(chunk)
+            except Exception as exc:
+                error = exc
+            finally:
+                # Released before finishing, so a caller arriving now starts a new stream
+                with self._lock:
+                    del self._streams[key]
+                broadcast.finish(error)
+
+        threading.Thread(target=pump, name="singleflight-stream", daemon=True).start()
+        return iter(broadcast), False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._streams),
+                "coalesced_ratio": self.coalesced / self.calls if self.calls else 0.0,
+            }
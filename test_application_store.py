@@ -0,0 +1,107 @@
+# test_application_store.py
+"""
+A store directory has one writer, and processes sharing a store through
+open_store() don't lose each other's records. Run with
+`python -m pytest test_application_store.py`.
+"""
+import math
+import subprocess
+import sys
+
+import pytest
+
+from application_store import ApplicationStore, StoreLocked, fcntl, open_store
+
+needs_flock = pytest.mark.skipif(fcntl is None, reason="no advisory locks on this platform")
+
+HOLD_STORE = """
+import sys
+from application_store import ApplicationStore
+store = ApplicationStore(sys.argv[1])
+print("open", flush=True)
+sys.stdin.readline()
+store.close()
+"""
+
+
+@needs_flock
+def test_second_store_on_a_directory_fails_fast(tmp_path):
+    store = ApplicationStore(str(tmp_path))
+    try:
+        with pytest.raises(StoreLocked):
+            ApplicationStore(str(tmp_path))
+    finally:
+        store.close()
+    ApplicationStore(str(tmp_path)).close()  # free again once closed
+
+
+@needs_flock
+def test_directory_held_by_another_process(tmp_path):
+    holder = subprocess.Popen([sys.executable, "-c", HOLD_STORE, str(tmp_path)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert holder.stdout.readline().strip() == "open"
+        with pytest.raises(StoreLocked):
+            ApplicationStore(str(tmp_path))
+    finally:
+        holder.communicate("\n", timeout=30)
+    ApplicationStore(str(tmp_path)).close()
+
+
+# Small segments so both writers rotate and compact many times while the other is writing
+WRITE_STORE = """
+import sys
+from application_store import open_store
+directory, name, count = sys.argv[1], sys.argv[2], int(sys.argv[3])
+store = open_store(directory, segment_bytes=4096, compact_segments=2, flush_seconds=0.001)
+print(store.directory, flush=True)
+sys.stdin.readline()
+for i in range(count):
+    store.append({"pathway": "player", "inputs": {"name": name}, "verdict": "approved",
+                  "talent_id": f"P{name}{i}", "payload": "x" * 200})
+    if i % 50 == 0:
+        store.flush()
+        store.get_by_talent_id("PA0")  # reads the other writer while it compacts
+store.close()
+"""
+
+
+@needs_flock
+def test_two_processes_writing_one_store_lose_nothing(tmp_path):
+    count = 1000
+    writers = [subprocess.Popen([sys.executable, "-c", WRITE_STORE, str(tmp_path), name, str(count)],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for name in "AB"]
+    directories = {writer.stdout.readline().strip() for writer in writers}
+    assert len(directories) == 2  # each process got its own writer directory
+    for writer in writers:
+        writer.stdin.write("\n")
+        writer.stdin.flush()
+    for writer in writers:
+        writer.communicate(timeout=120)
+        assert writer.returncode == 0
+
+    store = open_store(str(tmp_path))
+    try:
+        talent_ids = [record["talent_id"] for record in store.query_range(0, math.inf)]
+        expected = {f"P{name}{i}" for name in "AB" for i in range(count)}
+        assert len(talent_ids) == len(expected) and set(talent_ids) == expected
+        assert store.get_by_talent_id("PB999")["inputs"] == {"name": "B"}
+        assert store.get_by_talent_id("PA0")["inputs"] == {"name": "A"}
+    finally:
+        store.close()
+
+
+@needs_flock
+def test_writers_read_each_others_live_records(tmp_path):
+    first, second = open_store(str(tmp_path)), open_store(str(tmp_path))
+    try:
+        assert first.directory != second.directory
+        second.append({"pathway": "coach", "talent_id": "C1", "processed_at": 1.0})
+        second.flush()
+        assert first.get_by_talent_id("C1")["pathway"] == "coach"
+        first.append({"pathway": "player", "talent_id": "P1", "processed_at": 2.0})
+        first.flush()
+        assert [record["talent_id"] for record in second.query_range(0, 10)] == ["C1", "P1"]
+    finally:
+        first.close()
+        second.close()
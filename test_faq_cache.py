@@ -0,0 +1,45 @@
+# test_faq_cache.py
+"""FAQ answers must be about the role the question names. Run with `python -m pytest test_faq_cache.py`."""
+import pytest
+
+from faq_cache import FaqCache, role_of, terms
+
+
+@pytest.fixture
+def cache():
+    return FaqCache(approved_path=None, pending_path=None)
+
+
+@pytest.mark.parametrize("question", [
+    "What is the age limit for coaches?",
+    "Do coaches have to relocate?",
+    "Can I train remotely as a coach?",
+])
+def test_coach_questions_never_get_player_answers(cache, question):
+    answer = cache.lookup(question)
+    assert answer is None or "Player" not in answer and "Players" not in answer
+
+
+def test_coach_age_question_gets_coach_answer(cache):
+    assert "30 or older" in cache.lookup("What is the age limit for coaches?")
+
+
+def test_player_questions_still_hit(cache):
+    assert "16 to 24" in cache.lookup("What is the age limit for players?")
+    assert "16 to 24" in cache.lookup("Am I too old to join?")
+    assert "relocate" in cache.lookup("Is relocation required?")
+
+
+def test_approved_answers_take_the_role_of_their_question(tmp_path):
+    approved = tmp_path / "approved.jsonl"
+    approved.write_text('{"question": "Do players get a kit allowance?", "answer": "Players get two kits."}\n')
+    cache = FaqCache(approved_path=str(approved), pending_path=None)
+    assert cache.lookup("Do players get a kit allowance?") == "Players get two kits."
+    assert cache.lookup("Do coaches get a kit allowance?") is None
+
+
+def test_role_of():
+    assert role_of(terms("Who can apply as a coach?")) == "coach"
+    assert role_of(terms("What is the age limit for players?")) == "player"
+    assert role_of(terms("Can players and coaches both apply?")) == "any"
+    assert role_of(terms("How do I apply?")) == "any"
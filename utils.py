@@ -1,18 +1,118 @@
 # utils.py
 import re
+from functools import lru_cache
+
+_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize_keyword(text):
+    """Lowercases and strips everything except letters, digits and whitespace."""
+    return _NON_ALNUM.sub('', text.lower())
+
+
+@lru_cache(maxsize=1024)
+def tokenize_message(text):
+    """
+    Normalizes a message once and splits it into words.
+    Returns (words, joined) where joined[i] is True when word i and word i+1
+    are separated by exactly one space, so multi-word keywords keep the same
+    whole-phrase semantics as the old `\\b...\\b` regex search.
+    Memoized, so every matcher consulted for the same message reuses the result.
+    """
+    normalized = normalize_keyword(text)
+    spans = [m.span() for m in _WORD.finditer(normalized)]
+    words = tuple(normalized[start:end] for start, end in spans)
+    joined = tuple(
+        spans[i + 1][0] == end + 1 and normalized[end] == ' '
+        for i, (_, end) in enumerate(spans[:-1])
+    )
+    return words, joined
+
+
+class KeywordMatcher:
+    """
+    Word-level trie over one or more named keyword sets, compiled once.
+
+    Matching is a single pass over the message's words: at each word we walk
+    the trie as far as the phrase continues, so the cost depends on the
+    message length and the longest keyword, not on how many keywords or sets
+    there are.
+
+        router = KeywordMatcher({"talent_id": ["talent id", "existing"], "new_user": ["new", "join"]})
+        router.matches("I'm new here")  # -> {"new_user": "new"}
+    """
+
+    def __init__(self, keyword_sets):
+        if not isinstance(keyword_sets, dict):
+            keyword_sets = {None: keyword_sets}
+        self.set_names = tuple(keyword_sets)
+        self._root = {}
+        for set_name, keywords in keyword_sets.items():
+            for keyword in keywords:
+                words = normalize_keyword(keyword).split()
+                if not words:
+                    continue
+                node = self._root
+                for word in words:
+                    node = node.setdefault(word, {})
+                # The None key holds the sets that end at this node
+                node.setdefault(None, {}).setdefault(set_name, keyword)
+
+    def _scan(self, text, wanted=None):
+        words, joined = tokenize_message(text)
+        found = {}
+        for start in range(len(words)):
+            node = self._root
+            pos = start
+            while True:
+                node = node.get(words[pos])
+                if node is None:
+                    break
+                for set_name, keyword in node.get(None, {}).items():
+                    if set_name not in found:
+                        found[set_name] = keyword
+                        if wanted is not None and set_name == wanted:
+                            return found
+                if pos + 1 >= len(words) or not joined[pos]:
+                    break
+                pos += 1
+        return found
+
+    def matches(self, text):
+        """Returns {set_name: first matching keyword} for every set found in text."""
+        return self._scan(text)
+
+    def first_match(self, text):
+        """Returns (set_name, keyword) for the first set in declaration order, or None."""
+        found = self._scan(text)
+        for set_name in self.set_names:
+            if set_name in found:
+                return set_name, found[set_name]
+        return None
+
+    def contains(self, text, set_name=None):
+        """True if text contains any keyword of set_name (any set when omitted)."""
+        if set_name is None and None not in self.set_names:
+            return bool(self._scan(text))
+        return set_name in self._scan(text, wanted=set_name)
+
+
+@lru_cache(maxsize=256)
+def _matcher_for(keywords):
+    return KeywordMatcher(keywords)
+
 
 def contains_any_keyword(text, keywords):
     """
     Checks if the given text contains any of the provided keywords,
     with robust normalization for fuzzy matching.
+    Accepts a list of keywords or a prebuilt KeywordMatcher; plain lists are
+    compiled once and reused on later calls.
     """
-    normalized_text = re.sub(r'[^a-z0-9\s]', '', text.lower()) # Remove non-alphanumeric, lowercase
-    for keyword in keywords:
-        normalized_keyword = re.sub(r'[^a-z0-9\s]', '', keyword.lower())
-        # Use word boundaries (\b) to match whole words/phrases more accurately
-        if re.search(r'\b' + re.escape(normalized_keyword) + r'\b', normalized_text):
-            return True
-    return False
+    if isinstance(keywords, KeywordMatcher):
+        return keywords.contains(text)
+    return _matcher_for(tuple(keywords)).contains(text)
 
 def handle_length_error(inputs_received, expected_length, field_prompts, required_keys_ordered):
     """Generates a detailed error message for incorrect input count."""
@@ -31,4 +131,4 @@ def handle_length_error(inputs_received, expected_length, field_prompts, require
         feedback += f"{i+1}. `{field_prompts[key]}`\n"
 
     feedback += "\n**💡 Tip:** Make sure each piece of info is separated by a comma. Please copy your last message, fix the missing/extra items, and try again!"
-    return feedback
\ No newline at end of file
+    return feedback
@@ -0,0 +1,290 @@
+# validation.py
+"""
+Declarative validation rules for recruitment submissions.
+
+Each pathway declares its fields once as a Schema of Rules. A Rule reads one
+field, prepares its value (strip, case, alias mapping, regex extraction, type
+coercion) and runs a chain of Checks; the first failing Check in a chain adds
+its message as an error or a warning and ends that chain. A field that needs
+independent checks simply gets more than one Rule.
+
+Everything (regexes, keyword matchers, alias tables, message templates) is
+built at import time, so validating a submission is a fixed, small amount of
+work.
+"""
+import re
+from utils import KeywordMatcher
+
+ERROR = "error"
+WARNING = "warning"
+
+
+# --- Check predicates: each returns True when the value is a problem ---
+
+def shorter_than(length):
+    return lambda value: len(value) < length
+
+def below(limit):
+    return lambda value: value < limit
+
+def above(limit):
+    return lambda value: value > limit
+
+def outside(low, high):
+    return lambda value: value < low or value > high
+
+def not_in(allowed):
+    allowed = frozenset(allowed)
+    return lambda value: value not in allowed
+
+def not_matching(pattern):
+    """Fails when the pattern does not match at the start of the value."""
+    return lambda value: not pattern.match(value)
+
+def not_found(pattern):
+    """Fails when the pattern does not occur anywhere in the value."""
+    return lambda value: not pattern.search(value)
+
+def lacks(keywords):
+    """Fails when none of the keywords (a KeywordMatcher) appear in the value."""
+    return lambda value: not keywords.contains(value)
+
+def has(keywords):
+    return keywords.contains
+
+def missing(value):
+    return value is None
+
+def all_of(*tests):
+    return lambda value: all(test(value) for test in tests)
+
+
+class Check:
+    """One step in a rule chain: adds `message` at `severity` when `test(value)` is true."""
+    __slots__ = ("test", "severity", "message")
+
+    def __init__(self, test, severity, message):
+        self.test = test
+        self.severity = severity
+        self.message = message
+
+    def render(self, raw, value):
+        return self.message.format(raw=raw, value=value) if "{" in self.message else self.message
+
+
+class Rule:
+    """
+    A chain of Checks over one field.
+
+    transform: applied to the stripped value (e.g. str.lower)
+    canonical: alias table; a hit rewrites the submitted field in place
+    extract:   regex whose first group becomes the value (None when absent)
+    coerce:    type conversion; a ValueError reports `invalid` as an error
+    """
+    __slots__ = ("key", "checks", "transform", "canonical", "extract", "coerce", "invalid")
+
+    def __init__(self, key, checks, transform=None, canonical=None, extract=None, coerce=None, invalid=None):
+        self.key = key
+        self.checks = tuple(checks)
+        self.transform = transform
+        self.canonical = canonical
+        self.extract = extract
+        self.coerce = coerce
+        self.invalid = invalid
+
+
+class Schema:
+    """An ordered list of fields plus the rules that validate them."""
+
+    def __init__(self, keys, rules):
+        self.keys = tuple(keys)
+        positions = {key: i for i, key in enumerate(self.keys)}
+        self._rules = tuple((positions[rule.key], rule) for rule in rules)
+
+    def validate(self, inputs):
+        """
+        Validates a list of field values in schema order.
+        Returns (errors, warnings). Alias hits are written back into `inputs`
+        so later processing sees the canonical value.
+        """
+        errors = []
+        warnings = []
+        found = {ERROR: errors, WARNING: warnings}
+
+        for index, rule in self._rules:
+            raw = inputs[index]
+            value = raw.strip()
+            if rule.transform is not None:
+                value = rule.transform(value)
+            if rule.canonical is not None and value in rule.canonical:
+                value = inputs[index] = rule.canonical[value]
+            if rule.extract is not None:
+                match = rule.extract.search(value)
+                value = match.group(1) if match else None
+            if rule.coerce is not None and value is not None:
+                try:
+                    value = rule.coerce(value)
+                except ValueError:
+                    if rule.invalid is None:
+                        raise
+                    errors.append(rule.invalid.format(raw=raw))
+                    continue
+
+            for check in rule.checks:
+                if check.test(value):
+                    found[check.severity].append(check.render(raw, value))
+                    break
+
+        return errors, warnings
+
+    def validate_record(self, record):
+        """Validates a {field: value} mapping; missing fields count as empty."""
+        inputs = [str(record.get(key, "")) for key in self.keys]
+        errors, warnings = self.validate(inputs)
+        return inputs, errors, warnings
+
+
+# --- Shared patterns and keyword sets ---
+
+NAME_PATTERN = re.compile(r'^[a-zA-Z\s\-\.]+$')
+HEIGHT_PATTERN = re.compile(r'(\d+\'?\d*\"?|\d+\.\d+\s*m|\d+\s*cm)')
+PACE_PATTERN = re.compile(r'pace\s*[:=\-]?\s*(\d+)')
+URL_PATTERN = re.compile(r'(https?://(?:www\.)?|www\.)[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}(/\S*)?')
+
+YES_KEYWORDS = KeywordMatcher(["yes", "y"])
+VIDEO_YES_KEYWORDS = KeywordMatcher(["yes", "y", "true"])
+VIDEO_ANSWER_KEYWORDS = KeywordMatcher(["yes", "y", "true", "no", "n", "false"])
+PLAYER_LEVEL_KEYWORDS = KeywordMatcher(["semi-professional", "semi pro", "professional", "pro"])
+REQUIRED_CERT_KEYWORDS = KeywordMatcher(["pro", "a license", "uefa pro", "caf a", "ussf a", "fifa", "premier diploma", "b license"])
+# Eligibility is stricter than validation: 'b license' passes the form but not the role
+COACH_CERT_KEYWORDS = KeywordMatcher(["pro", "a license", "uefa pro", "caf a", "ussf a", "fifa", "premier diploma"])
+COACH_ROLE_KEYWORDS = KeywordMatcher(["head coach", "senior coach", "technical director", "first team coach", "manager", "director of football"])
+
+VALID_POSITIONS = ['GK', 'CB', 'LB', 'RB', 'CDM', 'CM', 'CAM', 'LM', 'RM', 'LW', 'RW', 'ST', 'CF']
+POSITION_ALIASES = {
+    'GOALKEEPER': 'GK', 'KEEPER': 'GK', 'GOALIE': 'GK',
+    'CENTERBACK': 'CB', 'CENTER BACK': 'CB', 'CENTRE BACK': 'CB', 'CD': 'CB',
+    'LEFTBACK': 'LB', 'LEFT BACK': 'LB',
+    'RIGHTBACK': 'RB', 'RIGHT BACK': 'RB',
+    'DEFENSIVE MIDFIELDER': 'CDM', 'DEFENSIVE MID': 'CDM',
+    'CENTRAL MIDFIELDER': 'CM', 'CENTRAL MID': 'CM', 'MIDFIELDER': 'CM', 'MIDFIELD': 'CM',
+    'ATTACKING MIDFIELDER': 'CAM', 'ATTACKING MID': 'CAM', 'ATTACKING': 'CAM',
+    'LEFT MIDFIELDER': 'LM', 'LEFT MID': 'LM',
+    'RIGHT MIDFIELDER': 'RM', 'RIGHT MID': 'RM',
+    'LEFT WINGER': 'LW', 'LEFTWING': 'LW', 'WINGER': 'LW',
+    'RIGHT WINGER': 'RW', 'RIGHTWING': 'RW',
+    'STRIKER': 'ST', 'FORWARD': 'ST',
+    'CENTER FORWARD': 'CF', 'CENTRE FORWARD': 'CF',
+}
+
+NAME_RULE = Rule("name", [
+    Check(shorter_than(2), ERROR, "Name must be at least 2 characters."),
+    Check(not_matching(NAME_PATTERN), ERROR, "Name should only contain letters, spaces, hyphens, and periods."),
+])
+
+
+PLAYER_SCHEMA = Schema(
+    ["name", "age", "position", "years_played", "current_level",
+     "physical_attributes", "achievements", "video_highlights", "availability"],
+    [
+        NAME_RULE,
+        Rule("age", [
+            Check(below(16), ERROR, "Age {value} is too young. Must be at least 16 for academy consideration."),
+            Check(above(30), ERROR, "Age {value} is too high for player development programs. Must be under 30."),
+            Check(above(24), WARNING, "Player age {value} has limited eligibility for direct player programs. Consider coaching pathway if interested."),
+        ], coerce=int, invalid="Age '{raw}' must be a valid number."),
+        Rule("position", [
+            Check(shorter_than(2), ERROR, "Position '{raw}' is too short. Please provide a clear position."),
+            Check(not_in(VALID_POSITIONS), ERROR, "Position '{raw}' not recognized. Use common abbreviations (e.g., 'ST', 'CM', 'GK') or full names."),
+        ], transform=str.upper, canonical=POSITION_ALIASES),
+        Rule("years_played", [
+            Check(below(0), ERROR, "Years played cannot be negative."),
+            Check(above(20), ERROR, "Years played ({value}) seems unusually high. Please confirm."),
+            Check(below(3), WARNING, "Less than 3 years of organized experience ({value} years) may affect eligibility for direct academy programs."),
+        ], coerce=int, invalid="Years played '{raw}' must be a valid number."),
+        Rule("current_level", [
+            Check(lacks(PLAYER_LEVEL_KEYWORDS), ERROR, "Current level '{raw}' not recognized as Semi-professional or Professional. Please specify clearly."),
+        ]),
+        Rule("physical_attributes", [
+            Check(shorter_than(10), ERROR, "Physical attributes seem incomplete. Include: height, weight, dominant foot, pace (1-10)."),
+        ]),
+        Rule("physical_attributes", [
+            Check(not_found(HEIGHT_PATTERN), WARNING, "Height not clearly specified in physical attributes (e.g., 5'10, 1.75m, 175cm)."),
+        ], transform=str.lower),
+        Rule("physical_attributes", [
+            Check(missing, WARNING, "Pace rating (1-10) not found in physical attributes (e.g., 'pace 8')."),
+            Check(outside(1, 10), ERROR, "Pace rating '{value}' should be between 1-10."),
+        ], transform=str.lower, extract=PACE_PATTERN, coerce=int),
+        Rule("achievements", [
+            Check(shorter_than(5), WARNING, "Achievements field seems very short. Please list significant football achievements."),
+        ]),
+        Rule("video_highlights", [
+            Check(all_of(has(VIDEO_YES_KEYWORDS), not_found(URL_PATTERN)), WARNING, "You indicated 'Yes' for video highlights but no clear link was found. Please include a full URL."),
+            Check(lacks(VIDEO_ANSWER_KEYWORDS), WARNING, "Please specify 'Yes' or 'No' for video highlights, and a link if 'Yes'."),
+        ], transform=str.lower),
+        Rule("availability", [
+            Check(lacks(YES_KEYWORDS), ERROR, "Availability for relocation must be 'Yes' for academy consideration."),
+        ]),
+    ],
+)
+
+
+COACH_SCHEMA = Schema(
+    ["name", "age", "years_experience", "highest_certification", "specialty",
+     "previous_roles", "references_available", "availability_start_date"],
+    [
+        NAME_RULE,
+        Rule("age", [
+            Check(below(25), ERROR, "Age {value} is below minimum eligible age for coaching (25)."),
+            Check(above(70), WARNING, "Age {value} seems high for active coaching. Please confirm."),
+        ], coerce=int, invalid="Age '{raw}' must be a valid number."),
+        Rule("years_experience", [
+            Check(below(5), ERROR, "Years of experience ({value}) is below minimum eligible (5 years)."),
+            Check(above(40), WARNING, "Years of experience ({value}) seems unusually high. Please confirm."),
+        ], coerce=int, invalid="Years of experience '{raw}' must be a valid number."),
+        Rule("highest_certification", [
+            Check(lacks(REQUIRED_CERT_KEYWORDS), ERROR, "Highest certification '{raw}' not recognized as a high-level qualification (e.g., UEFA Pro, A License)."),
+        ]),
+        Rule("specialty", [
+            Check(shorter_than(3), ERROR, "Specialty field seems too short or empty. Please specify a coaching specialty (e.g., 'Youth Development', 'Tactical Analysis')."),
+        ]),
+        Rule("previous_roles", [
+            Check(lacks(COACH_ROLE_KEYWORDS), ERROR, "Previous roles '{raw}' do not indicate senior-level experience (e.g., Head Coach, Technical Director)."),
+        ]),
+        Rule("references_available", [
+            Check(lacks(YES_KEYWORDS), ERROR, "Professional references must be available ('Yes')."),
+        ]),
+        Rule("availability_start_date", [
+            Check(shorter_than(3), ERROR, "Availability start date seems too short. Please provide a clear date or 'Immediately'."),
+        ]),
+    ],
+)
+
+
+# --- Eligibility: run on validated data; every "error" is a rejection reason ---
+
+PLAYER_ELIGIBILITY = Schema(
+    PLAYER_SCHEMA.keys,
+    [
+        Rule("age", [Check(outside(16, 24), ERROR, "Age: 16-24 (You are {value})")], coerce=int),
+        Rule("years_played", [Check(outside(3, 5), ERROR, "Experience: 3-5 years (You have {value})")], coerce=int),
+        Rule("current_level", [Check(lacks(PLAYER_LEVEL_KEYWORDS), ERROR, "Level: Semi-pro/Pro (You are: {raw})")]),
+        Rule("availability", [Check(lacks(YES_KEYWORDS), ERROR, "Relocation: Yes (You said: {raw})")]),
+    ],
+)
+
+COACH_ELIGIBILITY = Schema(
+    COACH_SCHEMA.keys,
+    [
+        Rule("age", [Check(below(30), ERROR, "Age: 30+ (You are {value})")], coerce=int),
+        Rule("years_experience", [Check(below(8), ERROR, "Experience: 8+ years (You have {value})")], coerce=int),
+        Rule("highest_certification", [Check(lacks(COACH_CERT_KEYWORDS), ERROR, "Certification: High-level (You provided: {raw})")]),
+        Rule("previous_roles", [Check(lacks(COACH_ROLE_KEYWORDS), ERROR, "Previous Roles: Head/Senior (You provided: {raw})")]),
+        Rule("references_available", [Check(lacks(YES_KEYWORDS), ERROR, "References: Available (You stated: {raw})")]),
+    ],
+)
+
+
+def rejection_reasons(eligibility, record):
+    """Returns the eligibility requirements a validated record misses (empty when eligible)."""
+    return eligibility.validate_record(record)[1]